@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+PIL ↔ Qt 图像转换基准测试
+
+对比旧实现（tobytes RGBA + QImage.copy()，Format_RGBA8888）、tobytes 后由 Qt 转换、
+Pillow 预乘打包模式与 ui.image_bridge（Pillow 直接写入 QImage 内存后原地预乘，
+Qt → PIL 共享内存）的转换耗时，以及两种格式绘制到 QPainter 的耗时。
+
+用法: python benchmarks/bench_image_bridge.py [边长]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+from PyQt6.QtGui import QGuiApplication, QImage, QPainter
+
+from ui.image_bridge import pil_to_qimage, qimage_to_pil
+
+
+def bench(label: str, func, repeat: int = 10) -> float:
+    """运行多次取最优耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    ms = best * 1000
+    print(f"  {label:<32} {ms:9.2f} ms")
+    return ms
+
+
+def legacy_pil_to_qimage(image: Image.Image) -> QImage:
+    """旧实现：RGBA8888 + 拷贝"""
+    data = image.tobytes('raw', 'RGBA')
+    return QImage(data, image.width, image.height, QImage.Format.Format_RGBA8888).copy()
+
+
+def tobytes_pil_to_qimage(image: Image.Image) -> QImage:
+    """tobytes 导出后由 Qt 转换为预乘 ARGB32（两次分配）"""
+    data = image.tobytes('raw', 'RGBA')
+    return QImage(data, image.width, image.height, image.width * 4,
+                  QImage.Format.Format_RGBA8888).convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+
+def pillow_premultiplied_pil_to_qimage(image: Image.Image) -> QImage:
+    """Pillow 的预乘打包模式一次导出 BGRa"""
+    data = image.tobytes('raw', 'BGRa')
+    return QImage(data, image.width, image.height, image.width * 4,
+                  QImage.Format.Format_ARGB32_Premultiplied)
+
+
+def legacy_qimage_to_pil(qimage: QImage) -> Image.Image:
+    """旧实现：转换格式 + NumPy 中转"""
+    qimage = qimage.convertToFormat(QImage.Format.Format_RGBA8888)
+    ptr = qimage.bits()
+    ptr.setsize(qimage.height() * qimage.width() * 4)
+    arr = np.frombuffer(ptr, np.uint8).reshape((qimage.height(), qimage.width(), 4))
+    return Image.fromarray(arr, 'RGBA')
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1] + ["-platform", "offscreen"])
+
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (size, size, 4), dtype=np.uint8), 'RGBA')
+    legacy_q = legacy_pil_to_qimage(image)
+    bridge_q = pil_to_qimage(image)
+    target = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+
+    def draw(qimage):
+        painter = QPainter(target)
+        painter.drawImage(0, 0, qimage)
+        painter.end()
+
+    print(f"图片尺寸: {size}x{size} RGBA")
+    print("[PIL -> QImage]")
+    bench("旧: RGBA8888 + copy()", lambda: legacy_pil_to_qimage(image))
+    bench("tobytes + Qt 转换", lambda: tobytes_pil_to_qimage(image))
+    bench("Pillow 预乘打包 BGRa", lambda: pillow_premultiplied_pil_to_qimage(image))
+    bench("新: 写入 QImage + 原地转换", lambda: pil_to_qimage(image))
+    print("[QImage -> PIL]")
+    bench("旧: convertToFormat + NumPy", lambda: legacy_qimage_to_pil(bridge_q))
+    bench("新: 预乘 ARGB32（Qt 转换后共享）", lambda: qimage_to_pil(bridge_q))
+    bench("新: RGBA8888（直接共享）", lambda: qimage_to_pil(legacy_q))
+    print("[绘制到 QPainter]")
+    bench("RGBA8888（每次转换）", lambda: draw(legacy_q))
+    bench("预乘 ARGB32", lambda: draw(bridge_q))
+
+
+if __name__ == "__main__":
+    main()
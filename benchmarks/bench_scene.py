@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+场景序列化基准测试 - 1000 图层合成页面
+
+测试 to_dict / from_dict / 保存 / 加载 / 历史快照，
+并与旧实现（indent=2 的 json.dump + 深拷贝历史）对比。
+
+用法: python benchmarks/bench_scene.py [图层数]
+"""
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.canvas import Canvas
+from core.layer import ImageLayer, TextLayer, ShapeLayer
+from core import serializer
+
+
+def build_page(layer_count: int) -> Canvas:
+    """构造合成页面：图片/文字/形状图层交替"""
+    canvas = Canvas()
+    for i in range(layer_count):
+        y = (i * 37) % max(1, canvas.height)
+        kind = i % 3
+        if kind == 0:
+            layer = ImageLayer(name=f"图片 {i}", image_path=f"/assets/product_{i}.png",
+                               x=i % 500, y=y, width=320, height=240)
+        elif kind == 1:
+            layer = TextLayer(name=f"文字 {i}", text=f"卖点文案 {i}", x=40, y=y,
+                              width=300, height=40, font_size=28, font_color="#333333")
+        else:
+            layer = ShapeLayer(shape_type="rectangle", x=0, y=y, width=750, height=4,
+                               fill_color="#eeeeee")
+        canvas.add_layer(layer)
+    return canvas
+
+
+def bench(label: str, func, repeat: int = 5) -> float:
+    """运行多次取最优耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    ms = best * 1000
+    print(f"  {label:<28} {ms:9.2f} ms")
+    return ms
+
+
+def main():
+    layer_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    canvas = build_page(layer_count)
+    data = canvas.to_dict()
+    snapshot = serializer.snapshot_canvas(canvas)
+
+    print(f"图层数: {layer_count}  orjson: {'是' if serializer.has_orjson() else '否'}")
+
+    print("[字典]")
+    bench("to_dict", canvas.to_dict)
+    bench("from_dict", lambda: Canvas.from_dict(data))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.ecom")
+        legacy_path = os.path.join(tmp, "legacy.ecom")
+
+        def legacy_save():
+            with open(legacy_path, 'w', encoding='utf-8') as f:
+                json.dump(canvas.to_dict(), f, ensure_ascii=False, indent=2)
+
+        def legacy_load():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                Canvas.from_dict(json.load(f))
+
+        print("[文件]")
+        bench("save", lambda: canvas.save(path))
+        bench("load", lambda: Canvas.load(path))
+        bench("save (旧: indent=2)", legacy_save)
+        bench("load (旧: json.load)", legacy_load)
+        print(f"  文件大小: {os.path.getsize(path) / 1024:.1f} KB "
+              f"(旧: {os.path.getsize(legacy_path) / 1024:.1f} KB)")
+
+    target = Canvas()
+    print("[历史快照]")
+    bench("snapshot_canvas", lambda: serializer.snapshot_canvas(canvas))
+    bench("restore_canvas", lambda: serializer.restore_canvas(target, snapshot))
+    bench("to_dict + deepcopy (旧)", lambda: copy.deepcopy(canvas.to_dict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -64,6 +64,11 @@ class CanvasConfig:
     GRID_SIZE = 10
     SNAP_THRESHOLD = 5
 
+# 缓存配置
+class CacheConfig:
+    MEMORY_BUDGET_MB = 512  # 渲染位图、视口位图、效果蒙版等缓存的总内存上限
+    MASK_UNDO_BUDGET_MB = 64  # 蒙版编辑器撤销记录（压缩分块）的内存上限
+
 # 导出配置
 class ExportConfig:
     # 平台规范
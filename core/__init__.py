@@ -1,14 +1,14 @@
 """
 核心模块
 """
-from .layer import Layer, ImageLayer, TextLayer, ShapeLayer, create_layer_from_dict
+from .layer import Layer, ImageLayer, TextLayer, ShapeLayer, GroupLayer, create_layer_from_dict
 from .canvas import Canvas, Screen
 from .history import HistoryManager, CanvasHistoryManager
 from .export import Exporter, ExportResult
 from .shortcuts import ShortcutManager, init_shortcuts
 
 __all__ = [
-    'Layer', 'ImageLayer', 'TextLayer', 'ShapeLayer', 'create_layer_from_dict',
+    'Layer', 'ImageLayer', 'TextLayer', 'ShapeLayer', 'GroupLayer', 'create_layer_from_dict',
     'Canvas', 'Screen',
     'HistoryManager', 'CanvasHistoryManager',
     'Exporter', 'ExportResult',
@@ -0,0 +1,106 @@
+"""
+非破坏性调整 - 亮度 / 对比度 / 色阶 / 饱和度 / 锐化
+
+调整只保存为参数，渲染时作用于缩放后的图层位图：
+- 色阶、亮度、对比度合并为一张 256 项查找表，一次 point() 完成
+- 饱和度为一次 3×4 颜色矩阵变换
+- 锐化为一次 USM 滤波
+结果随图层渲染缓存按参数哈希缓存。
+"""
+from dataclasses import dataclass, asdict, fields
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+
+# 亮度加权系数（ITU-R BT.601）
+_LUMA = (0.299, 0.587, 0.114)
+
+
+@dataclass(frozen=True)
+class Adjustments:
+    """图片调整参数（1.0 / 0 为不调整）"""
+    brightness: float = 1.0    # 亮度 0.0-2.0
+    contrast: float = 1.0      # 对比度 0.0-2.0
+    saturation: float = 1.0    # 饱和度 0.0-2.0
+    levels_black: int = 0      # 色阶黑场 0-254
+    levels_white: int = 255    # 色阶白场 1-255
+    gamma: float = 1.0         # 色阶中间调
+    sharpen: float = 0.0       # 锐化强度 0.0-2.0
+
+    def is_identity(self) -> bool:
+        """是否不产生任何变化"""
+        return self == IDENTITY
+
+    def has_point_ops(self) -> bool:
+        """是否包含逐像素查找表操作"""
+        return (self.brightness != 1.0 or self.contrast != 1.0 or self.gamma != 1.0
+                or self.levels_black != 0 or self.levels_white != 255)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional['Adjustments']:
+        if data is None or isinstance(data, cls):
+            return data
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+IDENTITY = Adjustments()
+
+
+@lru_cache(maxsize=64)
+def build_lut(brightness: float, contrast: float, levels_black: int,
+              levels_white: int, gamma: float) -> Tuple[int, ...]:
+    """将色阶、亮度、对比度合并为一张 256 项查找表"""
+    v = np.arange(256, dtype=np.float64)
+    # 色阶
+    white = max(levels_white, levels_black + 1)
+    v = np.clip((v - levels_black) / (white - levels_black), 0.0, 1.0)
+    if gamma != 1.0:
+        v = v ** (1.0 / max(gamma, 0.01))
+    v *= 255.0
+    # 亮度
+    v *= brightness
+    # 对比度（以中灰为中心）
+    v = (v - 128.0) * contrast + 128.0
+    return tuple(np.clip(np.rint(v), 0, 255).astype(np.uint8).tolist())
+
+
+def saturation_matrix(saturation: float) -> Tuple[float, ...]:
+    """饱和度颜色矩阵（RGB -> RGB，12 项）"""
+    s = saturation
+    matrix = []
+    for row in range(3):
+        for col in range(3):
+            identity = 1.0 if row == col else 0.0
+            matrix.append(s * identity + (1.0 - s) * _LUMA[col])
+        matrix.append(0.0)
+    return tuple(matrix)
+
+
+def apply_adjustments(image: Image.Image, adjustments: Optional[Adjustments]) -> Image.Image:
+    """对 RGBA 位图应用调整（返回新位图，alpha 不变）"""
+    if adjustments is None or adjustments.is_identity():
+        return image
+
+    rgb = image.convert("RGB")
+    alpha = image.getchannel("A")
+
+    if adjustments.has_point_ops():
+        lut = build_lut(adjustments.brightness, adjustments.contrast,
+                        adjustments.levels_black, adjustments.levels_white, adjustments.gamma)
+        rgb = rgb.point(lut * 3)
+
+    if adjustments.saturation != 1.0:
+        rgb = rgb.convert("RGB", saturation_matrix(adjustments.saturation))
+
+    if adjustments.sharpen > 0:
+        rgb = rgb.filter(ImageFilter.UnsharpMask(radius=2, percent=int(adjustments.sharpen * 100), threshold=2))
+
+    rgb.putalpha(alpha)
+    return rgb
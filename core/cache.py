@@ -0,0 +1,148 @@
+"""
+统一缓存管理 - 图层渲染位图、视口位图、效果蒙版、导出分屏共用一个内存预算
+
+- 每个条目记录占用字节数，总量超出预算时按最近最少使用顺序淘汰
+- 条目按子系统分类，可单独清空并统计各子系统占用
+- 键为内容指纹，内容相同的图层（复制出的图层、撤销后恢复的图层）共用同一份缓存
+- 后台渲染线程也会读写，内部加锁；只能在创建线程释放的对象（QPixmap）所在子系统
+  可标记为线程绑定，其他线程淘汰这类条目时推迟到创建线程下次访问缓存时释放
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
+from config import CacheConfig
+
+
+# 子系统名称
+RENDER = "render"        # 图层渲染位图（PIL）
+BASE = "base"            # 缩放后、调整前的图片位图（PIL）
+EFFECT_MASK = "effect_mask"  # 效果模糊蒙版（PIL）
+EXPORT = "export"        # 导出分屏（PIL）
+PIXMAP = "pixmap"        # 视口位图（QPixmap）
+HIT_MASK = "hit_mask"    # 命中测试用的 alpha 块位图（NumPy）
+
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "LA": 2, "RGB": 3, "RGBA": 4, "I": 4, "F": 4}
+
+
+def image_nbytes(image) -> int:
+    """PIL 位图占用的字节数（估算）"""
+    if image is None:
+        return 0
+    return image.width * image.height * _BYTES_PER_PIXEL.get(image.mode, 4)
+
+
+class CacheManager:
+    """按字节计数的 LRU 缓存"""
+
+    def __init__(self, budget_bytes: int = None):
+        if budget_bytes is None:
+            budget_bytes = CacheConfig.MEMORY_BUDGET_MB * 1024 * 1024
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, int, int]]" = OrderedDict()  # -> (值, 字节数, 写入线程)
+        self._usage: Dict[str, int] = {}  # 子系统 -> 字节数
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._thread_affine: Set[str] = set()
+        self._deferred: Dict[int, List[Any]] = {}  # 线程 -> 待在该线程释放的值
+        self._lock = threading.Lock()
+
+    def set_thread_affine(self, subsystem: str):
+        """标记子系统的值只能在写入它的线程释放（如 QPixmap）"""
+        self._thread_affine.add(subsystem)
+
+    # ========== 读写 ==========
+
+    def get(self, subsystem: str, key: Hashable) -> Optional[Any]:
+        """读取缓存（命中时移到最近使用）"""
+        with self._lock:
+            self._deferred.pop(threading.get_ident(), None)
+            entry = self._entries.get((subsystem, key))
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end((subsystem, key))
+            self._hits += 1
+            return entry[0]
+
+    def put(self, subsystem: str, key: Hashable, value: Any, nbytes: int):
+        """写入缓存，超出预算时淘汰最久未使用的条目"""
+        if nbytes > self.budget_bytes:
+            return  # 单个条目超过整个预算，不缓存
+        with self._lock:
+            thread = threading.get_ident()
+            self._deferred.pop(thread, None)
+            self._pop((subsystem, key))
+            self._entries[(subsystem, key)] = (value, nbytes, thread)
+            self._usage[subsystem] = self._usage.get(subsystem, 0) + nbytes
+            self._total += nbytes
+            self._evict()
+
+    def discard(self, subsystem: str, key: Hashable):
+        """移除单个条目"""
+        with self._lock:
+            self._pop((subsystem, key))
+
+    def clear(self, subsystem: str = None):
+        """清空某个子系统（默认全部）"""
+        with self._lock:
+            for full_key in [k for k in self._entries if subsystem is None or k[0] == subsystem]:
+                self._pop(full_key)
+
+    def set_budget(self, budget_bytes: int):
+        """调整内存预算（立即按新预算淘汰）"""
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def _pop(self, full_key):
+        entry = self._entries.pop(full_key, None)
+        if entry is None:
+            return
+        value, nbytes, thread = entry
+        self._usage[full_key[0]] -= nbytes
+        self._total -= nbytes
+        if full_key[0] in self._thread_affine and thread != threading.get_ident():
+            self._deferred.setdefault(thread, []).append(value)
+
+    def _evict(self):
+        while self._total > self.budget_bytes and self._entries:
+            self._pop(next(iter(self._entries)))
+            self._evictions += 1
+
+    # ========== 统计 ==========
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """各子系统的条目数和字节数"""
+        with self._lock:
+            report = {}
+            for subsystem, _key in self._entries:
+                report.setdefault(subsystem, {'entries': 0, 'bytes': 0})['entries'] += 1
+            for subsystem, nbytes in self._usage.items():
+                if subsystem in report:
+                    report[subsystem]['bytes'] = nbytes
+            return report
+
+    def stats(self) -> Dict[str, int]:
+        """总体命中 / 淘汰统计"""
+        with self._lock:
+            return {
+                'budget_bytes': self.budget_bytes,
+                'total_bytes': self._total,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+            }
+
+
+# 全局实例
+cache_manager = CacheManager()
@@ -5,10 +5,14 @@ from dataclasses import dataclass, field
 from typing import List, Optional, Tuple, Dict, Any
 from PIL import Image
 import uuid
-import json
 import os
 
-from .layer import Layer, ImageLayer, TextLayer, ShapeLayer, create_layer_from_dict
+from .layer import Layer, ImageLayer, TextLayer, ShapeLayer, GroupLayer, create_layer_from_dict
+from .events import layer_events
+from . import serializer
+from . import fingerprint
+from .spatial import SpatialIndex
+from .snapping import SnapIndex
 
 
 @dataclass
@@ -46,8 +50,10 @@ class Canvas:
         self.background_color = "#FFFFFF"
         self.layers: List[Layer] = []
         self.screens: List[Screen] = []
-        self.selected_layer_id: Optional[str] = None
+        self.selected_layer_ids: List[str] = []  # 选中的图层（按选中顺序，最后一个为主选中图层）
         self.selected_screen_id: Optional[str] = None
+        self._spatial = SpatialIndex()  # 图层空间索引，供视口裁剪和点选查询
+        self._snapping = SnapIndex()  # 吸附目标索引，供拖动对齐
         
         # 初始化默认分屏
         self._init_default_screens()
@@ -61,9 +67,28 @@ class Canvas:
         ]
         self._update_canvas_height()
     
+    @property
+    def selected_layer_id(self) -> Optional[str]:
+        """主选中图层 id（多选时为最后选中的图层）"""
+        return self.selected_layer_ids[-1] if self.selected_layer_ids else None
+    
+    @selected_layer_id.setter
+    def selected_layer_id(self, layer_id: Optional[str]):
+        self.selected_layer_ids = [layer_id] if layer_id else []
+    
     def _update_canvas_height(self):
-        """根据分屏更新画布高度"""
+        """根据分屏更新画布高度（分屏增删 / 调整后调用，吸附目标随之重建）"""
         self.height = sum(s.height for s in self.screens)
+        self._snapping.invalidate()
+    
+    def invalidate_indexes(self):
+        """图层列表或画布尺寸被整体替换后调用：空间索引和吸附索引在下次查询前重建
+
+        画布的图层 / 分屏操作方法会自行调用；查询时不再比对图层列表，
+        直接修改 layers / screens 的代码必须调用本方法。
+        """
+        self._spatial.invalidate()
+        self._snapping.invalidate()
     
     # ========== 图层操作 ==========
     
@@ -73,6 +98,7 @@ class Canvas:
             self.layers.append(layer)
         else:
             self.layers.insert(index, layer)
+        self.invalidate_indexes()
         return layer
     
     def remove_layer(self, layer_id: str) -> bool:
@@ -80,8 +106,9 @@ class Canvas:
         for i, layer in enumerate(self.layers):
             if layer.id == layer_id:
                 self.layers.pop(i)
-                if self.selected_layer_id == layer_id:
-                    self.selected_layer_id = None
+                self.invalidate_indexes()
+                if layer_id in self.selected_layer_ids:
+                    self.selected_layer_ids.remove(layer_id)
                 return True
         return False
     
@@ -105,6 +132,7 @@ class Canvas:
         if layer:
             self.layers.remove(layer)
             self.layers.insert(max(0, min(new_index, len(self.layers))), layer)
+            self.invalidate_indexes()
             return True
         return False
     
@@ -134,34 +162,118 @@ class Canvas:
         """复制图层"""
         layer = self.get_layer(layer_id)
         if layer:
-            data = layer.to_dict()
-            data['id'] = str(uuid.uuid4())
-            data['name'] = f"{layer.name} 副本"
-            data['x'] += 20
-            data['y'] += 20
-            new_layer = create_layer_from_dict(data)
+            # 共享像素缓冲和渲染缓存，无需重新读取图片
+            new_layer = layer.clone(name=f"{layer.name} 副本", x=layer.x + 20, y=layer.y + 20)
             index = self.get_layer_index(layer_id)
             self.add_layer(new_layer, index + 1)
             return new_layer
         return None
     
+    def group_layers(self, layer_ids: List[str], name: str = None) -> Optional[GroupLayer]:
+        """将指定图层编为一组（组位于原最上层图层的位置）"""
+        ids = set(layer_ids)
+        members = [layer for layer in self.layers if layer.id in ids]
+        if not members:
+            return None
+        
+        top_index = self.get_layer_index(members[-1].id)
+        self.layers = [layer for layer in self.layers if layer.id not in ids]
+        # 图层列表整体变化，调用方会整体重绘，逐个坐标的变更事件没有意义
+        with layer_events.suspended():
+            group = GroupLayer(children=members)
+            if name:
+                group.name = name
+            group.fit_to_children()
+        self.add_layer(group, top_index - len(members) + 1)
+        if ids.intersection(self.selected_layer_ids):
+            self.selected_layer_ids = [i for i in self.selected_layer_ids if i not in ids] + [group.id]
+        return group
+    
+    def ungroup_layer(self, group_id: str) -> List[Layer]:
+        """解散图层组，子图层放回组所在位置"""
+        group = self.get_layer(group_id)
+        if not isinstance(group, GroupLayer):
+            return []
+        
+        index = self.get_layer_index(group_id)
+        with layer_events.suspended():
+            children = group.release_children()
+        self.layers[index:index + 1] = children
+        self.invalidate_indexes()
+        if group_id in self.selected_layer_ids:
+            self.selected_layer_ids.remove(group_id)
+            self.selected_layer_ids.extend(child.id for child in children)
+        return children
+    
+    def get_layers_in_screen(self, screen_id: str) -> List[Layer]:
+        """完全位于指定分屏内的图层"""
+        screen = self.get_screen(screen_id)
+        if not screen:
+            return []
+        top = self.get_screen_y_offset(screen_id)
+        bottom = top + screen.height
+        result = []
+        for layer in self.layers:
+            _, y0, _, y1 = layer.get_render_bounds()
+            if y0 >= top and y1 <= bottom:
+                result.append(layer)
+        return result
+    
     def select_layer(self, layer_id: str):
-        """选择图层"""
+        """选择图层（取消其他图层的选中）"""
         self.selected_layer_id = layer_id
     
+    def select_layers(self, layer_ids: List[str], add: bool = False):
+        """选择多个图层，add 为 True 时加入当前选择"""
+        selected = list(self.selected_layer_ids) if add else []
+        for layer_id in layer_ids:
+            if layer_id not in selected:
+                selected.append(layer_id)
+        self.selected_layer_ids = selected
+    
+    def toggle_layer_selection(self, layer_id: str) -> bool:
+        """切换图层的选中状态，返回切换后是否选中"""
+        if layer_id in self.selected_layer_ids:
+            self.selected_layer_ids.remove(layer_id)
+            return False
+        self.selected_layer_ids.append(layer_id)
+        return True
+    
+    def is_selected(self, layer_id: str) -> bool:
+        return layer_id in self.selected_layer_ids
+    
     def get_selected_layer(self) -> Optional[Layer]:
-        """获取选中的图层"""
+        """获取主选中图层"""
         if self.selected_layer_id:
             return self.get_layer(self.selected_layer_id)
         return None
     
+    def get_selected_layers(self) -> List[Layer]:
+        """获取所有选中的图层（从下到上）"""
+        if not self.selected_layer_ids:
+            return []
+        ids = set(self.selected_layer_ids)
+        return [layer for layer in self.layers if layer.id in ids]
+    
     def get_layer_at_point(self, x: int, y: int) -> Optional[Layer]:
-        """获取指定位置的图层（从上到下）"""
-        for layer in reversed(self.layers):
+        """获取指定位置的图层（从上到下，只测试空间索引中包含该点的图层）"""
+        self._spatial.sync(self.layers)
+        for layer in reversed(self._spatial.query_point(x, y)):
             if layer.visible and not layer.locked and layer.contains_point(x, y):
                 return layer
         return None
     
+    def get_layers_in_rect(self, x0: int, y0: int, x1: int, y1: int) -> List[Layer]:
+        """渲染范围与矩形相交的图层（从下到上）"""
+        self._spatial.sync(self.layers)
+        return self._spatial.query((x0, y0, x1, y1))
+    
+    def snap(self, bounds: Tuple[int, int, int, int], threshold: int,
+             exclude=()) -> Tuple[int, int, List[dict]]:
+        """吸附到其他图层边缘 / 中心、画布中心和分屏边界，返回 (dx, dy, 辅助线)"""
+        self._snapping.sync(self.layers, self.width, (s.height for s in self.screens))
+        return self._snapping.snap(bounds, threshold, exclude)
+    
     # ========== 分屏操作 ==========
     
     def add_screen(self, name: str = None, height: int = 300, index: int = None, is_blank: bool = False) -> Screen:
@@ -231,8 +343,8 @@ class Canvas:
             return self.add_screen(index=index + 1, is_blank=is_blank)
         return None
     
-    def duplicate_screen(self, screen_id: str) -> Optional[Screen]:
-        """复制分屏"""
+    def duplicate_screen(self, screen_id: str, with_layers: bool = True) -> Optional[Screen]:
+        """复制分屏，可连同分屏内的图层一起复制（下方内容整体下移）"""
         screen = self.get_screen(screen_id)
         if screen:
             index = self.get_screen_index(screen_id)
@@ -241,12 +353,49 @@ class Canvas:
                 height=screen.height,
                 is_blank=screen.is_blank
             )
+            
+            if with_layers:
+                top = self.get_screen_y_offset(screen_id)
+                bottom = top + screen.height
+                sources = self.get_screen_layers(screen_id)
+                
+                # 下方分屏的图层下移，为新分屏腾出位置
+                for layer in self.layers:
+                    if self._layer_center_y(layer) >= bottom:
+                        layer.y += screen.height
+                
+                # 副本共享像素缓冲和渲染缓存；每个副本紧接在原图层之上，
+                # 与其他图层的上下关系和原图层一致
+                if sources:
+                    source_ids = {layer.id for layer in sources}
+                    layers = []
+                    for layer in self.layers:
+                        layers.append(layer)
+                        if layer.id in source_ids:
+                            layers.append(layer.clone(y=layer.y + screen.height))
+                    self.layers = layers
+                    self.invalidate_indexes()
+            
             self.screens.insert(index + 1, new_screen)
             self._update_canvas_height()
             self._renumber_screens()
             return new_screen
         return None
     
+    @staticmethod
+    def _layer_center_y(layer: Layer) -> float:
+        """图层中心的 Y 坐标（用于判断图层归属的分屏）"""
+        return layer.y + layer.height / 2
+    
+    def get_screen_layers(self, screen_id: str) -> List[Layer]:
+        """归属于指定分屏的图层（图层中心落在分屏内）"""
+        screen = self.get_screen(screen_id)
+        if not screen:
+            return []
+        top = self.get_screen_y_offset(screen_id)
+        bottom = top + screen.height
+        return [layer for layer in self.layers if top <= self._layer_center_y(layer) < bottom]
+    
     def _renumber_screens(self):
         """重新编号分屏"""
         num = 1
@@ -287,50 +436,43 @@ class Canvas:
         canvas_height = int(self.height * scale)
         canvas = Image.new("RGBA", (canvas_width, canvas_height), self.background_color)
         
-        # 渲染每个图层
+        # 渲染每个图层（缩放、旋转、透明度在合成时应用）
         for layer in self.layers:
-            if not layer.visible:
-                continue
-            
-            layer_img = layer.render(scale)
-            if layer_img:
-                # 计算位置
-                x = int(layer.x * scale)
-                y = int(layer.y * scale)
-                
-                # 调整图层大小
-                if scale != 1.0:
-                    new_w = int(layer_img.width * scale)
-                    new_h = int(layer_img.height * scale)
-                    if new_w > 0 and new_h > 0:
-                        layer_img = layer_img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                
-                # 粘贴图层
-                try:
-                    canvas.paste(layer_img, (x, y), layer_img)
-                except Exception as e:
-                    print(f"渲染图层失败: {e}")
+            if layer.visible:
+                layer.composite_into(canvas, 0, 0, scale)
         
         return canvas
     
     def render_screen(self, screen_id: str, scale: float = 1.0) -> Optional[Image.Image]:
-        """渲染单个分屏"""
+        """渲染单个分屏（只合成与该分屏相交的图层）"""
         screen = self.get_screen(screen_id)
         if not screen:
             return None
         
         y_offset = self.get_screen_y_offset(screen_id)
-        
-        # 渲染完整画布
-        full_canvas = self.render(scale)
-        
-        # 裁剪分屏区域
         top = int(y_offset * scale)
         bottom = int((y_offset + screen.height) * scale)
-        screen_img = full_canvas.crop((0, top, int(self.width * scale), bottom))
+        screen_img = Image.new("RGBA", (int(self.width * scale), bottom - top), self.background_color)
+        
+        layers = fingerprint.screen_layers(self.layers, y_offset, y_offset + screen.height)
+        for layer in layers:
+            layer.composite_into(screen_img, 0, top, scale)
         
         return screen_img
     
+    # ========== 指纹 ==========
+    
+    def fingerprint(self) -> str:
+        """画布内容指纹"""
+        return fingerprint.canvas_fingerprint(self)
+    
+    def get_screen_fingerprint(self, screen_id: str) -> Optional[str]:
+        """分屏内容指纹"""
+        screen = self.get_screen(screen_id)
+        if not screen:
+            return None
+        return fingerprint.screen_fingerprint(self, screen, self.get_screen_y_offset(screen_id))
+    
     # ========== 导出 ==========
     
     def export_screens(self, output_dir: str, format: str = "jpg", quality: int = 95) -> List[str]:
@@ -411,19 +553,20 @@ class Canvas:
         
         if not canvas.screens:
             canvas._init_default_screens()
+        canvas.invalidate_indexes()
         
         return canvas
     
     def save(self, filepath: str):
         """保存到文件"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(serializer.dumps(self.to_dict()))
     
     @classmethod
     def load(cls, filepath: str) -> 'Canvas':
         """从文件加载"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            data = serializer.loads(f.read())
         return cls.from_dict(data)
     
     # ========== 辅助方法 ==========
@@ -0,0 +1,72 @@
+"""
+图片解码线程池 - 打开项目时并行解码图片图层
+Pillow 解码器在解码时会释放 GIL，因此多线程可以真正并行
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterable, List, Optional
+
+from .layer import Layer, ImageLayer, iter_layers
+
+
+class ImageDecoder:
+    """图片解码器（后台线程池）"""
+
+    def __init__(self, max_workers: int = None):
+        if max_workers is None:
+            max_workers = max(2, min(8, (os.cpu_count() or 2)))
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """延迟创建线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="image-decoder"
+            )
+        return self._executor
+
+    def decode_layer(self, layer: ImageLayer,
+                     callback: Callable[[str], None] = None) -> Optional[Future]:
+        """
+        提交单个图片图层的解码任务
+
+        Args:
+            layer: 图片图层
+            callback: 解码完成回调 callback(layer_id)，在工作线程中调用
+
+        Returns:
+            Future，图层无需解码时返回 None
+        """
+        if not layer.needs_decode():
+            return None
+
+        future = self._get_executor().submit(ImageLayer.decode_trimmed, layer.image_path)
+        layer.attach_decode_future(future)
+
+        if callback is not None:
+            layer_id = layer.id
+            future.add_done_callback(lambda _f: callback(layer_id))
+        return future
+
+    def decode_layers(self, layers: Iterable[Layer],
+                      callback: Callable[[str], None] = None) -> List[Future]:
+        """提交所有待解码图片图层（包括图层组内的子图层）"""
+        futures = []
+        for layer in iter_layers(layers):
+            if isinstance(layer, ImageLayer):
+                future = self.decode_layer(layer, callback)
+                if future is not None:
+                    futures.append(future)
+        return futures
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局实例
+image_decoder = ImageDecoder()
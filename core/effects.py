@@ -0,0 +1,217 @@
+"""
+图层效果 - 投影、描边、外发光
+
+效果从图层位图的 alpha 通道生成，绘制在图层下方：
+- 模糊蒙版（扩展 + 高斯模糊）按 alpha 来源和模糊参数缓存（统一缓存管理器），调整颜色、偏移、不透明度时只需重新着色合成
+- 模糊半径较大时在缩小后的 alpha 上模糊再放大，耗时与半径基本无关
+"""
+import math
+from dataclasses import dataclass, asdict
+from typing import ClassVar, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageFilter
+
+from .cache import cache_manager, image_nbytes, EFFECT_MASK
+
+
+# 直接模糊的最大半径，超过后先缩小 alpha
+DIRECT_BLUR_RADIUS = 8
+
+
+@dataclass(frozen=True)
+class DropShadow:
+    """投影"""
+    kind: ClassVar[str] = "drop_shadow"
+    color: str = "#000000"
+    opacity: float = 0.5
+    offset_x: int = 6
+    offset_y: int = 8
+    blur: float = 10.0
+    spread: int = 0
+    enabled: bool = True
+
+    def margins(self) -> Tuple[int, int, int, int]:
+        extent = math.ceil(2 * self.blur) + self.spread
+        return (max(0, extent - self.offset_x), max(0, extent - self.offset_y),
+                max(0, extent + self.offset_x), max(0, extent + self.offset_y))
+
+
+@dataclass(frozen=True)
+class Stroke:
+    """外描边"""
+    kind: ClassVar[str] = "stroke"
+    color: str = "#FFFFFF"
+    opacity: float = 1.0
+    width: int = 4
+    enabled: bool = True
+
+    def margins(self) -> Tuple[int, int, int, int]:
+        return (self.width,) * 4
+
+
+@dataclass(frozen=True)
+class OuterGlow:
+    """外发光"""
+    kind: ClassVar[str] = "glow"
+    color: str = "#FFD54F"
+    opacity: float = 0.8
+    blur: float = 12.0
+    spread: int = 2
+    enabled: bool = True
+
+    def margins(self) -> Tuple[int, int, int, int]:
+        return (math.ceil(2 * self.blur) + self.spread,) * 4
+
+
+# kind -> 效果类
+EFFECT_TYPES: Dict[str, type] = {
+    DropShadow.kind: DropShadow,
+    Stroke.kind: Stroke,
+    OuterGlow.kind: OuterGlow,
+}
+
+# 绘制顺序（从下到上）
+_PAINT_ORDER = (DropShadow.kind, OuterGlow.kind, Stroke.kind)
+
+
+# ========== 序列化 ==========
+
+def effects_to_list(effects: Iterable) -> List[dict]:
+    """效果元组 -> 字典列表（写入项目文件）"""
+    return [{'type': effect.kind, **asdict(effect)} for effect in effects]
+
+
+def effects_from_list(data: Optional[Iterable]) -> tuple:
+    """字典列表 -> 效果元组（忽略未知类型）"""
+    effects = []
+    for item in data or ():
+        if not isinstance(item, dict):
+            effects.append(item)  # 已是效果对象（来自快照）
+            continue
+        effect_cls = EFFECT_TYPES.get(item.get('type'))
+        if effect_cls is None:
+            continue
+        params = {k: v for k, v in item.items() if k != 'type' and k in effect_cls.__dataclass_fields__}
+        effects.append(effect_cls(**params))
+    return tuple(effects)
+
+
+def find_effect(effects: Iterable, kind: str):
+    """按类型查找效果"""
+    for effect in effects:
+        if effect.kind == kind:
+            return effect
+    return None
+
+
+# ========== 渲染 ==========
+
+def effect_margins(effects: Iterable) -> Tuple[int, int, int, int]:
+    """效果向四周扩展的像素数 (左, 上, 右, 下)"""
+    left = top = right = bottom = 0
+    for effect in effects:
+        if not effect.enabled:
+            continue
+        l, t, r, b = effect.margins()
+        left, top, right, bottom = max(left, l), max(top, t), max(right, r), max(bottom, b)
+    return left, top, right, bottom
+
+
+def _dilate(mask: Image.Image, radius: int) -> Image.Image:
+    """按半径扩展蒙版（多次小核最大值滤波）"""
+    while radius > 0:
+        step = min(radius, 3)
+        mask = mask.filter(ImageFilter.MaxFilter(2 * step + 1))
+        radius -= step
+    return mask
+
+
+def _blur(mask: Image.Image, radius: float) -> Image.Image:
+    """高斯模糊，大半径时在缩小的蒙版上进行"""
+    if radius <= 0:
+        return mask
+    if radius <= DIRECT_BLUR_RADIUS:
+        return mask.filter(ImageFilter.GaussianBlur(radius))
+
+    factor = radius / DIRECT_BLUR_RADIUS
+    small_size = (max(1, round(mask.width / factor)), max(1, round(mask.height / factor)))
+    small = mask.resize(small_size, Image.Resampling.BILINEAR)
+    small = small.filter(ImageFilter.GaussianBlur(DIRECT_BLUR_RADIUS))
+    return small.resize(mask.size, Image.Resampling.BILINEAR)
+
+
+def _effect_mask(alpha: Image.Image, alpha_key: str, spread: int, blur: float) -> Tuple[Image.Image, int]:
+    """扩展 + 模糊后的蒙版（按 alpha 来源和参数缓存），返回 (蒙版, 四周留出的边距)"""
+    extent = math.ceil(2 * blur) + spread
+    key = (alpha_key, alpha.size, spread, blur)
+    mask = cache_manager.get(EFFECT_MASK, key)
+    if mask is not None:
+        return mask, extent
+
+    mask = Image.new("L", (alpha.width + 2 * extent, alpha.height + 2 * extent), 0)
+    mask.paste(alpha, (extent, extent))
+    mask = _blur(_dilate(mask, spread), blur)
+
+    cache_manager.put(EFFECT_MASK, key, mask, image_nbytes(mask))
+    return mask, extent
+
+
+def _colorize(mask: Image.Image, color: str, opacity: float) -> Image.Image:
+    """用纯色填充蒙版"""
+    layer = Image.new("RGBA", mask.size, color)
+    if opacity < 1.0:
+        mask = mask.point(lambda v: int(v * opacity))
+    layer.putalpha(mask)
+    return layer
+
+
+def _composite_at(base: Image.Image, image: Image.Image, x: int, y: int):
+    """在 (x, y) 处叠加图片，超出左上方的部分裁掉"""
+    if x < 0 or y < 0:
+        image = image.crop((max(0, -x), max(0, -y), image.width, image.height))
+        x, y = max(0, x), max(0, y)
+    base.alpha_composite(image, (x, y))
+
+
+def apply_effects(image: Image.Image, dx: int, dy: int, effects: Iterable,
+                  alpha_key: str) -> Tuple[Image.Image, int, int]:
+    """
+    在图层位图下方绘制效果
+
+    Args:
+        image: 图层位图（RGBA）
+        dx, dy: 位图相对图层左上角的偏移
+        effects: 效果列表
+        alpha_key: 位图内容标识，用于缓存模糊蒙版
+
+    Returns:
+        (带效果的位图, 新的 x 偏移, 新的 y 偏移)
+    """
+    active = sorted((e for e in effects if e.enabled), key=lambda e: _PAINT_ORDER.index(e.kind))
+    if not active:
+        return image, dx, dy
+
+    left, top, right, bottom = effect_margins(active)
+    alpha = image.getchannel("A")
+    result = Image.new("RGBA", (image.width + left + right, image.height + top + bottom), (0, 0, 0, 0))
+
+    for effect in active:
+        offset_x = offset_y = 0
+        if isinstance(effect, DropShadow):
+            mask, extent = _effect_mask(alpha, alpha_key, effect.spread, effect.blur)
+            offset_x, offset_y = effect.offset_x, effect.offset_y
+        elif isinstance(effect, OuterGlow):
+            mask, extent = _effect_mask(alpha, alpha_key, effect.spread, effect.blur)
+        else:
+            mask, extent = _effect_mask(alpha, alpha_key, effect.width, 0)
+        # 颜色、偏移、不透明度只影响这一步，调整时蒙版缓存保持有效
+        _composite_at(result, _colorize(mask, effect.color, effect.opacity),
+                      left - extent + offset_x, top - extent + offset_y)
+
+    result.alpha_composite(image, (left, top))
+    return result, dx - left, dy - top
+
+
+def clear_mask_cache():
+    """清空模糊蒙版缓存"""
+    cache_manager.clear(EFFECT_MASK)
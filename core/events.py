@@ -0,0 +1,91 @@
+"""
+图层变更通知 - 图层属性被修改时向订阅者广播变更事件
+
+订阅者（渲染缓存、空间索引等）据此精确失效，而不是轮询或清空全部缓存。
+绑定方法以弱引用保存，订阅对象销毁后自动移除。
+"""
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple
+
+
+Bounds = Tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class LayerChange:
+    """图层变更事件"""
+    layer: Any
+    fields: FrozenSet[str]
+    old_bounds: Optional[Bounds] = None  # 几何属性变化时的旧范围
+    new_bounds: Optional[Bounds] = None  # 几何属性变化时的新范围
+
+    @property
+    def layer_id(self) -> str:
+        return self.layer.id
+
+    @property
+    def content_changed(self) -> bool:
+        """是否影响图层位图（而不只是位置/可见性/旋转/不透明度）"""
+        return not self.fields <= (self.layer._placement_fields | self.layer._transform_fields)
+
+    @property
+    def bounds_changed(self) -> bool:
+        return self.old_bounds is not None and self.old_bounds != self.new_bounds
+
+
+class LayerEventBus:
+    """图层变更事件总线"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[], Optional[Callable]]] = []
+        self._suspended = 0
+
+    @property
+    def active(self) -> bool:
+        """是否需要派发事件"""
+        return bool(self._subscribers) and not self._suspended
+
+    def subscribe(self, callback: Callable[[LayerChange], None]):
+        """订阅变更事件（绑定方法以弱引用保存）"""
+        if hasattr(callback, '__self__'):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        self._subscribers.append(ref)
+
+    def unsubscribe(self, callback: Callable[[LayerChange], None]):
+        """取消订阅"""
+        self._subscribers = [ref for ref in self._subscribers
+                             if ref() is not None and ref() != callback]
+
+    def emit(self, change: LayerChange):
+        """派发事件"""
+        if self._suspended:
+            return
+        dead = False
+        for ref in list(self._subscribers):
+            callback = ref()
+            if callback is None:
+                dead = True
+                continue
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"图层变更回调失败: {e}")
+        if dead:
+            self._subscribers = [ref for ref in self._subscribers if ref() is not None]
+
+    @contextmanager
+    def suspended(self):
+        """批量修改期间暂停派发"""
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+
+# 全局实例
+layer_events = LayerEventBus()
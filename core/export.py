@@ -9,6 +9,7 @@ from dataclasses import dataclass
 import sys
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
 from config import ExportConfig
+from .cache import cache_manager, image_nbytes, EXPORT
 
 
 @dataclass
@@ -25,6 +26,16 @@ class Exporter:
     def __init__(self, canvas):
         self.canvas = canvas
     
+    def _render_screen_cached(self, screen) -> Image.Image:
+        """渲染分屏，内容未变化时直接复用上次结果（按分屏指纹缓存）"""
+        fp = self.canvas.get_screen_fingerprint(screen.id)
+        img = cache_manager.get(EXPORT, fp)
+        if img is None:
+            img = self.canvas.render_screen(screen.id)
+            if img is not None:
+                cache_manager.put(EXPORT, fp, img, image_nbytes(img))
+        return img
+    
     def export_screens(self, output_dir: str, platform: str = "taobao", 
                        quality: int = 95) -> ExportResult:
         """按分屏导出"""
@@ -43,7 +54,7 @@ class Exporter:
                     continue
                 
                 screen_num += 1
-                screen_img = self.canvas.render_screen(screen.id)
+                screen_img = self._render_screen_cached(screen)
                 
                 if screen_img is None:
                     continue
@@ -0,0 +1,54 @@
+"""
+内容指纹 - 图层 / 分屏 / 画布的稳定哈希（Merkle 结构）
+
+- 图层内容指纹：影响图层位图的全部属性 + 像素来源（不含合成时应用的旋转和透明度）
+- 图层指纹：内容指纹 + 位置、旋转、透明度和可见性
+- 分屏指纹：与该分屏相交的图层（相对分屏顶部的位置）
+- 画布指纹：各分屏指纹
+
+渲染缓存、导出缓存等统一使用这些指纹作为失效键。
+"""
+import hashlib
+from typing import Iterable
+
+
+def digest(*parts) -> str:
+    """对基础类型组成的值计算稳定哈希（跨进程一致）"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def digest_bytes(data: bytes) -> str:
+    """对原始字节计算哈希（用于像素数据）"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def screen_layers(layers: Iterable, top: int, bottom: int) -> list:
+    """与 [top, bottom) 垂直区间相交的可见图层（保持图层顺序）"""
+    result = []
+    for layer in layers:
+        if not layer.visible:
+            continue
+        _, y0, _, y1 = layer.get_render_bounds()
+        if y0 < bottom and y1 > top:
+            result.append(layer)
+    return result
+
+
+def screen_fingerprint(canvas, screen, top: int) -> str:
+    """分屏指纹"""
+    bottom = top + screen.height
+    entries = tuple(
+        (layer.content_fingerprint(), layer.x, layer.y - top, layer.rotation, layer.opacity)
+        for layer in screen_layers(canvas.layers, top, bottom)
+    )
+    return digest(canvas.width, canvas.background_color, screen.height, screen.is_blank, entries)
+
+
+def canvas_fingerprint(canvas) -> str:
+    """画布指纹"""
+    screen_fps = []
+    top = 0
+    for screen in canvas.screens:
+        screen_fps.append(screen_fingerprint(canvas, screen, top))
+        top += screen.height
+    return digest(canvas.width, canvas.background_color, tuple(screen_fps))
@@ -1,28 +1,39 @@
 """
 历史记录管理 - 撤销/重做功能
 """
-from typing import List, Optional
+from typing import List, Optional, Any
 from dataclasses import dataclass
 import copy
 
+from .serializer import snapshot_canvas, restore_canvas
+
 
 @dataclass
 class HistoryState:
     """历史状态"""
     action_name: str
-    state_data: dict
+    state_data: Any
 
 
 class HistoryManager:
     """历史记录管理器"""
     
-    def __init__(self, max_history: int = 50):
+    def __init__(self, max_history: int = 50, copy_states: bool = True):
+        """
+        Args:
+            max_history: 最大历史记录数
+            copy_states: 是否深拷贝状态数据；状态为不可变快照时可关闭
+        """
         self.max_history = max_history
+        self.copy_states = copy_states
         self._history: List[HistoryState] = []
         self._current_index: int = -1
         self._is_recording: bool = True
     
-    def push(self, action_name: str, state_data: dict):
+    def _copy(self, state_data):
+        return copy.deepcopy(state_data) if self.copy_states else state_data
+    
+    def push(self, action_name: str, state_data):
         """记录新状态"""
         if not self._is_recording:
             return
@@ -32,7 +43,7 @@ class HistoryManager:
         
         state = HistoryState(
             action_name=action_name,
-            state_data=copy.deepcopy(state_data)
+            state_data=self._copy(state_data)
         )
         
         self._history.append(state)
@@ -42,18 +53,18 @@ class HistoryManager:
             self._history.pop(0)
             self._current_index -= 1
     
-    def undo(self) -> Optional[dict]:
+    def undo(self):
         """撤销"""
         if self._current_index > 0:
             self._current_index -= 1
-            return copy.deepcopy(self._history[self._current_index].state_data)
+            return self._copy(self._history[self._current_index].state_data)
         return None
     
-    def redo(self) -> Optional[dict]:
+    def redo(self):
         """重做"""
         if self._current_index < len(self._history) - 1:
             self._current_index += 1
-            return copy.deepcopy(self._history[self._current_index].state_data)
+            return self._copy(self._history[self._current_index].state_data)
         return None
     
     def can_undo(self) -> bool:
@@ -88,13 +99,13 @@ class CanvasHistoryManager:
     
     def __init__(self, canvas, max_history: int = 50):
         self.canvas = canvas
-        self.history = HistoryManager(max_history)
+        # 快照为不可变元组，无需深拷贝
+        self.history = HistoryManager(max_history, copy_states=False)
         self.save_state("初始状态")
     
     def save_state(self, action_name: str):
         """保存当前画布状态"""
-        state_data = self.canvas.to_dict()
-        self.history.push(action_name, state_data)
+        self.history.push(action_name, snapshot_canvas(self.canvas))
     
     def undo(self) -> bool:
         """撤销"""
@@ -112,28 +123,10 @@ class CanvasHistoryManager:
             return True
         return False
     
-    def _restore_state(self, state_data: dict):
+    def _restore_state(self, state_data):
         """恢复画布状态"""
-        from .layer import create_layer_from_dict
-        from .canvas import Screen
-        
         self.history.pause_recording()
-        
-        self.canvas.width = state_data.get('width', 750)
-        self.canvas.height = state_data.get('height', 1000)
-        self.canvas.background_color = state_data.get('background_color', '#FFFFFF')
-        self.canvas.selected_layer_id = state_data.get('selected_layer_id')
-        
-        self.canvas.layers = []
-        for layer_data in state_data.get('layers', []):
-            layer = create_layer_from_dict(layer_data)
-            self.canvas.layers.append(layer)
-        
-        self.canvas.screens = []
-        for screen_data in state_data.get('screens', []):
-            screen = Screen.from_dict(screen_data)
-            self.canvas.screens.append(screen)
-        
+        restore_canvas(self.canvas, state_data)
         self.history.resume_recording()
     
     def can_undo(self) -> bool:
@@ -1,21 +1,45 @@
 """
 图层基类和通用图层类型
 """
-from dataclasses import dataclass, field
-from typing import Optional, Tuple, Any
+from dataclasses import dataclass, field, fields, MISSING
+from concurrent.futures import Future
+from typing import Optional, Tuple, Any, ClassVar, Dict, List, Iterable, Iterator
 from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+import math
 import uuid
 import os
 
+from .fingerprint import digest, digest_bytes
+from .events import layer_events, LayerChange
+from .effects import apply_effects, effect_margins, effects_to_list, effects_from_list
+from .adjustments import Adjustments, apply_adjustments
+from .cache import cache_manager, image_nbytes, RENDER, BASE, HIT_MASK
+
 
 # 图片导入最大尺寸限制
 MAX_IMPORT_WIDTH = 600  # 最大宽度（画布宽度750的80%）
 MAX_IMPORT_HEIGHT = 800  # 最大高度
 
+# 命中测试：每位对应 HIT_BLOCK×HIT_BLOCK 像素块，块内最大 alpha 超过阈值即可点中
+HIT_BLOCK = 4
+HIT_ALPHA_THRESHOLD = 16
+
+# 各图层类的可序列化字段名缓存
+_SCHEMA_CACHE: Dict[type, Tuple[str, ...]] = {}
+_RENDER_SCHEMA_CACHE: Dict[type, Tuple[str, ...]] = {}
+# 各图层类的全部字段 (名称, 默认值, 默认值工厂)
+_FIELD_DEFAULTS_CACHE: Dict[type, Tuple[Tuple[str, Any, Any], ...]] = {}
+
 
-@dataclass
+@dataclass(slots=True)
 class Layer:
-    """图层基类"""
+    """图层基类
+
+    使用 __slots__ 存储属性；下划线开头的字段为运行时状态，不参与序列化。
+    构造完成后，对公开属性的赋值会记录脏标记并通过 layer_events 广播变更。
+    """
+    _observed: bool = field(default=False, init=False, repr=False, compare=False)
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     name: str = "图层"
     x: int = 0
@@ -27,19 +51,307 @@ class Layer:
     visible: bool = True
     locked: bool = False
     layer_type: str = "base"
+    _dirty: set = field(default_factory=set, init=False, repr=False, compare=False)
+    _content_fp: str = field(default="", init=False, repr=False, compare=False)
+    _parent: Optional['Layer'] = field(default=None, init=False, repr=False, compare=False)
+    
+    # from_dict 缺省值（覆盖字段默认值）
+    _dict_defaults: ClassVar[Dict[str, Any]] = {}
+    # 不影响图层位图内容的字段（位置、可见性等）
+    _placement_fields: ClassVar[frozenset] = frozenset({'id', 'name', 'x', 'y', 'visible', 'locked'})
+    # 合成时才应用的变换（不进入位图缓存）
+    _transform_fields: ClassVar[frozenset] = frozenset({'rotation', 'opacity'})
+    # 影响图层范围的字段
+    _geometry_fields: ClassVar[frozenset] = frozenset({'x', 'y', 'width', 'height', 'rotation', 'effects'})
+    # 命中测试是否按像素 alpha 判断（否则整个图层框都可点中）
+    _hit_alpha: ClassVar[bool] = True
+    
+    def __post_init__(self):
+        # 构造阶段的赋值不产生变更事件
+        self._observed = True
+    
+    def __setattr__(self, name: str, value):
+        if name[0] == '_' or not self._observed:
+            object.__setattr__(self, name, value)
+            return
+        
+        old = getattr(self, name)
+        if old is value or old == value:
+            object.__setattr__(self, name, value)
+            return
+        
+        old_bounds = self.get_render_bounds() if name in self._geometry_fields else None
+        object.__setattr__(self, name, value)
+        self._mark_changed(frozenset((name,)), old_bounds)
+    
+    def _mark_changed(self, changed: frozenset, old_bounds=None):
+        """记录脏标记、失效内容缓存并广播变更"""
+        self._dirty.update(changed)
+        if not changed <= self._placement_fields | self._transform_fields:
+            self._content_fp = ""
+            self._on_content_changed()
+        if layer_events.active:
+            new_bounds = self.get_render_bounds() if old_bounds is not None else None
+            layer_events.emit(LayerChange(self, changed, old_bounds, new_bounds))
+        # 子图层的任何变化都会改变所在组的合成结果
+        if self._parent is not None:
+            self._parent._mark_changed(frozenset(('children',)))
+    
+    def _on_content_changed(self):
+        """位图相关属性变化时调用，子类用于释放渲染缓存"""
+        pass
+    
+    def touch(self, *changed: str):
+        """通知非属性状态（如像素数据）发生了变化"""
+        self._mark_changed(frozenset(changed))
+    
+    def pop_dirty(self) -> set:
+        """取出并清空自上次调用以来修改过的属性（暂停广播期间的修改也会记录）
+
+        供增量保存等按图层轮询的使用者；需要即时通知的订阅者使用 layer_events，
+        事件的 LayerChange.fields 即本次修改的属性。
+        """
+        dirty = self._dirty
+        self._dirty = set()
+        return dirty
+    
+    def clone(self, **changes) -> 'Layer':
+        """复制图层（新 id）
+
+        像素缓冲和渲染缓存与原图层共享：它们只会被整体替换、从不原地修改，
+        任一副本被编辑时会换上自己的新缓冲，其余副本不受影响。
+        """
+        new = object.__new__(type(self))
+        for f in fields(self):
+            object.__setattr__(new, f.name, getattr(self, f.name))
+        new._dirty = set()
+        new._parent = None
+        object.__setattr__(new, 'id', str(uuid.uuid4()))
+        new._copy_children()
+        for name, value in changes.items():
+            setattr(new, name, value)
+        return new
+    
+    def _copy_children(self):
+        """clone 时复制子对象，子类覆盖"""
+        pass
+    
+    @classmethod
+    def schema(cls) -> Tuple[str, ...]:
+        """可序列化字段名（按字段声明顺序）"""
+        names = _SCHEMA_CACHE.get(cls)
+        if names is None:
+            names = tuple(f.name for f in fields(cls) if not f.name.startswith('_'))
+            _SCHEMA_CACHE[cls] = names
+        return names
+    
+    @classmethod
+    def from_fields(cls, values: Dict[str, Any]) -> 'Layer':
+        """按字段值直接构造，缺少的字段取默认值（反序列化用）
+
+        结果与 cls(**values) 相同，但不经过 __init__ 中逐字段调用 __setattr__ 的赋值。
+        """
+        defaults = _FIELD_DEFAULTS_CACHE.get(cls)
+        if defaults is None:
+            defaults = tuple(
+                (f.name, f.default, None if f.default_factory is MISSING else f.default_factory)
+                for f in fields(cls)
+            )
+            _FIELD_DEFAULTS_CACHE[cls] = defaults
+        layer = object.__new__(cls)
+        set_field = object.__setattr__
+        for name, default, factory in defaults:
+            if name in values:
+                set_field(layer, name, values[name])
+            elif factory is None:
+                set_field(layer, name, default)
+            else:
+                set_field(layer, name, factory())
+        layer.__post_init__()
+        return layer
+    
+    @classmethod
+    def render_schema(cls) -> Tuple[str, ...]:
+        """影响图层位图的字段名（不含位置和合成时变换）"""
+        names = _RENDER_SCHEMA_CACHE.get(cls)
+        if names is None:
+            excluded = cls._placement_fields | cls._transform_fields
+            names = tuple(n for n in cls.schema() if n not in excluded)
+            _RENDER_SCHEMA_CACHE[cls] = names
+        return names
+    
+    def pixel_source(self) -> str:
+        """像素来源标识，子类覆盖"""
+        return ""
+    
+    def content_fingerprint(self) -> str:
+        """内容指纹：图层位图相关属性 + 像素来源（属性变化前一直复用）"""
+        fp = self._content_fp
+        if not fp:
+            fp = digest(tuple(getattr(self, n) for n in self.render_schema()), self.pixel_source())
+            self._content_fp = fp
+        return fp
+    
+    def fingerprint(self) -> str:
+        """图层指纹：内容指纹 + 位置、变换和可见性"""
+        return digest(self.content_fingerprint(), self.x, self.y, self.rotation, self.opacity, self.visible)
     
     def render(self, scale: float = 1.0) -> Optional[Image.Image]:
         """渲染图层，子类实现"""
         return None
     
+    def render_with_offset(self, scale: float = 1.0) -> Tuple[Optional[Image.Image], int, int]:
+        """渲染图层，返回 (位图, x 偏移, y 偏移)
+
+        位图未旋转、未应用透明度，可能只覆盖图层的一部分（或因效果向外扩展）。
+        """
+        return self.render(scale), 0, 0
+    
+    def composite_into(self, dest: Image.Image, offset_x: int = 0, offset_y: int = 0,
+                       scale: float = 1.0):
+        """
+        将图层合成到 dest 上，合成时应用缩放、旋转（绕图层中心）和透明度
+        
+        Args:
+            dest: RGBA 目标图片
+            offset_x, offset_y: dest 左上角在缩放后画布中的像素坐标
+            scale: 缩放比例
+        """
+        img, dx, dy = self.render_with_offset(scale)
+        if img is None:
+            return
+        
+        if scale != 1.0:
+            new_w = int(img.width * scale)
+            new_h = int(img.height * scale)
+            if new_w <= 0 or new_h <= 0:
+                return
+            img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        x = int((self.x + dx) * scale) - offset_x
+        y = int((self.y + dy) * scale) - offset_y
+        
+        if self.rotation % 360 != 0:
+            # 位图中心绕图层中心旋转，旋转后按新中心放置
+            cx = (self.x + self.width / 2) * scale - offset_x
+            cy = (self.y + self.height / 2) * scale - offset_y
+            vx = x + img.width / 2 - cx
+            vy = y + img.height / 2 - cy
+            rad = math.radians(self.rotation)
+            cos, sin = math.cos(rad), math.sin(rad)
+            img = img.rotate(-self.rotation, expand=True, resample=Image.Resampling.BICUBIC)
+            x = round(cx + vx * cos - vy * sin - img.width / 2)
+            y = round(cy + vx * sin + vy * cos - img.height / 2)
+        
+        img = self._apply_opacity(img)
+        if x < 0 or y < 0:
+            img = img.crop((max(0, -x), max(0, -y), img.width, img.height))
+            x, y = max(0, x), max(0, y)
+        if x >= dest.width or y >= dest.height or img.width == 0 or img.height == 0:
+            return
+        try:
+            dest.alpha_composite(img, (x, y))
+        except Exception as e:
+            print(f"渲染图层失败: {e}")
+    
+    def _apply_effects(self, img: Image.Image, dx: int, dy: int) -> Tuple[Image.Image, int, int]:
+        """叠加图层效果（投影、描边、外发光），没有效果的图层原样返回"""
+        effects = getattr(self, 'effects', ())
+        if not effects:
+            return img, dx, dy
+        alpha_key = digest(
+            tuple(getattr(self, n) for n in self.render_schema() if n not in ('effects', 'adjustments')),
+            self.pixel_source(),
+        )
+        return apply_effects(img, dx, dy, effects, alpha_key)
+    
+    def _apply_opacity(self, img: Image.Image) -> Image.Image:
+        """应用图层透明度（合成时调用，返回新位图，不修改缓存中的位图）"""
+        if self.opacity >= 1.0:
+            return img
+        alpha = img.getchannel("A")
+        alpha = alpha.point(lambda x: int(x * self.opacity))
+        img = img.copy()
+        img.putalpha(alpha)
+        return img
+    
+    def _fit_to_box(self, img: Optional[Image.Image], dx: int, dy: int) -> Optional[Image.Image]:
+        """把带偏移的位图放回从图层左上角开始的完整位图（超出左上方的效果被裁掉）"""
+        if img is None or (dx == 0 and dy == 0 and img.size == (self.width, self.height)):
+            return img
+        size = (max(self.width, dx + img.width), max(self.height, dy + img.height))
+        full = Image.new("RGBA", size, (0, 0, 0, 0))
+        full.paste(img, (dx, dy))
+        return full
+    
+    def is_decoding(self) -> bool:
+        """是否有图片仍在后台解码"""
+        return False
+    
     def get_bounds(self) -> Tuple[int, int, int, int]:
         """获取边界框 (x, y, x+width, y+height)"""
         return (self.x, self.y, self.x + self.width, self.y + self.height)
     
-    def contains_point(self, px: int, py: int) -> bool:
-        """检查点是否在图层内"""
-        return (self.x <= px <= self.x + self.width and 
-                self.y <= py <= self.y + self.height)
+    def get_render_bounds(self) -> Tuple[int, int, int, int]:
+        """渲染后实际覆盖的范围（图层效果向外扩展，旋转时取绕中心旋转后的外接框）"""
+        x0, y0, x1, y1 = self.get_bounds()
+        effects = getattr(self, 'effects', ())
+        if effects:
+            left, top, right, bottom = effect_margins(effects)
+            x0, y0, x1, y1 = x0 - left, y0 - top, x1 + right, y1 + bottom
+        if self.rotation % 360 == 0:
+            return (x0, y0, x1, y1)
+        
+        cx = self.x + self.width / 2
+        cy = self.y + self.height / 2
+        rad = math.radians(self.rotation)
+        cos, sin = abs(math.cos(rad)), abs(math.sin(rad))
+        # 外接框相对中心的半宽/半高（效果可能使位图不对称）
+        half_w = max(cx - x0, x1 - cx)
+        half_h = max(cy - y0, y1 - cy)
+        ex = half_w * cos + half_h * sin
+        ey = half_w * sin + half_h * cos
+        return (math.floor(cx - ex), math.floor(cy - ey), math.ceil(cx + ex), math.ceil(cy + ey))
+    
+    def to_local(self, px: float, py: float) -> Tuple[float, float]:
+        """画布坐标转为图层局部坐标（相对图层左上角，抵消绕中心的旋转）"""
+        lx, ly = px - self.x, py - self.y
+        if self.rotation % 360 != 0:
+            cx, cy = self.width / 2, self.height / 2
+            rad = math.radians(self.rotation)
+            cos, sin = math.cos(rad), math.sin(rad)
+            vx, vy = lx - cx, ly - cy
+            lx = cx + vx * cos + vy * sin
+            ly = cy - vx * sin + vy * cos
+        return lx, ly
+    
+    def contains_point(self, px: float, py: float) -> bool:
+        """命中测试：点落在旋转后的图层框内，且该处位图不透明"""
+        lx, ly = self.to_local(px, py)
+        if not (0 <= lx <= self.width and 0 <= ly <= self.height):
+            return False
+        if not self._hit_alpha or self.is_decoding():
+            return True
+        hit = self.hit_mask()
+        if hit is None:
+            return True
+        bits, dx, dy = hit
+        bx = int((lx - dx) // HIT_BLOCK)
+        by = int((ly - dy) // HIT_BLOCK)
+        if bx < 0 or by < 0 or by >= bits.shape[0] or (bx >> 3) >= bits.shape[1]:
+            return False
+        return bool(bits[by, bx >> 3] & (0x80 >> (bx & 7)))
+    
+    def hit_mask(self) -> Optional[Tuple[np.ndarray, int, int]]:
+        """命中位图 (按位打包的块数组, x 偏移, y 偏移)，按内容指纹缓存"""
+        key = self.content_fingerprint()
+        cached = cache_manager.get(HIT_MASK, key)
+        if cached is None:
+            img, dx, dy = self.render_with_offset()
+            if img is None:
+                return None
+            cached = (build_hit_mask(img), dx, dy)
+            cache_manager.put(HIT_MASK, key, cached, cached[0].nbytes)
+        return cached
     
     def move(self, dx: int, dy: int):
         """移动图层"""
@@ -53,66 +365,204 @@ class Layer:
     
     def to_dict(self) -> dict:
         """转换为字典"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'x': self.x,
-            'y': self.y,
-            'width': self.width,
-            'height': self.height,
-            'rotation': self.rotation,
-            'opacity': self.opacity,
-            'visible': self.visible,
-            'locked': self.locked,
-            'layer_type': self.layer_type,
-        }
+        data = {name: getattr(self, name) for name in self.schema()}
+        if 'effects' in data:
+            data['effects'] = effects_to_list(data['effects'])
+        if data.get('adjustments') is not None:
+            data['adjustments'] = data['adjustments'].to_dict()
+        return data
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Layer':
         """从字典创建"""
-        return cls(
-            id=data.get('id', str(uuid.uuid4())),
-            name=data.get('name', '图层'),
-            x=data.get('x', 0),
-            y=data.get('y', 0),
-            width=data.get('width', 100),
-            height=data.get('height', 100),
-            rotation=data.get('rotation', 0.0),
-            opacity=data.get('opacity', 1.0),
-            visible=data.get('visible', True),
-            locked=data.get('locked', False),
-            layer_type=data.get('layer_type', 'base'),
-        )
+        kwargs = {name: data[name] for name in cls.schema() if name in data}
+        if 'effects' in kwargs:
+            kwargs['effects'] = effects_from_list(kwargs['effects'])
+        if 'adjustments' in kwargs:
+            kwargs['adjustments'] = Adjustments.from_dict(kwargs['adjustments'])
+        for name, value in cls._dict_defaults.items():
+            kwargs.setdefault(name, value)
+        if cls is not Layer:
+            # 子类的 layer_type 由类本身决定
+            kwargs.pop('layer_type', None)
+        return cls.from_fields(kwargs)
+
 
+def build_hit_mask(image: Image.Image) -> np.ndarray:
+    """按 HIT_BLOCK×HIT_BLOCK 块降采样 alpha，每块 1 位（np.packbits 按行打包）"""
+    h, w = image.height, image.width
+    bh, bw = -(-h // HIT_BLOCK), -(-w // HIT_BLOCK)
+    if "A" not in image.getbands():
+        return np.packbits(np.ones((bh, bw), dtype=bool), axis=1)
+    alpha = np.zeros((bh * HIT_BLOCK, bw * HIT_BLOCK), dtype=np.uint8)
+    alpha[:h, :w] = np.asarray(image.getchannel("A"))
+    blocks = alpha.reshape(bh, HIT_BLOCK, bw, HIT_BLOCK).max(axis=(1, 3)) > HIT_ALPHA_THRESHOLD
+    return np.packbits(blocks, axis=1)
 
-@dataclass
+
+def trim_transparent(image: Image.Image) -> Tuple[Image.Image, Tuple[int, int]]:
+    """裁掉 RGBA 图片四周的全透明边距，返回 (裁剪后的图片, 左上角偏移)
+
+    没有透明边距时原样返回，不复制像素；完全透明时保留 1×1 像素。
+    """
+    alpha = np.asarray(image.getchannel("A"))
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return image.crop((0, 0, 1, 1)), (0, 0)
+    cols = np.flatnonzero(alpha.any(axis=0))
+    left, top = int(cols[0]), int(rows[0])
+    right, bottom = int(cols[-1]) + 1, int(rows[-1]) + 1
+    if (left, top, right, bottom) == (0, 0, image.width, image.height):
+        return image, (0, 0)
+    return image.crop((left, top, right, bottom)), (left, top)
+
+
+@dataclass(slots=True)
 class ImageLayer(Layer):
-    """图片图层"""
+    """图片图层
+
+    位图只保存裁掉透明边距后的部分（_image）及其在原图中的偏移，
+    图层的逻辑宽高仍对应完整原图。
+    """
     image_path: str = ""
+    effects: tuple = ()  # 图层效果（core.effects 中的效果对象）
+    adjustments: Optional[Adjustments] = None  # 非破坏性调整参数
     _image: Optional[Image.Image] = field(default=None, repr=False)
-    _render_cache: Optional[Image.Image] = field(default=None, repr=False)
-    _cache_key: str = field(default="", repr=False)
+    _trim_offset: Tuple[int, int] = field(default=(0, 0), repr=False)
+    _source_size: Tuple[int, int] = field(default=(0, 0), repr=False)
+    _decode_future: Optional[Future] = field(default=None, repr=False)
+    _pixel_token: str = field(default="", repr=False)
+    _pixels_in_memory: bool = field(default=False, repr=False)  # 像素由 set_image 设置（不来自文件）
     layer_type: str = "image"
     
     def __post_init__(self):
         if self.name == "图层":
             self.name = "图片图层"
+        Layer.__post_init__(self)
+    
+    @staticmethod
+    def decode_file(image_path: str) -> Image.Image:
+        """解码图片文件（线程安全，可在工作线程中调用）
+        
+        只解码像素，不修改图层尺寸；超大图片按导入上限缩小以节省内存
+        """
+        with Image.open(image_path) as src:
+            src.draft("RGB", (MAX_IMPORT_WIDTH, MAX_IMPORT_HEIGHT))
+            image = src.convert("RGBA")
+        if image.width > MAX_IMPORT_WIDTH or image.height > MAX_IMPORT_HEIGHT:
+            ratio = min(MAX_IMPORT_WIDTH / image.width, MAX_IMPORT_HEIGHT / image.height)
+            new_size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+        return image
+    
+    @staticmethod
+    def decode_trimmed(image_path: str) -> Tuple[Image.Image, Tuple[int, int], Tuple[int, int]]:
+        """解码并裁掉透明边距，返回 (位图, 偏移, 原图尺寸)（可在工作线程中调用）"""
+        image = ImageLayer.decode_file(image_path)
+        trimmed, offset = trim_transparent(image)
+        return trimmed, offset, image.size
+    
+    def _store_image(self, image: Image.Image):
+        """保存完整位图：裁掉透明边距并记录偏移"""
+        self._image, self._trim_offset = trim_transparent(image)
+        self._source_size = image.size
+    
+    def needs_decode(self) -> bool:
+        """是否需要解码（未加载且没有进行中的解码任务）"""
+        return (self._image is None and self._decode_future is None
+                and bool(self.image_path) and os.path.exists(self.image_path))
+    
+    def adopt_pixels(self, other: 'ImageLayer') -> bool:
+        """像素来源相同时沿用 other 已解码（或正在解码）的位图，不必重新解码（已有位图时不处理）"""
+        if self._image is not None or other.pixel_source() != self.pixel_source():
+            return False
+        self._image = other._image
+        self._trim_offset = other._trim_offset
+        self._source_size = other._source_size
+        self._decode_future = other._decode_future
+        return True
+    
+    def pixel_state(self) -> Optional[tuple]:
+        """set_image 设置的像素：(像素来源, 位图, 偏移, 原图尺寸)，供撤销快照引用
+
+        位图只会被整体替换、从不原地修改，快照保存引用即可；来自文件的像素返回 None。
+        """
+        if not self._pixels_in_memory:
+            return None
+        return (self._pixel_token, self._image, self._trim_offset, self._source_size)
+    
+    def restore_pixel_state(self, state: tuple):
+        """恢复 pixel_state() 保存的像素（构造后调用，不产生变更事件）"""
+        self._pixel_token, self._image, self._trim_offset, self._source_size = state
+        self._pixels_in_memory = True
+    
+    def attach_decode_future(self, future: Future):
+        """关联后台解码任务（结果为 decode_trimmed 的返回值）"""
+        self._decode_future = future
+    
+    def is_decoding(self) -> bool:
+        """后台解码是否仍在进行"""
+        return self._decode_future is not None and not self._decode_future.done()
+    
+    def ensure_image(self) -> Optional[Image.Image]:
+        """确保图片已解码（后台解码未完成时等待结果），返回裁剪后的位图"""
+        if self._image is not None:
+            return self._image
+        
+        future = self._decode_future
+        decoded = None
+        if future is not None:
+            self._decode_future = None
+            try:
+                decoded = future.result()
+            except Exception as e:
+                print(f"加载图片失败: {e}")
+        elif self.image_path and os.path.exists(self.image_path):
+            try:
+                decoded = self.decode_trimmed(self.image_path)
+            except Exception as e:
+                print(f"加载图片失败: {e}")
+        
+        if decoded is not None:
+            self._image, self._trim_offset, self._source_size = decoded
+        return self._image
+    
+    def pixel_nbytes(self) -> int:
+        """已解码的像素缓冲占用的字节数（不计渲染缓存）"""
+        return image_nbytes(self._image)
     
-    def _invalidate_cache(self):
-        """清除缓存"""
-        self._render_cache = None
-        self._cache_key = ""
+    def get_image(self) -> Optional[Image.Image]:
+        """完整位图（含透明边距），供抠图、增强等工具使用"""
+        if self.ensure_image() is None:
+            return None
+        if self._image.size == self._source_size:
+            return self._image
+        full = Image.new("RGBA", self._source_size, (0, 0, 0, 0))
+        full.paste(self._image, self._trim_offset)
+        return full
     
     def _get_cache_key(self) -> str:
         """生成缓存键"""
-        return f"{self.width}_{self.height}_{self.rotation}_{self.opacity}"
+        return self.content_fingerprint()
+    
+    def pixel_source(self) -> str:
+        """像素来源：文件路径 + 修改时间，或内存图片的像素哈希"""
+        if not self._pixel_token and self.image_path:
+            try:
+                st = os.stat(self.image_path)
+                self._pixel_token = digest(self.image_path, st.st_mtime_ns, st.st_size)
+            except OSError:
+                self._pixel_token = digest(self.image_path)
+        return self._pixel_token
     
     def load_image(self, auto_resize: bool = True) -> bool:
         """加载图片，可选自动缩放到合适尺寸"""
         if self.image_path and os.path.exists(self.image_path):
             try:
-                self._image = Image.open(self.image_path).convert("RGBA")
-                orig_w, orig_h = self._image.width, self._image.height
+                image = Image.open(self.image_path).convert("RGBA")
+                self._pixel_token = ""
+                self._pixels_in_memory = False
+                orig_w, orig_h = image.width, image.height
                 
                 # 自动缩放大图
                 if auto_resize and (orig_w > MAX_IMPORT_WIDTH or orig_h > MAX_IMPORT_HEIGHT):
@@ -123,14 +573,13 @@ class ImageLayer(Layer):
                     new_w = int(orig_w * ratio)
                     new_h = int(orig_h * ratio)
                     
-                    self._image = self._image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                    self.width = new_w
-                    self.height = new_h
-                else:
-                    self.width = self._image.width
-                    self.height = self._image.height
+                    image = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
                 
-                self._invalidate_cache()
+                self._store_image(image)
+                self.width = image.width
+                self.height = image.height
+                
+                self.touch('pixels')
                 return True
             except Exception as e:
                 print(f"加载图片失败: {e}")
@@ -138,8 +587,8 @@ class ImageLayer(Layer):
     
     def set_image(self, image: Image.Image, auto_resize: bool = True):
         """直接设置图片，可选自动缩放"""
-        self._image = image.convert("RGBA")
-        orig_w, orig_h = self._image.width, self._image.height
+        image = image.convert("RGBA")
+        orig_w, orig_h = image.width, image.height
         
         # 自动缩放大图
         if auto_resize and (orig_w > MAX_IMPORT_WIDTH or orig_h > MAX_IMPORT_HEIGHT):
@@ -150,74 +599,73 @@ class ImageLayer(Layer):
             new_w = int(orig_w * ratio)
             new_h = int(orig_h * ratio)
             
-            self._image = self._image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            self.width = new_w
-            self.height = new_h
-        else:
-            self.width = self._image.width
-            self.height = self._image.height
+            image = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        
+        self._store_image(image)
+        self._pixel_token = digest(digest_bytes(self._image.tobytes()),
+                                   self._trim_offset, self._source_size)
+        self._pixels_in_memory = True
+        self.width = image.width
+        self.height = image.height
         
-        self._invalidate_cache()
+        self.touch('pixels')
     
-    def render(self, scale: float = 1.0) -> Optional[Image.Image]:
-        """渲染图片图层（带缓存）"""
-        if self._image is None:
-            self.load_image()
+    def _render_base(self) -> Tuple[Image.Image, int, int]:
+        """缩放后的位图（未调整）
+
+        有调整参数时缓存该结果，拖动调整滑块只需重新应用查找表，不必重新缩放。
+        """
+        base_key = (self.width, self.height, self.pixel_source())
+        cached = cache_manager.get(BASE, base_key)
+        if cached is not None:
+            return cached
         
-        if self._image is None:
-            return None
+        src_w, src_h = self._source_size
+        sx = self.width / src_w
+        sy = self.height / src_h
+        left, top = self._trim_offset
+        
+        # 缩放（只处理非透明区域）
+        img = self._image
+        target = (max(1, round(img.width * sx)), max(1, round(img.height * sy)))
+        if img.size != target:
+            img = img.resize(target, Image.Resampling.LANCZOS)
+        dx, dy = round(left * sx), round(top * sy)
+        
+        if self.adjustments is not None:
+            cache_manager.put(BASE, base_key, (img, dx, dy), image_nbytes(img))
+        return img, dx, dy
+    
+    def render_with_offset(self, scale: float = 1.0) -> Tuple[Optional[Image.Image], int, int]:
+        """渲染裁剪后的位图（带缓存），返回 (位图, x 偏移, y 偏移)"""
+        if self.ensure_image() is None:
+            return None, 0, 0
         
         # 检查缓存
         cache_key = self._get_cache_key()
-        if self._render_cache is not None and self._cache_key == cache_key:
-            return self._render_cache
+        cached = cache_manager.get(RENDER, cache_key)
+        if cached is not None:
+            return cached
         
-        # 缩放
-        if self.width != self._image.width or self.height != self._image.height:
-            img = self._image.resize((self.width, self.height), Image.Resampling.LANCZOS)
-        else:
-            img = self._image.copy()
+        img, dx, dy = self._render_base()
         
-        # 旋转
-        if self.rotation != 0:
-            img = img.rotate(-self.rotation, expand=True, resample=Image.Resampling.BICUBIC)
+        # 调整（查找表 / 颜色矩阵 / 锐化）
+        img = apply_adjustments(img, self.adjustments)
         
-        # 透明度
-        if self.opacity < 1.0:
-            alpha = img.split()[3]
-            alpha = alpha.point(lambda x: int(x * self.opacity))
-            img.putalpha(alpha)
+        # 图层效果（旋转和透明度在合成时应用）
+        img, dx, dy = self._apply_effects(img, dx, dy)
         
         # 更新缓存
-        self._render_cache = img
-        self._cache_key = cache_key
+        cache_manager.put(RENDER, cache_key, (img, dx, dy), image_nbytes(img))
         
-        return img
-    
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        data['image_path'] = self.image_path
-        return data
+        return img, dx, dy
     
-    @classmethod
-    def from_dict(cls, data: dict) -> 'ImageLayer':
-        layer = cls(
-            id=data.get('id', str(uuid.uuid4())),
-            name=data.get('name', '图片图层'),
-            x=data.get('x', 0),
-            y=data.get('y', 0),
-            width=data.get('width', 100),
-            height=data.get('height', 100),
-            rotation=data.get('rotation', 0.0),
-            opacity=data.get('opacity', 1.0),
-            visible=data.get('visible', True),
-            locked=data.get('locked', False),
-            image_path=data.get('image_path', ''),
-        )
-        return layer
+    def render(self, scale: float = 1.0) -> Optional[Image.Image]:
+        """渲染图片图层（完整尺寸，含透明边距）"""
+        return self._fit_to_box(*self.render_with_offset(scale))
 
 
-@dataclass
+@dataclass(slots=True)
 class TextLayer(Layer):
     """文字图层"""
     text: str = "文本"
@@ -227,23 +675,28 @@ class TextLayer(Layer):
     font_weight: str = "normal"  # normal, bold
     text_align: str = "left"  # left, center, right
     line_height: float = 1.5
+    effects: tuple = ()  # 图层效果（core.effects 中的效果对象）
     layer_type: str = "text"
-    _render_cache: Optional[Image.Image] = field(default=None, repr=False)
-    _cache_key: str = field(default="", repr=False)
+    
+    _dict_defaults: ClassVar[Dict[str, Any]] = {'name': '文字图层', 'height': 50}
+    # 文字之间的空隙也应能点中
+    _hit_alpha: ClassVar[bool] = False
     
     def __post_init__(self):
         if self.name == "图层":
             self.name = f"文字: {self.text[:10]}"
+        Layer.__post_init__(self)
     
     def _get_cache_key(self) -> str:
         """生成缓存键"""
-        return f"{self.text}_{self.font_size}_{self.font_color}_{self.width}_{self.height}_{self.rotation}_{self.opacity}"
+        return self.content_fingerprint()
     
-    def render(self, scale: float = 1.0) -> Optional[Image.Image]:
-        """渲染文字图层（带缓存）"""
+    def render_with_offset(self, scale: float = 1.0) -> Tuple[Optional[Image.Image], int, int]:
+        """渲染文字图层（带缓存），效果会使位图向四周扩展"""
         cache_key = self._get_cache_key()
-        if self._render_cache is not None and self._cache_key == cache_key:
-            return self._render_cache
+        cached = cache_manager.get(RENDER, cache_key)
+        if cached is not None:
+            return cached
         
         # 创建透明背景
         img = Image.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
@@ -262,21 +715,17 @@ class TextLayer(Layer):
         # 绘制文字
         draw.text((0, 0), self.text, fill=color, font=font)
         
-        # 旋转
-        if self.rotation != 0:
-            img = img.rotate(-self.rotation, expand=True, resample=Image.Resampling.BICUBIC)
-        
-        # 透明度
-        if self.opacity < 1.0:
-            alpha = img.split()[3]
-            alpha = alpha.point(lambda x: int(x * self.opacity))
-            img.putalpha(alpha)
+        # 图层效果（旋转和透明度在合成时应用）
+        img, dx, dy = self._apply_effects(img, 0, 0)
         
         # 更新缓存
-        self._render_cache = img
-        self._cache_key = cache_key
+        cache_manager.put(RENDER, cache_key, (img, dx, dy), image_nbytes(img))
         
-        return img
+        return img, dx, dy
+    
+    def render(self, scale: float = 1.0) -> Optional[Image.Image]:
+        """渲染文字图层（从图层左上角开始的完整位图）"""
+        return self._fit_to_box(*self.render_with_offset(scale))
     
     def _get_font_path(self) -> str:
         """获取字体路径"""
@@ -310,44 +759,9 @@ class TextLayer(Layer):
         except:
             self.width = len(self.text) * self.font_size
             self.height = int(self.font_size * self.line_height)
-    
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        data.update({
-            'text': self.text,
-            'font_family': self.font_family,
-            'font_size': self.font_size,
-            'font_color': self.font_color,
-            'font_weight': self.font_weight,
-            'text_align': self.text_align,
-            'line_height': self.line_height,
-        })
-        return data
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> 'TextLayer':
-        return cls(
-            id=data.get('id', str(uuid.uuid4())),
-            name=data.get('name', '文字图层'),
-            x=data.get('x', 0),
-            y=data.get('y', 0),
-            width=data.get('width', 100),
-            height=data.get('height', 50),
-            rotation=data.get('rotation', 0.0),
-            opacity=data.get('opacity', 1.0),
-            visible=data.get('visible', True),
-            locked=data.get('locked', False),
-            text=data.get('text', '文本'),
-            font_family=data.get('font_family', 'Arial'),
-            font_size=data.get('font_size', 24),
-            font_color=data.get('font_color', '#000000'),
-            font_weight=data.get('font_weight', 'normal'),
-            text_align=data.get('text_align', 'left'),
-            line_height=data.get('line_height', 1.5),
-        )
 
 
-@dataclass
+@dataclass(slots=True)
 class ShapeLayer(Layer):
     """形状图层"""
     shape_type: str = "rectangle"  # rectangle, ellipse, line
@@ -355,23 +769,25 @@ class ShapeLayer(Layer):
     stroke_color: str = "#000000"
     stroke_width: int = 1
     layer_type: str = "shape"
-    _render_cache: Optional[Image.Image] = field(default=None, repr=False)
-    _cache_key: str = field(default="", repr=False)
+    
+    _dict_defaults: ClassVar[Dict[str, Any]] = {'name': '形状图层'}
     
     def __post_init__(self):
         if self.name == "图层":
             shape_names = {"rectangle": "矩形", "ellipse": "椭圆", "line": "线条"}
             self.name = f"形状: {shape_names.get(self.shape_type, '形状')}"
+        Layer.__post_init__(self)
     
     def _get_cache_key(self) -> str:
         """生成缓存键"""
-        return f"{self.shape_type}_{self.fill_color}_{self.stroke_color}_{self.stroke_width}_{self.width}_{self.height}_{self.rotation}_{self.opacity}"
+        return self.content_fingerprint()
     
     def render(self, scale: float = 1.0) -> Optional[Image.Image]:
         """渲染形状图层（带缓存）"""
         cache_key = self._get_cache_key()
-        if self._render_cache is not None and self._cache_key == cache_key:
-            return self._render_cache
+        cached = cache_manager.get(RENDER, cache_key)
+        if cached is not None:
+            return cached
         
         img = Image.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
         draw = ImageDraw.Draw(img)
@@ -400,19 +816,8 @@ class ShapeLayer(Layer):
                 width=self.stroke_width or 2
             )
         
-        # 旋转
-        if self.rotation != 0:
-            img = img.rotate(-self.rotation, expand=True, resample=Image.Resampling.BICUBIC)
-        
-        # 透明度
-        if self.opacity < 1.0:
-            alpha = img.split()[3]
-            alpha = alpha.point(lambda x: int(x * self.opacity))
-            img.putalpha(alpha)
-        
-        # 更新缓存
-        self._render_cache = img
-        self._cache_key = cache_key
+        # 更新缓存（旋转和透明度在合成时应用）
+        cache_manager.put(RENDER, cache_key, img, image_nbytes(img))
         
         return img
     
@@ -423,45 +828,176 @@ class ShapeLayer(Layer):
             r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
             return (r, g, b, 255)
         return (0, 0, 0, 255)
+
+
+@dataclass(slots=True)
+class GroupLayer(Layer):
+    """图层组
+
+    子图层坐标相对于组的左上角。组的位图是子图层的合成结果，
+    子图层未变化时直接复用缓存，合成整组只需一次粘贴。
+    """
+    children: List[Layer] = field(default_factory=list)
+    layer_type: str = "group"
+    
+    _dict_defaults: ClassVar[Dict[str, Any]] = {'name': '图层组'}
+    
+    def __post_init__(self):
+        if self.name == "图层":
+            self.name = "图层组"
+        for child in self.children:
+            child._parent = self
+        Layer.__post_init__(self)
+    
+    def __setattr__(self, name: str, value):
+        if name == 'children':
+            for child in value:
+                child._parent = self
+        Layer.__setattr__(self, name, value)
+    
+    def content_fingerprint(self) -> str:
+        """内容指纹：组自身的位图属性 + 各子图层指纹"""
+        fp = self._content_fp
+        if not fp:
+            own = tuple(getattr(self, n) for n in self.render_schema() if n != 'children')
+            fp = digest(own, tuple(child.fingerprint() for child in self.children))
+            self._content_fp = fp
+        return fp
+    
+    def _get_cache_key(self) -> str:
+        """生成缓存键"""
+        return self.content_fingerprint()
+    
+    def is_decoding(self) -> bool:
+        return any(child.is_decoding() for child in self.children)
+    
+    def _copy_children(self):
+        # 子图层内容不变，组的合成缓存和指纹保持有效
+        children = [child.clone() for child in self.children]
+        for child in children:
+            child._parent = self
+        object.__setattr__(self, 'children', children)
+    
+    def add_child(self, layer: Layer, index: int = None):
+        """添加子图层（坐标相对于组）"""
+        layer._parent = self
+        if index is None:
+            self.children.append(layer)
+        else:
+            self.children.insert(index, layer)
+        self.touch('children')
+    
+    def remove_child(self, layer_id: str) -> Optional[Layer]:
+        """移除子图层"""
+        for i, child in enumerate(self.children):
+            if child.id == layer_id:
+                self.children.pop(i)
+                child._parent = None
+                self.touch('children')
+                return child
+        return None
+    
+    def content_size(self) -> Tuple[int, int]:
+        """子图层合成后的原始尺寸"""
+        width = height = 1
+        for child in self.children:
+            _, _, x1, y1 = child.get_render_bounds()
+            width = max(width, x1)
+            height = max(height, y1)
+        return width, height
+    
+    def fit_to_children(self):
+        """将组的范围收缩到子图层的外接框（子图层坐标为画布坐标时调用）"""
+        if not self.children:
+            return
+        bounds = [child.get_render_bounds() for child in self.children]
+        left = min(b[0] for b in bounds)
+        top = min(b[1] for b in bounds)
+        for child in self.children:
+            child.move(-left, -top)
+        self.x = left
+        self.y = top
+        self.width, self.height = self.content_size()
+    
+    def release_children(self) -> List[Layer]:
+        """解散组：子图层换算回组外坐标后返回"""
+        content_w, content_h = self.content_size()
+        sx = self.width / content_w
+        sy = self.height / content_h
+        children = self.children
+        self.children = []
+        for child in children:
+            child._parent = None
+            if sx != 1.0 or sy != 1.0:
+                child.resize(round(child.width * sx), round(child.height * sy))
+            child.x = self.x + round(child.x * sx)
+            child.y = self.y + round(child.y * sy)
+        return children
+    
+    def contains_point(self, px: int, py: int) -> bool:
+        """命中测试：落在任一可见子图层上"""
+        lx, ly = self.to_local(px, py)
+        if not (0 <= lx <= self.width and 0 <= ly <= self.height):
+            return False
+        content_w, content_h = self.content_size()
+        lx = lx * content_w / max(1, self.width)
+        ly = ly * content_h / max(1, self.height)
+        return any(child.visible and child.contains_point(lx, ly) for child in self.children)
+    
+    def render(self, scale: float = 1.0) -> Optional[Image.Image]:
+        """渲染图层组（合成结果带缓存）"""
+        cache_key = self._get_cache_key()
+        cached = cache_manager.get(RENDER, cache_key)
+        if cached is not None:
+            return cached
+        
+        img = Image.new("RGBA", self.content_size(), (0, 0, 0, 0))
+        for child in self.children:
+            if child.visible:
+                child.composite_into(img)
+        
+        # 缩放（组自身的旋转和透明度在合成时应用）
+        if img.size != (self.width, self.height):
+            img = img.resize((max(1, self.width), max(1, self.height)), Image.Resampling.LANCZOS)
+        
+        # 更新缓存
+        cache_manager.put(RENDER, cache_key, img, image_nbytes(img))
+        
+        return img
     
     def to_dict(self) -> dict:
-        data = super().to_dict()
-        data.update({
-            'shape_type': self.shape_type,
-            'fill_color': self.fill_color,
-            'stroke_color': self.stroke_color,
-            'stroke_width': self.stroke_width,
-        })
+        """转换为字典（子图层递归展开）"""
+        data = Layer.to_dict(self)
+        data['children'] = [child.to_dict() for child in self.children]
         return data
     
     @classmethod
-    def from_dict(cls, data: dict) -> 'ShapeLayer':
-        return cls(
-            id=data.get('id', str(uuid.uuid4())),
-            name=data.get('name', '形状图层'),
-            x=data.get('x', 0),
-            y=data.get('y', 0),
-            width=data.get('width', 100),
-            height=data.get('height', 100),
-            rotation=data.get('rotation', 0.0),
-            opacity=data.get('opacity', 1.0),
-            visible=data.get('visible', True),
-            locked=data.get('locked', False),
-            shape_type=data.get('shape_type', 'rectangle'),
-            fill_color=data.get('fill_color', '#cccccc'),
-            stroke_color=data.get('stroke_color', '#000000'),
-            stroke_width=data.get('stroke_width', 1),
-        )
+    def from_dict(cls, data: dict) -> 'GroupLayer':
+        """从字典创建"""
+        data = dict(data)
+        data['children'] = [create_layer_from_dict(d) for d in data.get('children', [])]
+        return super(GroupLayer, cls).from_dict(data)
+
+
+# layer_type -> 图层类
+LAYER_TYPES: Dict[str, type] = {
+    'base': Layer,
+    'image': ImageLayer,
+    'text': TextLayer,
+    'shape': ShapeLayer,
+    'group': GroupLayer,
+}
+
+
+def iter_layers(layers: Iterable[Layer]) -> Iterator[Layer]:
+    """遍历图层及图层组内的全部子图层"""
+    for layer in layers:
+        yield layer
+        if isinstance(layer, GroupLayer):
+            yield from iter_layers(layer.children)
 
 
 def create_layer_from_dict(data: dict) -> Layer:
     """根据类型创建图层"""
-    layer_type = data.get('layer_type', 'base')
-    if layer_type == 'image':
-        return ImageLayer.from_dict(data)
-    elif layer_type == 'text':
-        return TextLayer.from_dict(data)
-    elif layer_type == 'shape':
-        return ShapeLayer.from_dict(data)
-    else:
-        return Layer.from_dict(data)
+    layer_cls = LAYER_TYPES.get(data.get('layer_type', 'base'), Layer)
+    return layer_cls.from_dict(data)
@@ -0,0 +1,106 @@
+"""
+场景序列化 - 紧凑的元组快照（撤销历史）与快速 JSON 读写（项目文件）
+
+元组快照按图层类的字段声明顺序编码，内容全部为不可变值
+（set_image 设置的位图只保存引用，位图从不原地修改），写入历史记录时无需深拷贝；项目文件仍为 JSON 字典格式，
+安装了 orjson 时自动使用 orjson 加速。
+"""
+import json
+from typing import Any, Tuple
+
+from .layer import Layer, ImageLayer, GroupLayer, LAYER_TYPES, iter_layers
+
+# orjson 为可选依赖
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
+
+
+def has_orjson() -> bool:
+    """是否可使用 orjson"""
+    return _HAS_ORJSON
+
+
+# ========== JSON ==========
+
+def dumps(data: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON"""
+    if _HAS_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(raw: bytes) -> Any:
+    """解析 JSON（兼容旧版带缩进的项目文件）"""
+    if _HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# ========== 元组快照 ==========
+
+def layer_to_tuple(layer: Layer) -> tuple:
+    """图层 -> (layer_type, 字段值...)，图层组的子图层编码为嵌套元组，
+    图片图层末尾附加 pixel_state()（像素来自文件时为 None）"""
+    values = tuple(getattr(layer, name) for name in layer.schema())
+    if isinstance(layer, GroupLayer):
+        values = tuple(
+            tuple(layer_to_tuple(child) for child in value) if name == 'children' else value
+            for name, value in zip(layer.schema(), values)
+        )
+    if isinstance(layer, ImageLayer):
+        values += (layer.pixel_state(),)
+    return (layer.layer_type,) + values
+
+
+def layer_from_tuple(data: tuple) -> Layer:
+    """(layer_type, 字段值...) -> 图层"""
+    layer_cls = LAYER_TYPES.get(data[0], Layer)
+    kwargs = dict(zip(layer_cls.schema(), data[1:]))
+    if 'children' in kwargs:
+        kwargs['children'] = [layer_from_tuple(child) for child in kwargs['children']]
+    layer = layer_cls.from_fields(kwargs)
+    if isinstance(layer, ImageLayer) and data[-1] is not None:
+        layer.restore_pixel_state(data[-1])
+    return layer
+
+
+def snapshot_canvas(canvas) -> Tuple:
+    """生成画布的不可变快照"""
+    return (
+        canvas.width,
+        canvas.height,
+        canvas.background_color,
+        tuple(canvas.selected_layer_ids),
+        tuple(layer_to_tuple(layer) for layer in canvas.layers),
+        tuple((s.id, s.name, s.height, s.is_blank) for s in canvas.screens),
+    )
+
+
+def restore_canvas(canvas, snapshot: Tuple):
+    """将快照恢复到画布"""
+    from .canvas import Screen
+
+    width, height, background_color, selected_layer_ids, layers, screens = snapshot
+    canvas.width = width
+    canvas.height = height
+    canvas.background_color = background_color
+    canvas.selected_layer_ids = list(selected_layer_ids)
+    # 像素来自文件且来源未变的图片图层沿用已解码的位图，撤销 / 重做不必重新读取文件
+    # （set_image 设置的像素已随快照恢复）
+    previous = {layer.id: layer for layer in iter_layers(canvas.layers) if isinstance(layer, ImageLayer)}
+    restored = [layer_from_tuple(data) for data in layers]
+    if previous:
+        for layer in iter_layers(restored):
+            old = previous.get(layer.id)
+            if old is not None and isinstance(layer, ImageLayer):
+                layer.adopt_pixels(old)
+    canvas.layers = restored
+    canvas.screens = [
+        Screen(id=sid, name=name, height=h, is_blank=is_blank)
+        for sid, name, h, is_blank in screens
+    ]
+    canvas.invalidate_indexes()
@@ -0,0 +1,202 @@
+"""
+智能吸附 - 拖动图层时对齐到其他图层的边缘 / 中心、画布中心和分屏边界
+
+- 所有吸附目标按坐标排序保存（x 方向：左 / 中 / 右，y 方向：上 / 中 / 下），
+  查询用二分查找阈值范围，拖动时每次鼠标事件的代价为 O(log n) 加阈值内的目标数
+- 图层移动 / 缩放时通过图层变更事件只替换该图层的几个坐标：二分定位后在列表中插入 / 删除，
+  代价为 O(n) 的内存移动，但几千个目标也只需几微秒，远低于重建
+- 图层列表、画布尺寸或分屏高度变化时由画布使索引失效，下次查询前整体重建；
+  查询本身不检查图层列表和分屏
+"""
+import math
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .events import layer_events, LayerChange
+
+
+Bounds = Tuple[int, int, int, int]
+
+# 画布 / 分屏目标的所有者键（图层用 id(layer)）
+CANVAS_KEY = 0
+
+
+def snap_bounds(layer) -> Bounds:
+    """参与吸附的范围（不含效果外扩，旋转时取绕中心旋转后的外接框）"""
+    x0, y0, x1, y1 = layer.get_bounds()
+    if layer.rotation % 360 == 0:
+        return (x0, y0, x1, y1)
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    rad = math.radians(layer.rotation)
+    cos, sin = abs(math.cos(rad)), abs(math.sin(rad))
+    ex = layer.width / 2 * cos + layer.height / 2 * sin
+    ey = layer.width / 2 * sin + layer.height / 2 * cos
+    return (round(cx - ex), round(cy - ey), round(cx + ex), round(cy + ey))
+
+
+def _anchors(bounds: Bounds) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+    """范围的 (左, 中, 右) 和 (上, 中, 下)"""
+    x0, y0, x1, y1 = bounds
+    return (x0, (x0 + x1) // 2, x1), (y0, (y0 + y1) // 2, y1)
+
+
+class _Axis:
+    """单个方向上按坐标排序的吸附目标"""
+
+    def __init__(self):
+        self.positions: List[int] = []
+        self.keys: List[int] = []
+
+    def load(self, items: List[Tuple[int, int]]):
+        items.sort()
+        self.positions = [pos for pos, _key in items]
+        self.keys = [key for _pos, key in items]
+
+    def add(self, pos: int, key: int):
+        """插入目标（二分定位，list.insert 为 O(n) 的内存移动）"""
+        i = bisect_right(self.positions, pos)
+        self.positions.insert(i, pos)
+        self.keys.insert(i, key)
+
+    def remove(self, pos: int, key: int):
+        """删除目标（二分定位，del 为 O(n) 的内存移动）"""
+        i = bisect_left(self.positions, pos)
+        while i < len(self.positions) and self.positions[i] == pos:
+            if self.keys[i] == key:
+                del self.positions[i]
+                del self.keys[i]
+                return
+            i += 1
+
+    def nearest(self, value: int, threshold: int, exclude) -> Tuple[int, int]:
+        """阈值内最近的目标，返回 (目标坐标, 距离)；没有时距离为 threshold + 1"""
+        positions, keys = self.positions, self.keys
+        lo = bisect_left(positions, value - threshold)
+        hi = bisect_right(positions, value + threshold)
+        # 从 value 向两侧扫描，各侧第一个未排除的目标即为该侧最近的目标：
+        # 很多图层共用同一坐标（如通栏图层的左边缘）时也只跳过被排除的目标
+        right = bisect_left(positions, value, lo, hi)
+        left = right - 1
+        while right < hi and keys[right] in exclude:
+            right += 1
+        while left >= lo and keys[left] in exclude:
+            left -= 1
+        best, best_dist = value, threshold + 1
+        if left >= lo:
+            best, best_dist = positions[left], value - positions[left]
+        if right < hi and positions[right] - value < best_dist:
+            best, best_dist = positions[right], positions[right] - value
+        return best, best_dist
+
+    def contains(self, value: int, exclude) -> bool:
+        """是否有（未排除的）目标恰好位于该坐标"""
+        lo = bisect_left(self.positions, value)
+        hi = bisect_right(self.positions, value)
+        return any(self.keys[i] not in exclude for i in range(lo, hi))
+
+
+class SnapIndex:
+    """吸附目标索引（只索引顶层图层）"""
+
+    def __init__(self):
+        self._x = _Axis()
+        self._y = _Axis()
+        self._anchors: Dict[int, Tuple[object, Tuple[int, int, int], Tuple[int, int, int]]] = {}  # id(layer) -> (图层, x 坐标, y 坐标)
+        self._valid = False
+        self._layers: tuple = ()  # 持有引用，保证 id 在索引期间不被复用
+        layer_events.subscribe(self._on_layer_changed)
+
+    # ========== 维护 ==========
+
+    def sync(self, layers: Sequence, canvas_width: int, screen_heights: Iterable[int]):
+        """索引失效后重建（索引有效时直接返回，screen_heights 只在重建时遍历）"""
+        if self._valid:
+            return
+        self._valid = True
+        self._layers = tuple(layers)
+        self._anchors.clear()
+
+        # 画布左 / 中 / 右，顶部、底部、中线和每个分屏边界
+        xs = [(0, CANVAS_KEY), (canvas_width // 2, CANVAS_KEY), (canvas_width, CANVAS_KEY)]
+        ys = [(0, CANVAS_KEY)]
+        offset = 0
+        for height in screen_heights:
+            offset += height
+            ys.append((offset, CANVAS_KEY))
+        ys.append((offset // 2, CANVAS_KEY))
+
+        for layer in layers:
+            ax, ay = _anchors(snap_bounds(layer))
+            self._anchors[id(layer)] = (layer, ax, ay)
+            xs.extend((pos, id(layer)) for pos in ax)
+            ys.extend((pos, id(layer)) for pos in ay)
+        self._x.load(xs)
+        self._y.load(ys)
+
+    def invalidate(self):
+        """图层列表 / 画布尺寸 / 分屏变化后调用：下次查询前重建"""
+        self._valid = False
+        self._layers = ()
+
+    def _on_layer_changed(self, change: LayerChange):
+        """几何属性变化时只替换该图层的坐标"""
+        if not change.bounds_changed:
+            return
+        key = id(change.layer)
+        entry = self._anchors.get(key)
+        if entry is None or entry[0] is not change.layer:
+            return
+        ax, ay = _anchors(snap_bounds(change.layer))
+        if (ax, ay) == entry[1:]:
+            return
+        for pos in entry[1]:
+            self._x.remove(pos, key)
+        for pos in entry[2]:
+            self._y.remove(pos, key)
+        for pos in ax:
+            self._x.add(pos, key)
+        for pos in ay:
+            self._y.add(pos, key)
+        self._anchors[key] = (change.layer, ax, ay)
+
+    # ========== 查询 ==========
+
+    def snap(self, bounds: Bounds, threshold: int, exclude=()) -> Tuple[int, int, List[dict]]:
+        """
+        计算范围的吸附偏移
+
+        Args:
+            bounds: 正在拖动的范围 (x0, y0, x1, y1)
+            threshold: 吸附阈值（画布像素）
+            exclude: 不参与吸附的图层（正在拖动的图层本身）
+
+        Returns:
+            (dx, dy, 辅助线列表)，辅助线为 {'type': 'vertical'/'horizontal', 'pos': 坐标}，
+            吸附后与任一目标重合的边缘 / 中心都会给出辅助线
+        """
+        exclude_keys = {id(layer) for layer in exclude}
+        ax, ay = _anchors(bounds)
+        dx = self._offset(self._x, ax, threshold, exclude_keys)
+        dy = self._offset(self._y, ay, threshold, exclude_keys)
+
+        guides = []
+        for pos in sorted({pos + dx for pos in ax}):
+            if self._x.contains(pos, exclude_keys):
+                guides.append({'type': 'vertical', 'pos': pos})
+        for pos in sorted({pos + dy for pos in ay}):
+            if self._y.contains(pos, exclude_keys):
+                guides.append({'type': 'horizontal', 'pos': pos})
+        return dx, dy, guides
+
+    @staticmethod
+    def _offset(axis: _Axis, anchors: Tuple[int, int, int], threshold: int, exclude) -> int:
+        """三个锚点中距离最近的目标给出的偏移"""
+        offset, best_dist = 0, threshold + 1
+        for value in anchors:
+            target, dist = axis.nearest(value, threshold, exclude)
+            if dist < best_dist:
+                offset, best_dist = target - value, dist
+        return offset
+
+    def target_count(self) -> int:
+        return len(self._x.positions) + len(self._y.positions)
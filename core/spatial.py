@@ -0,0 +1,119 @@
+"""
+空间索引 - 按渲染范围把图层分到均匀网格中，快速查询与矩形相交的图层
+
+长图页面往往有上百个图层，视口只显示其中一小段：
+- 查询只访问与矩形重叠的网格，代价与可见区域成正比，而不是与页面长度成正比
+- 图层移动 / 缩放 / 旋转时通过图层变更事件只更新该图层所在的网格
+- 图层列表（增删、排序、分组）变化时由画布使索引失效，下次查询前整体重建；
+  查询本身不检查图层列表，没有变化时同步的代价为 O(1)
+"""
+from typing import Dict, List, Sequence, Set, Tuple
+
+from .events import layer_events, LayerChange
+
+
+Rect = Tuple[int, int, int, int]  # (x0, y0, x1, y1)
+
+# 网格边长（画布像素）
+CELL_SIZE = 256
+
+
+class SpatialIndex:
+    """图层网格索引（只索引顶层图层，组内图层随所在组一起查询）"""
+
+    def __init__(self, cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._entries: Dict[int, Tuple[object, Tuple[int, int, int, int]]] = {}  # id(layer) -> (图层, 网格范围)
+        self._order: Dict[int, int] = {}  # id(layer) -> 图层顺序（从下到上）
+        self._valid = False
+        self._layers: tuple = ()  # 持有引用，保证 id 在索引期间不被复用
+        layer_events.subscribe(self._on_layer_changed)
+
+    # ========== 维护 ==========
+
+    def sync(self, layers: Sequence):
+        """索引失效后按图层列表重建（索引有效时直接返回）"""
+        if self._valid:
+            return
+        self._valid = True
+        self._layers = tuple(layers)
+        self._cells.clear()
+        self._entries.clear()
+        self._order = {id(layer): i for i, layer in enumerate(self._layers)}
+        for layer in layers:
+            self._insert(layer)
+
+    def invalidate(self):
+        """图层列表变化后调用：下次查询前重建"""
+        self._valid = False
+        self._layers = ()
+
+    def _cell_range(self, bounds: Rect) -> Tuple[int, int, int, int]:
+        x0, y0, x1, y1 = bounds
+        size = self.cell_size
+        return (x0 // size, y0 // size, x1 // size, y1 // size)
+
+    def _insert(self, layer):
+        key = id(layer)
+        cells = self._cell_range(layer.get_render_bounds())
+        cx0, cy0, cx1, cy1 = cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                self._cells.setdefault((cx, cy), set()).add(key)
+        self._entries[key] = (layer, cells)
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        cx0, cy0, cx1, cy1 = entry[1]
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._cells[(cx, cy)]
+
+    def _on_layer_changed(self, change: LayerChange):
+        """几何属性变化时只移动该图层"""
+        if not change.bounds_changed:
+            return
+        key = id(change.layer)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not change.layer:
+            return
+        if self._cell_range(change.new_bounds) == entry[1]:
+            return
+        self._remove(key)
+        self._insert(change.layer)
+
+    # ========== 查询 ==========
+
+    def query(self, rect: Rect) -> List:
+        """与矩形 (x0, y0, x1, y1) 相交的图层，按从下到上的顺序返回"""
+        x0, y0, x1, y1 = rect
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        keys: Set[int] = set()
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    keys.update(bucket)
+
+        result = []
+        for key in keys:
+            layer = self._entries[key][0]
+            bx0, by0, bx1, by1 = layer.get_render_bounds()
+            if bx0 < x1 and bx1 > x0 and by0 < y1 and by1 > y0:
+                result.append(layer)
+        result.sort(key=lambda layer: self._order[id(layer)])
+        return result
+
+    def query_point(self, x: int, y: int) -> List:
+        """渲染范围包含该点的图层（从下到上）"""
+        return self.query((x, y, x + 1, y + 1))
+
+    def layer_count(self) -> int:
+        return len(self._entries)
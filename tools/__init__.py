@@ -20,6 +20,10 @@ def is_rembg_available():
     from .remove_bg import is_available
     return is_available()
 
+def refine_alpha_with_marks(*args, **kwargs):
+    from .matting import refine_alpha_with_marks as _func
+    return _func(*args, **kwargs)
+
 def upscale_image(*args, **kwargs):
     from .upscale import upscale_image as _func
     return _func(*args, **kwargs)
@@ -58,6 +62,7 @@ def is_opencv_available():
 
 __all__ = [
     'remove_background', 'remove_background_from_image', 'batch_remove_background', 'is_rembg_available',
+    'refine_alpha_with_marks',
     'upscale_image', 'upscale_image_pillow', 'batch_upscale', 'is_realesrgan_available',
     'enhance_image', 'adjust_color', 'apply_filter', 'batch_enhance', 'is_opencv_available',
 ]
@@ -0,0 +1,284 @@
+"""
+按用户标记局部修正抠图结果 - 在 CPU 上几百毫秒内完成，不再重新运行模型
+
+- 只处理标记外扩一定边距后的区域（ROI），并先缩小到长边不超过 PROXY_SIDE 的代理图上计算
+- 有 OpenCV 时用 GrabCut（标记为确定前景 / 背景，模型结果为可能前景 / 背景）；
+  否则用标记和模型结果中的可信区域建立前景 / 背景颜色模型重新分类
+- 只采纳与标记连通的修正：保留标记所在的、分割为前景而模型判为背景的连通区域整块恢复，
+  删除标记同理，其余区域保持模型结果
+- 结果经引导滤波贴合图像边缘：系数在代理图上求出后放大回原分辨率（快速引导滤波）
+"""
+import traceback
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+# 代理图的长边上限
+PROXY_SIDE = 512
+# ROI 在标记外扩的边距（原图长边的比例，不小于 MIN_MARGIN 像素）
+MARGIN_RATIO = 0.25
+MIN_MARGIN = 32
+# 引导滤波半径（代理图像素）和正则项
+GUIDED_RADIUS = 4
+GUIDED_EPS = 1e-3
+# 颜色模型的聚类数与采样数
+COLOR_CLUSTERS = 6
+COLOR_SAMPLES = 4000
+# 与标记颜色的距离小于该值（RGB 0~1）的可信像素不计入对方的颜色模型
+MARK_COLOR_TOLERANCE = 0.1
+
+# 延迟检查 OpenCV
+_opencv_checked = False
+_cv2 = None
+
+
+def _check_opencv():
+    """延迟检查 OpenCV 是否可用"""
+    global _opencv_checked, _cv2
+    if _opencv_checked:
+        return _cv2 is not None
+    _opencv_checked = True
+    try:
+        import cv2
+        _cv2 = cv2
+    except Exception:
+        _cv2 = None
+    return _cv2 is not None
+
+
+def _box(x: np.ndarray, r: int) -> np.ndarray:
+    """(2r+1)² 窗口均值（积分图实现，边缘按实际像素数归一化）"""
+    h, w = x.shape
+    integral = np.zeros((h + 1, w + 1), dtype=np.float64)
+    integral[1:, 1:] = x.cumsum(0).cumsum(1)
+    y0 = np.clip(np.arange(h) - r, 0, h)[:, None]
+    y1 = np.clip(np.arange(h) + r + 1, 0, h)[:, None]
+    x0 = np.clip(np.arange(w) - r, 0, w)[None, :]
+    x1 = np.clip(np.arange(w) + r + 1, 0, w)[None, :]
+    total = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    return (total / ((y1 - y0) * (x1 - x0))).astype(np.float32)
+
+
+def _resize(array: np.ndarray, size) -> np.ndarray:
+    """float32 数组双线性缩放到 size=(宽, 高)"""
+    return np.asarray(Image.fromarray(array.astype(np.float32), "F").resize(size, Image.Resampling.BILINEAR))
+
+
+def _kmeans(samples: np.ndarray, k: int) -> np.ndarray:
+    """少量迭代的 k-means，返回聚类中心"""
+    rng = np.random.default_rng(0)
+    if len(samples) > COLOR_SAMPLES:
+        samples = samples[rng.choice(len(samples), COLOR_SAMPLES, replace=False)]
+    k = min(k, len(samples))
+    centers = samples[rng.choice(len(samples), k, replace=False)].copy()
+    for _ in range(5):
+        nearest = ((samples[:, None, :] - centers[None]) ** 2).sum(2).argmin(1)
+        for i in range(k):
+            members = samples[nearest == i]
+            if len(members):
+                centers[i] = members.mean(0)
+    return centers
+
+
+def _min_distance(pixels: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """每个像素到最近聚类中心的距离"""
+    channels = [pixels[..., c] for c in range(pixels.shape[-1])]
+    best = np.full(pixels.shape[:-1], np.inf, dtype=np.float32)
+    for center in centers:
+        dist = (channels[0] - center[0]) ** 2
+        for channel, value in zip(channels[1:], center[1:]):
+            dist += (channel - value) ** 2
+        np.minimum(best, dist, out=best)
+    return np.sqrt(best)
+
+
+def _components(mask: np.ndarray) -> np.ndarray:
+    """四连通区域标记，返回 (高, 宽) int32 标签，0 为背景
+
+    没有 OpenCV 时按行程标记：每行的连续像素段为一个节点，与上一行列区间相交的段合并，
+    并查集只处理行程，整个过程只扫描一遍。
+    """
+    if _check_opencv():
+        return _cv2.connectedComponents(mask.astype(np.uint8), connectivity=4)[1]
+    h, w = mask.shape
+    labels = np.zeros((h, w), dtype=np.int32)
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_row, run_start = np.nonzero(edges == 1)
+    run_end = np.nonzero(edges == -1)[1]
+    n = len(run_row)
+    if n == 0:
+        return labels
+
+    # 按 行 × stride + 列 编码后全部行程有序，上一行中相交的行程是一段连续的下标
+    stride = w + 1
+    start_key = run_row * stride + run_start
+    end_key = run_row * stride + run_end
+    lo = np.searchsorted(end_key, start_key - stride, 'right')
+    hi = np.searchsorted(start_key, end_key - stride, 'left')
+    count = np.maximum(hi - lo, 0)
+    below = np.repeat(np.arange(n), count)
+    above = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count - lo, count)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(below.tolist(), above.tolist()):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    run_label = np.array([find(i) for i in range(n)], dtype=np.int32) + 1
+
+    # 行程起点写入标签、终点减去，逐行累加即为像素标签
+    delta = np.zeros(h * stride + 1, dtype=np.int32)
+    delta[start_key] = run_label
+    delta[end_key] -= run_label
+    labels[:] = np.cumsum(delta[:-1]).reshape(h, stride)[:, :w]
+    return labels
+
+
+def _reach(allowed: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """allowed 中与 seeds 四连通的像素（一次连通区域标记，保留含种子的区域）"""
+    labels = _components(allowed)
+    keep = np.zeros(labels.max() + 1, dtype=bool)
+    keep[labels[seeds & allowed]] = True
+    keep[0] = False
+    return keep[labels]
+
+
+def _segment_color_model(rgb: np.ndarray, alpha: np.ndarray, fg: np.ndarray, bg: np.ndarray) -> np.ndarray:
+    """颜色模型分类，返回前景概率（0~1）；缺少前景或背景样本时沿用 alpha"""
+    # 标记的颜色优先：模型可信区域中与对方标记颜色相近的像素不作为样本
+    fg_confident = (alpha > 0.95) & ~bg
+    bg_confident = (alpha < 0.05) & ~fg
+    fg_centers, bg_centers = [], []
+    if fg.any():
+        fg_centers.append(_kmeans(rgb[fg], COLOR_CLUSTERS // 2))
+        bg_confident &= _min_distance(rgb, fg_centers[0]) > MARK_COLOR_TOLERANCE
+    if bg.any():
+        bg_centers.append(_kmeans(rgb[bg], COLOR_CLUSTERS // 2))
+        fg_confident &= _min_distance(rgb, bg_centers[0]) > MARK_COLOR_TOLERANCE
+    if fg_confident.any():
+        fg_centers.append(_kmeans(rgb[fg_confident], COLOR_CLUSTERS))
+    if bg_confident.any():
+        bg_centers.append(_kmeans(rgb[bg_confident], COLOR_CLUSTERS))
+    if not fg_centers or not bg_centers:
+        return alpha
+    d_fg = _min_distance(rgb, np.concatenate(fg_centers))
+    d_bg = _min_distance(rgb, np.concatenate(bg_centers))
+    return d_bg / np.maximum(d_fg + d_bg, 1e-6)
+
+
+def _segment_grabcut(rgb: np.ndarray, alpha: np.ndarray, fg: np.ndarray, bg: np.ndarray) -> np.ndarray:
+    """GrabCut 分割，返回前景（0 / 1）"""
+    cv2 = _cv2
+    mask = np.where(alpha >= 0.5, cv2.GC_PR_FGD, cv2.GC_PR_BGD).astype(np.uint8)
+    mask[fg] = cv2.GC_FGD
+    mask[bg] = cv2.GC_BGD
+    bgd_model = np.zeros((1, 65), np.float64)
+    fgd_model = np.zeros((1, 65), np.float64)
+    bgr = np.ascontiguousarray((rgb[..., ::-1] * 255).astype(np.uint8))
+    cv2.grabCut(bgr, mask, None, bgd_model, fgd_model, 3, cv2.GC_INIT_WITH_MASK)
+    return ((mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD)).astype(np.float32)
+
+
+def refine_alpha_with_marks(image: Image.Image, alpha: Image.Image,
+                            fg_mask: Image.Image = None, bg_mask: Image.Image = None) -> Optional[Image.Image]:
+    """
+    按用户标记修正 alpha
+
+    Args:
+        image: 原图
+        alpha: 模型给出的 alpha（L 模式，与原图同尺寸）
+        fg_mask: 标记保留的区域（L 模式，白色为标记）
+        bg_mask: 标记删除的区域（L 模式，白色为标记）
+
+    Returns:
+        修正后的 alpha（L 模式），失败时返回 None
+    """
+    try:
+        w, h = image.size
+        alpha_full = np.asarray(alpha.convert("L"), dtype=np.float32) / 255
+        empty = Image.new("L", (w, h))
+        fg_mask = fg_mask.convert("L") if fg_mask is not None else empty
+        bg_mask = bg_mask.convert("L") if bg_mask is not None else empty
+        fg_full = np.asarray(fg_mask) > 127
+        bg_full = np.asarray(bg_mask) > 127
+        marks = fg_full | bg_full
+        if not marks.any():
+            return alpha.convert("L")
+
+        # ROI：标记外扩边距
+        margin = max(MIN_MARGIN, int(max(w, h) * MARGIN_RATIO))
+        rows = np.flatnonzero(marks.any(1))
+        cols = np.flatnonzero(marks.any(0))
+        x0, x1 = max(0, cols[0] - margin), min(w, cols[-1] + 1 + margin)
+        y0, y1 = max(0, rows[0] - margin), min(h, rows[-1] + 1 + margin)
+        roi_w, roi_h = x1 - x0, y1 - y0
+
+        # 代理图
+        scale = min(1.0, PROXY_SIDE / max(roi_w, roi_h))
+        pw, ph = max(1, round(roi_w * scale)), max(1, round(roi_h * scale))
+        box = (x0, y0, x1, y1)
+        roi_image = image.convert("RGB").crop(box)
+        rgb = np.asarray(roi_image.resize((pw, ph), Image.Resampling.BILINEAR), dtype=np.float32) / 255
+        alpha_roi = alpha_full[y0:y1, x0:x1]
+        alpha_p = _resize(alpha_roi, (pw, ph))
+        fg = np.asarray(fg_mask.resize((pw, ph), Image.Resampling.BILINEAR, box)) > 127
+        bg = np.asarray(bg_mask.resize((pw, ph), Image.Resampling.BILINEAR, box)) > 127
+        fg &= ~bg
+
+        # 分割（颜色模型只采纳把握较大的像素）
+        if _check_opencv():
+            seg = _segment_grabcut(rgb, alpha_p, fg, bg)
+            seg_fg, seg_bg = seg > 0.5, seg < 0.5
+        else:
+            prob = _segment_color_model(rgb, alpha_p, fg, bg)
+            seg_fg, seg_bg = prob > 0.6, prob < 0.4
+
+        # 只采纳与标记连通的修正区域
+        current = alpha_p >= 0.5
+        restore = _reach((seg_fg & ~current) | fg, fg)
+        remove = _reach((seg_bg & current) | bg, bg) & ~restore
+        target = alpha_p.copy()
+        target[restore] = 1
+        target[remove] = 0
+
+        # 修正区域权重为 1，边界外几个像素内平滑过渡
+        changed = restore | remove
+        feather = Image.fromarray(changed.astype(np.uint8) * 255, "L").filter(ImageFilter.GaussianBlur(GUIDED_RADIUS))
+        weight = np.maximum(np.asarray(feather, dtype=np.float32) / 255 * 2, changed)
+        weight = np.clip(weight, 0, 1)
+        blended = weight * target + (1 - weight) * alpha_p
+
+        # 快速引导滤波：代理图上求系数，放大后作用于原分辨率的灰度引导图
+        gray_p = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        mean_i = _box(gray_p, GUIDED_RADIUS)
+        mean_p = _box(blended, GUIDED_RADIUS)
+        cov_ip = _box(gray_p * blended, GUIDED_RADIUS) - mean_i * mean_p
+        var_i = _box(gray_p * gray_p, GUIDED_RADIUS) - mean_i * mean_i
+        a = cov_ip / (var_i + GUIDED_EPS)
+        b = mean_p - a * mean_i
+        mean_a = _resize(_box(a, GUIDED_RADIUS), (roi_w, roi_h))
+        mean_b = _resize(_box(b, GUIDED_RADIUS), (roi_w, roi_h))
+        gray_full = np.asarray(roi_image.convert("L"), dtype=np.float32) / 255
+        refined = np.clip(mean_a * gray_full + mean_b, 0, 1)
+
+        # 只在标记影响范围内替换，标记处为硬约束
+        weight_full = _resize(weight, (roi_w, roi_h))
+        result = alpha_full.copy()
+        result[y0:y1, x0:x1] = weight_full * refined + (1 - weight_full) * alpha_roi
+        result[fg_full & ~bg_full] = 1
+        result[bg_full] = 0
+        return Image.fromarray(np.round(result * 255).astype(np.uint8), "L")
+    except Exception as e:
+        print(f"[抠图] 按标记修正失败: {e}")
+        traceback.print_exc()
+        return None
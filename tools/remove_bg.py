@@ -100,12 +100,13 @@ def remove_background(input_path: str, output_path: str = None) -> Optional[Imag
         return None
 
 
-def remove_background_from_image(image: Image.Image) -> Optional[Image.Image]:
+def remove_background_from_image(image: Image.Image, crop: bool = True) -> Optional[Image.Image]:
     """
     从 PIL Image 对象移除背景
     
     Args:
         image: PIL Image 对象
+        crop: 是否裁剪透明边界（False 时结果与原图同尺寸，便于按标记继续修正）
     
     Returns:
         处理后的 PIL Image 对象，失败返回 None
@@ -148,7 +149,7 @@ def remove_background_from_image(image: Image.Image) -> Optional[Image.Image]:
         result = result.convert('RGBA')
         
         # 裁剪透明边界，让选框贴合实际内容
-        bbox = result.getbbox()
+        bbox = result.getbbox() if crop else None
         if bbox:
             result = result.crop(bbox)
             print(f"[抠图] 已裁剪透明边界，原始边界: {bbox}")
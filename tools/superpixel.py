@@ -0,0 +1,158 @@
+"""
+超像素分割 - 为蒙版精修的"贴合边缘"画笔预先计算区域标签
+
+- 有 OpenCV（含 ximgproc 扩展）时使用 SLICO，否则使用纯 NumPy 的简化 SLIC：
+  每个像素只与所在网格及相邻 8 个网格的聚类中心比较，全部为向量化运算
+- 在长边不超过 MAX_SIDE 的缩小图上计算，再按最近邻放大回原图尺寸
+- 颜色在 Lab 空间比较，alpha 作为额外通道，使现有抠图边界也成为超像素边界
+"""
+import traceback
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image, ImageCms
+
+# 计算用缩小图的长边上限
+MAX_SIDE = 1024
+# 超像素数量（原图较小时按 MIN_REGION 限制）
+NUM_SUPERPIXELS = 2000
+MIN_REGION = 8
+# 紧凑度：越大形状越规则，越小越贴合颜色边界
+COMPACTNESS = 10.0
+ITERATIONS = 5
+
+# 延迟检查 OpenCV ximgproc
+_ximgproc_checked = False
+_ximgproc = None
+
+
+def _check_ximgproc():
+    """延迟检查 OpenCV 的 SLIC 实现是否可用（需要 opencv-contrib-python）"""
+    global _ximgproc_checked, _ximgproc
+    if _ximgproc_checked:
+        return _ximgproc is not None
+    _ximgproc_checked = True
+    try:
+        import cv2
+        _ximgproc = cv2.ximgproc
+    except Exception:
+        _ximgproc = None
+    return _ximgproc is not None
+
+
+def _lab_features(image: Image.Image) -> np.ndarray:
+    """(高, 宽, 4) float32：L, a, b 和按 L 的量程缩放的 alpha"""
+    rgba = image.convert("RGBA")
+    srgb = ImageCms.createProfile("sRGB")
+    lab_profile = ImageCms.createProfile("LAB")
+    transform = ImageCms.buildTransformFromOpenProfiles(srgb, lab_profile, "RGB", "LAB")
+    lab = np.asarray(ImageCms.applyTransform(rgba.convert("RGB"), transform), dtype=np.float32)
+    features = np.empty(lab.shape[:2] + (4,), dtype=np.float32)
+    features[..., 0] = lab[..., 0] * (100 / 255)
+    features[..., 1] = lab[..., 1] - 128  # Pillow 的 LAB 中 a / b 以 128 为零点
+    features[..., 2] = lab[..., 2] - 128
+    features[..., 3] = np.asarray(rgba.getchannel("A"), dtype=np.float32) * (100 / 255)
+    return features
+
+
+def _slic_numpy(features: np.ndarray, step: int, cancel: Callable[[], bool]) -> Optional[np.ndarray]:
+    """简化 SLIC，返回 (高, 宽) int32 标签；cancel() 为真时返回 None"""
+    h, w, channels = features.shape
+    ny, nx = max(1, h // step), max(1, w // step)
+    ys = np.arange(h, dtype=np.float32)[:, None]
+    xs = np.arange(w, dtype=np.float32)[None, :]
+    cell_y = np.minimum(np.arange(h) * ny // h, ny - 1)[:, None]
+    cell_x = np.minimum(np.arange(w) * nx // w, nx - 1)[None, :]
+
+    # 初始中心：网格中心
+    cy = ((np.arange(ny) + 0.5) * h / ny).astype(np.intp)
+    cx = ((np.arange(nx) + 0.5) * w / nx).astype(np.intp)
+    center_y = np.repeat(cy, nx).astype(np.float32)
+    center_x = np.tile(cx, ny).astype(np.float32)
+    center_f = features[cy[:, None], cx[None, :]].reshape(-1, channels).copy()
+
+    # 每个像素的 9 个候选中心（网格固定，只计算一次）
+    candidates = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            ky, kx = cell_y + dy, cell_x + dx
+            valid = (ky >= 0) & (ky < ny) & (kx >= 0) & (kx < nx)
+            index = np.clip(ky, 0, ny - 1) * nx + np.clip(kx, 0, nx - 1)
+            candidates.append((index, valid))
+
+    spatial_weight = (COMPACTNESS / step) ** 2
+    flat = features.reshape(-1, channels)
+    labels = np.zeros((h, w), dtype=np.int32)
+    best = np.empty((h, w), dtype=np.float32)
+    n = ny * nx
+    for _ in range(ITERATIONS):
+        if cancel():
+            return None
+        best.fill(np.inf)
+        for index, valid in candidates:
+            dist = ((features - center_f[index]) ** 2).sum(axis=2)
+            dist += spatial_weight * ((ys - center_y[index]) ** 2 + (xs - center_x[index]) ** 2)
+            better = valid & (dist < best)
+            best[better] = dist[better]
+            labels[better] = np.broadcast_to(index, (h, w))[better]
+
+        # 更新中心（空聚类保持原位置）
+        flat_labels = labels.ravel()
+        count = np.bincount(flat_labels, minlength=n).astype(np.float32)
+        filled = count > 0
+        center_y[filled] = (np.bincount(flat_labels, np.broadcast_to(ys, (h, w)).ravel(), n) / np.maximum(count, 1))[filled]
+        center_x[filled] = (np.bincount(flat_labels, np.broadcast_to(xs, (h, w)).ravel(), n) / np.maximum(count, 1))[filled]
+        for c in range(channels):
+            center_f[filled, c] = (np.bincount(flat_labels, flat[:, c], n) / np.maximum(count, 1))[filled]
+    return labels
+
+
+def compute_superpixels(image: Image.Image, cancel: Callable[[], bool] = None) -> Optional[np.ndarray]:
+    """
+    计算超像素标签
+
+    Args:
+        image: PIL Image（任意模式，透明区域参与分割）
+        cancel: 可选的取消检查函数，返回 True 时中止
+
+    Returns:
+        与原图同尺寸的 (高, 宽) int32 标签数组，失败或取消时返回 None
+    """
+    if image is None:
+        return None
+    if cancel is None:
+        cancel = lambda: False
+    try:
+        w, h = image.size
+        scale = min(1.0, MAX_SIDE / max(w, h))
+        pw, ph = max(1, round(w * scale)), max(1, round(h * scale))
+        proxy = image if scale == 1.0 else image.resize((pw, ph), Image.Resampling.BILINEAR)
+        features = _lab_features(proxy)
+        step = max(MIN_REGION, int((pw * ph / NUM_SUPERPIXELS) ** 0.5))
+
+        labels = None
+        if _check_ximgproc():
+            # OpenCV 的 SLIC 支持任意通道数，与 NumPy 实现使用相同的 4 个特征通道
+            try:
+                slic = _ximgproc.createSuperpixelSLIC(features, _ximgproc.SLICO, step)
+                slic.iterate(ITERATIONS)
+                slic.enforceLabelConnectivity()
+                labels = slic.getLabels().astype(np.int32)
+            except Exception as e:
+                print(f"[超像素] OpenCV SLIC 失败，改用 NumPy 实现: {e}")
+                labels = None
+        if labels is None:
+            labels = _slic_numpy(features, step, cancel)
+        if labels is None or cancel():
+            return None
+
+        if (pw, ph) == (w, h):
+            return labels
+        # 最近邻放大回原图尺寸
+        src_y = np.minimum((np.arange(h) * ph) // h, ph - 1)
+        src_x = np.minimum((np.arange(w) * pw) // w, pw - 1)
+        return labels[np.ix_(src_y, src_x)]
+    except Exception as e:
+        print(f"[超像素] 计算失败: {e}")
+        traceback.print_exc()
+        return None
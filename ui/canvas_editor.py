@@ -2,21 +2,57 @@
 画布编辑器 - 核心编辑组件
 """
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea,
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QScrollArea, QScrollBar,
     QFrame, QMenu, QApplication, QRubberBand
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QRect, QSize, QMimeData
+from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QPointF, QRect, QRectF, QSize, QMimeData, QTimer
 from PyQt6.QtGui import (
-    QPainter, QColor, QPen, QBrush, QPixmap, QImage, 
+    QPainter, QColor, QPen, QBrush, QPixmap, QImage, QFont, QFontMetricsF, QFontDatabase,
     QMouseEvent, QWheelEvent, QKeyEvent, QDragEnterEvent, QDropEvent
 )
 
 import sys
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
-from config import UIConfig
+from config import UIConfig, CanvasConfig
 from core.canvas import Canvas, Screen
 from core.layer import Layer, ImageLayer, TextLayer, ShapeLayer
 from core.history import CanvasHistoryManager
+from core.decoder import image_decoder
+from core.events import layer_events, LayerChange
+from core.snapping import snap_bounds
+from core.cache import cache_manager, PIXMAP
+from ui.layer_renderer import LayerRenderer
+
+
+# 画布四周的留白（视口像素）
+VIEW_MARGIN_X = 50
+VIEW_MARGIN_Y = 30
+# 选中框控制点占用的半径（视口像素，含描边）
+HANDLE_SIZE = 6
+# 交互停顿多久后高质量重绘（毫秒）
+INTERACTION_IDLE_MS = 150
+# 缩放范围
+MIN_SCALE = 0.1
+MAX_SCALE = 2.0
+
+
+# QPixmap 只能在 GUI 线程释放
+cache_manager.set_thread_affine(PIXMAP)
+
+
+# 字体文件 -> Qt 字体族名（与导出用的 PIL 字体保持一致）
+_font_families = {}
+
+
+def _font_family_for(path: str) -> str:
+    """加载字体文件并返回字体族名（失败时使用默认字体）"""
+    family = _font_families.get(path)
+    if family is None:
+        font_id = QFontDatabase.addApplicationFont(path)
+        families = QFontDatabase.applicationFontFamilies(font_id) if font_id >= 0 else []
+        family = families[0] if families else ""
+        _font_families[path] = family
+    return family
 
 
 class CanvasWidget(QWidget):
@@ -29,35 +65,74 @@ class CanvasWidget(QWidget):
     screen_right_clicked = pyqtSignal(str, object)  # screen_id, QPoint
     canvas_changed = pyqtSignal()
     drop_image = pyqtSignal(str, int, int)  # path, x, y
+    layer_decoded = pyqtSignal(str)  # layer_id，由解码线程发出
     
     def __init__(self, canvas: Canvas, parent=None):
         super().__init__(parent)
         self.canvas = canvas
         self.history = CanvasHistoryManager(canvas)
         
-        # 视图状态
+        # 视图状态（offset 为画布左上角在组件中的位置，由滚动条决定）
         self.scale = 0.5
-        self.offset_x = 50
-        self.offset_y = 30
+        self.offset_x = VIEW_MARGIN_X
+        self.offset_y = VIEW_MARGIN_Y
+        self.h_scroll = QScrollBar(Qt.Orientation.Horizontal)
+        self.v_scroll = QScrollBar(Qt.Orientation.Vertical)
+        self.h_scroll.valueChanged.connect(self._on_scrolled)
+        self.v_scroll.valueChanged.connect(self._on_scrolled)
+        self._scroll_key = None  # 上次更新滚动范围时的 (画布尺寸, 缩放, 组件尺寸)
         
         # 交互状态
         self.current_tool = "select"  # select, text, rectangle, ellipse
         self.is_dragging = False
         self.is_resizing = False
+        self.is_panning = False
         self.resize_handle = None
         self.drag_start = QPoint()
-        self.drag_layer_start = (0, 0)
+        self._drag_starts = []  # [(图层, 拖动开始时的 (x, y, 宽, 高))]，只含未锁定的选中图层
+        self._drag_bounds = None  # 拖动开始时的选择范围
         
-        # 选择框
+        # 选择框（Shift / Ctrl 拖出时加入当前选择）
         self.rubber_band = None
         self.rubber_band_origin = QPoint()
+        self._rubber_band_add = False
+        
+        # 选择范围缓存，选中图层或其几何属性变化时重新计算
+        self._selection_bounds = None
+        self._selection_key = None
+        self._selection_version = 0
         
         # 对齐辅助线
         self.show_guides = True
         self.guide_lines = []
         
+        # 上次绘制的选中框（组件坐标），移动时与新位置一起重绘
+        self._selection_rect = None
+        
+        # 背景网格缓存，组件尺寸变化时重建
+        self._backdrop = None
+        self._backdrop_key = None
+        
         # 图层缓存（优化性能）
-        self._pixmap_cache = {}  # layer_id -> (cache_key, QPixmap)
+        # 视口位图存放在统一缓存管理器中：内容指纹_缩放 -> (QPixmap, dx, dy)，内容相同的图层共用
+        self._last_drawn = {}  # 图层 id -> (QPixmap, dx, dy, 绘制宽, 绘制高)，交互或后台渲染时拉伸显示
+        
+        # 后台渲染图层位图，结果回到 GUI 线程写入缓存
+        self._renderer = LayerRenderer(self)
+        self._renderer.rendered.connect(self._on_layer_rendered)
+        
+        # 交互模式：拖动控制点、缩放时快速拉伸旧位图，停顿或松开后再高质量渲染
+        self._fast_paint = False
+        self._hq_timer = QTimer(self)
+        self._hq_timer.setSingleShot(True)
+        self._hq_timer.setInterval(INTERACTION_IDLE_MS)
+        self._hq_timer.timeout.connect(self._finish_interaction)
+        
+        # 后台解码完成后在 GUI 线程刷新图层
+        self.layer_decoded.connect(self._on_layer_decoded)
+        
+        # 订阅图层属性变更，按需失效缓存并重绘
+        layer_events.subscribe(self._on_layer_changed)
         
         self._setup_ui()
         self.setMouseTracking(True)
@@ -71,31 +146,90 @@ class CanvasWidget(QWidget):
         theme = UIConfig.THEME
         self.setStyleSheet(f"background-color: {theme['bg_primary']};")
     
+    # ========== 视口 ==========
+    
+    def _update_scroll_range(self):
+        """根据画布尺寸和缩放更新滚动范围"""
+        content_w = int(self.canvas.width * self.scale) + 2 * VIEW_MARGIN_X
+        content_h = int(self.canvas.height * self.scale) + 2 * VIEW_MARGIN_Y
+        self._scroll_key = (self.canvas.width, self.canvas.height, self.scale, self.width(), self.height())
+        for bar, content, page in ((self.h_scroll, content_w, self.width()),
+                                   (self.v_scroll, content_h, self.height())):
+            bar.blockSignals(True)
+            bar.setPageStep(page)
+            bar.setSingleStep(40)
+            bar.setRange(0, max(0, content - page))
+            bar.blockSignals(False)
+        self._sync_offsets()
+    
+    def _sync_offsets(self):
+        self.offset_x = VIEW_MARGIN_X - self.h_scroll.value()
+        self.offset_y = VIEW_MARGIN_Y - self.v_scroll.value()
+    
+    def _on_scrolled(self, _value: int):
+        self._sync_offsets()
+        self.update()
+    
+    def scroll_by(self, dx: int, dy: int):
+        """滚动视口（视口像素）"""
+        self.h_scroll.setValue(self.h_scroll.value() + dx)
+        self.v_scroll.setValue(self.v_scroll.value() + dy)
+    
+    def _mark_interacting(self):
+        """进入（或延续）交互模式"""
+        self._fast_paint = True
+        self._hq_timer.start()
+    
+    def _finish_interaction(self):
+        """结束交互模式并高质量重绘"""
+        self._hq_timer.stop()
+        if self._fast_paint:
+            self._fast_paint = False
+            self.update()
+    
+    def visible_canvas_rect(self, rect: QRect = None) -> tuple:
+        """组件中的矩形（默认整个组件）对应的画布范围 (x0, y0, x1, y1)"""
+        rect = rect or self.rect()
+        return (int((rect.left() - self.offset_x) / self.scale) - 1,
+                int((rect.top() - self.offset_y) / self.scale) - 1,
+                int((rect.right() + 1 - self.offset_x) / self.scale) + 1,
+                int((rect.bottom() + 1 - self.offset_y) / self.scale) + 1)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_range()
+    
     def paintEvent(self, event):
         """绑定绑定绘制事件"""
+        # 画布尺寸（分屏增减、调整高度）或缩放变化后更新滚动范围
+        if self._scroll_key != (self.canvas.width, self.canvas.height, self.scale, self.width(), self.height()):
+            self._update_scroll_range()
+        
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
         
         theme = UIConfig.THEME
         
-        # 绘制背景网格
-        self._draw_grid(painter)
-        
         # 计算画布位置
         canvas_x = self.offset_x
         canvas_y = self.offset_y
         canvas_w = int(self.canvas.width * self.scale)
         canvas_h = int(self.canvas.height * self.scale)
         
-        # 绘制画布背景（白色）
-        painter.fillRect(canvas_x, canvas_y, canvas_w, canvas_h, QColor(self.canvas.background_color))
+        # 背景网格（缓存的整屏位图，只复制重绘区域），画布底色按当前偏移绘制
+        painter.drawPixmap(event.rect(), self._get_backdrop(), self._backdrop_source_rect(event.rect()))
+        painter.fillRect(QRect(canvas_x, canvas_y, canvas_w, canvas_h).intersected(event.rect()),
+                         QColor(self.canvas.background_color))
+        
+        # 只绘制与重绘区域相交的图层和分屏
+        visible = self.visible_canvas_rect(event.rect())
         
         # 先渲染图层（图层在分屏标签下面）
-        self._draw_layers(painter, canvas_x, canvas_y)
+        self._draw_layers(painter, canvas_x, canvas_y, visible)
         
         # 再绘制分屏分隔线和标签（在图层上面）
-        self._draw_screen_dividers(painter, canvas_x, canvas_y)
+        self._draw_screen_dividers(painter, canvas_x, canvas_y, visible)
         
         # 绘制选中图层的边框和控制点
         self._draw_selection(painter, canvas_x, canvas_y)
@@ -112,6 +246,30 @@ class CanvasWidget(QWidget):
         painter.setPen(QColor(theme['accent']))
         painter.drawText(canvas_x, canvas_y - 5, f"{self.canvas.width}px")
     
+    def _get_backdrop(self) -> QPixmap:
+        """背景网格的缓存位图（网格固定在组件坐标上，只随组件尺寸变化，滚动时不重建）"""
+        key = (self.width(), self.height(), self.devicePixelRatioF())
+        if self._backdrop is not None and self._backdrop_key == key:
+            return self._backdrop
+        
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(max(1, round(self.width() * ratio)), max(1, round(self.height() * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor(UIConfig.THEME['bg_primary']))
+        painter = QPainter(pixmap)
+        self._draw_grid(painter)
+        painter.end()
+        
+        self._backdrop = pixmap
+        self._backdrop_key = key
+        return pixmap
+    
+    def _backdrop_source_rect(self, rect: QRect) -> QRect:
+        """组件矩形在背景位图中的像素范围"""
+        ratio = self._backdrop.devicePixelRatio()
+        return QRect(round(rect.x() * ratio), round(rect.y() * ratio),
+                     round(rect.width() * ratio), round(rect.height() * ratio))
+    
     def _draw_grid(self, painter: QPainter):
         """绘制背景网格"""
         theme = UIConfig.THEME
@@ -124,12 +282,21 @@ class CanvasWidget(QWidget):
         for y in range(0, self.height(), grid_size):
             painter.drawLine(0, y, self.width(), y)
     
-    def _draw_screen_dividers(self, painter: QPainter, canvas_x: int, canvas_y: int):
-        """绘制分屏分隔线"""
+    def _draw_screen_dividers(self, painter: QPainter, canvas_x: int, canvas_y: int, visible: tuple):
+        """绘制分屏分隔线（跳过视口外的分屏）"""
         theme = UIConfig.THEME
         y_offset = 0
+        # 分隔线手柄和标签会超出分屏边界几个像素
+        slack = int(10 / self.scale) + 1
+        top, bottom = visible[1] - slack, visible[3] + slack
         
         for i, screen in enumerate(self.canvas.screens):
+            if y_offset > bottom:
+                break
+            if y_offset + screen.height < top:
+                y_offset += screen.height
+                continue
+            
             screen_y = canvas_y + int(y_offset * self.scale)
             screen_h = int(screen.height * self.scale)
             
@@ -164,9 +331,9 @@ class CanvasWidget(QWidget):
             
             y_offset += screen.height
     
-    def _draw_layers(self, painter: QPainter, canvas_x: int, canvas_y: int):
-        """绘制图层（带缓存优化）"""
-        for layer in self.canvas.layers:
+    def _draw_layers(self, painter: QPainter, canvas_x: int, canvas_y: int, visible: tuple):
+        """绘制与可见范围相交的图层（带缓存优化）"""
+        for layer in self.canvas.get_layers_in_rect(*visible):
             if not layer.visible:
                 continue
             
@@ -176,68 +343,277 @@ class CanvasWidget(QWidget):
             if scaled_w <= 0 or scaled_h <= 0:
                 continue
             
-            # 生成缓存键（包含图层属性和缩放比例）
-            cache_key = f"{layer.width}_{layer.height}_{layer.rotation}_{layer.opacity}_{self.scale}"
+            # 形状和无效果的文字按当前缩放直接绘制矢量，不生成位图
+            if self._is_vector_layer(layer):
+                self._draw_vector_layer(painter, layer,
+                                        canvas_x + int(layer.x * self.scale),
+                                        canvas_y + int(layer.y * self.scale))
+                continue
             
-            # 检查缓存
-            cached = self._pixmap_cache.get(layer.id)
-            if cached and cached[0] == cache_key:
-                # 使用缓存的 QPixmap
-                scaled_pixmap = cached[1]
-            else:
-                # 需要重新渲染
-                layer_img = layer.render()
-                if layer_img is None:
-                    continue
+            # 生成缓存键（图层内容指纹 + 缩放比例）
+            cache_key = f"{layer.content_fingerprint()}_{self.scale}"
+            
+            # 检查缓存（复制出的图层与原图层内容相同，共用同一个 QPixmap）
+            cached = cache_manager.get(PIXMAP, cache_key)
+            if cached is None:
+                # 拖动控制点 / 缩放过程中不提交渲染，松开或停顿后再高质量渲染
+                last = self._last_drawn.get(layer.id)
+                if not (self._fast_paint and last is not None):
+                    self._request_render(layer, cache_key, scaled_w, scaled_h)
                 
-                # PIL Image 转 QPixmap
-                try:
-                    img_data = layer_img.tobytes("raw", "RGBA")
-                    qimg = QImage(img_data, layer_img.width, layer_img.height, QImage.Format.Format_RGBA8888)
-                    pixmap = QPixmap.fromImage(qimg)
-                    
-                    # 缩放
-                    scaled_pixmap = pixmap.scaled(
-                        scaled_w, scaled_h, 
-                        Qt.AspectRatioMode.IgnoreAspectRatio, 
-                        Qt.TransformationMode.SmoothTransformation
-                    )
-                    
-                    # 更新缓存
-                    self._pixmap_cache[layer.id] = (cache_key, scaled_pixmap)
-                except Exception as e:
-                    print(f"渲染图层 {layer.id} 失败: {e}")
-                    continue
+                # 后台解码 / 渲染完成前拉伸显示上次绘制的位图
+                if last is not None:
+                    pixmap, dx, dy, last_w, last_h = last
+                    fx, fy = scaled_w / last_w, scaled_h / last_h
+                    self._blit_layer(painter, layer, canvas_x, canvas_y, pixmap,
+                                     QRectF(dx * fx, dy * fy, pixmap.width() * fx, pixmap.height() * fy),
+                                     smooth=False)
+                elif layer.is_decoding():
+                    # 图片仍在后台解码且没有可显示的位图，先绘制占位框
+                    x = canvas_x + int(layer.x * self.scale)
+                    y = canvas_y + int(layer.y * self.scale)
+                    self._draw_placeholder(painter, QRect(x, y, scaled_w, scaled_h))
+                continue
             
-            # 绘制
-            x = canvas_x + int(layer.x * self.scale)
-            y = canvas_y + int(layer.y * self.scale)
-            painter.drawPixmap(x, y, scaled_pixmap)
+            pixmap, dx, dy = cached
+            self._last_drawn[layer.id] = (pixmap, dx, dy, scaled_w, scaled_h)
+            self._blit_layer(painter, layer, canvas_x, canvas_y, pixmap,
+                             QRectF(dx, dy, pixmap.width(), pixmap.height()))
+        
+        # 上次绘制的位图只为视口内的图层保留（视口外的由缓存管理器按预算保留）
+        if len(self._last_drawn) > 64:
+            live_ids = {layer.id for layer in self.canvas.get_layers_in_rect(*self.visible_canvas_rect())}
+            self._last_drawn = {k: v for k, v in self._last_drawn.items() if k in live_ids}
+    
+    def _request_render(self, layer: Layer, cache_key: str, scaled_w: int, scaled_h: int):
+        """提交后台渲染（未解码的图片先交给解码线程池）"""
+        image_decoder.decode_layers([layer], self.layer_decoded.emit)
+        if layer.is_decoding():
+            return
+        self._renderer.request(layer, cache_key, scaled_w, scaled_h)
+    
+    def _on_layer_rendered(self, cache_key: str, generation: int, image, dx: int, dy: int):
+        """后台渲染完成（GUI 线程）"""
+        if not self._renderer.finish(cache_key, generation) or image is None:
+            return
+        pixmap = QPixmap.fromImage(image)
+        cache_manager.put(PIXMAP, cache_key, (pixmap, dx, dy), pixmap.width() * pixmap.height() * 4)
+        self.update()
+    
+    def wait_for_renders(self, msecs: int = -1):
+        """等待后台渲染完成并取回结果（截图、测试用）"""
+        self._renderer.wait(msecs)
+        QApplication.sendPostedEvents(self._renderer)
+        QApplication.processEvents()
+    
+    def _blit_layer(self, painter: QPainter, layer: Layer, canvas_x: int, canvas_y: int,
+                    pixmap: QPixmap, target: QRectF, smooth: bool = True):
+        """绘制图层位图，target 相对图层左上角（旋转和透明度在绘制时应用，缓存的位图不随之失效）"""
+        x = canvas_x + int(layer.x * self.scale)
+        y = canvas_y + int(layer.y * self.scale)
+        painter.save()
+        painter.setOpacity(layer.opacity)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, smooth)
+        if layer.rotation % 360 != 0:
+            cx = canvas_x + (layer.x + layer.width / 2) * self.scale
+            cy = canvas_y + (layer.y + layer.height / 2) * self.scale
+            painter.translate(cx, cy)
+            painter.rotate(layer.rotation)
+            painter.translate(-cx, -cy)
+        painter.drawPixmap(target.translated(x, y), pixmap, QRectF(pixmap.rect()))
+        painter.restore()
+    
+    @staticmethod
+    def _is_vector_layer(layer: Layer) -> bool:
+        """是否可以在视口中直接绘制矢量（导出仍使用 PIL 渲染）"""
+        if isinstance(layer, ShapeLayer):
+            return True
+        return isinstance(layer, TextLayer) and not layer.effects
+    
+    def _draw_vector_layer(self, painter: QPainter, layer: Layer, x: int, y: int):
+        """用 QPainter 绘制形状 / 文字图层"""
+        w, h = layer.width, layer.height
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.setOpacity(layer.opacity)
+        
+        # 坐标系：图层左上角为原点、单位为画布像素
+        painter.translate(x, y)
+        painter.scale(self.scale, self.scale)
+        if layer.rotation % 360 != 0:
+            # 绕图层中心旋转，与 composite_into 一致
+            painter.translate(w / 2, h / 2)
+            painter.rotate(layer.rotation)
+            painter.translate(-w / 2, -h / 2)
+        
+        if isinstance(layer, ShapeLayer):
+            self._paint_shape(painter, layer)
+        else:
+            self._paint_text(painter, layer)
+        painter.restore()
+    
+    @staticmethod
+    def _paint_shape(painter: QPainter, layer: ShapeLayer):
+        """绘制形状（描边向内，与 PIL 渲染一致）"""
+        w, h = layer.width, layer.height
+        fill = QColor(*layer._hex_to_rgba(layer.fill_color))
+        stroke = QColor(*layer._hex_to_rgba(layer.stroke_color)) if layer.stroke_width > 0 else None
+        
+        if layer.shape_type == "line":
+            pen = QPen(stroke or fill, layer.stroke_width or 2)
+            pen.setCapStyle(Qt.PenCapStyle.FlatCap)
+            painter.setPen(pen)
+            painter.drawLine(QPointF(0, h / 2), QPointF(w, h / 2))
+            return
+        
+        sw = layer.stroke_width if stroke is not None else 0
+        rect = QRectF(sw / 2, sw / 2, w - sw, h - sw)
+        painter.setBrush(QBrush(fill))
+        if stroke is not None:
+            pen = QPen(stroke, sw)
+            pen.setJoinStyle(Qt.PenJoinStyle.MiterJoin)
+            painter.setPen(pen)
+        else:
+            painter.setPen(Qt.PenStyle.NoPen)
+        if layer.shape_type == "ellipse":
+            painter.drawEllipse(rect)
+        else:
+            painter.drawRect(rect)
+    
+    @staticmethod
+    def _paint_text(painter: QPainter, layer: TextLayer):
+        """绘制文字（左上角对齐，超出图层范围的部分裁掉，与 PIL 渲染一致）"""
+        font = QFont()
+        family = _font_family_for(layer._get_font_path())
+        if family:
+            font.setFamily(family)
+        font.setPixelSize(max(1, layer.font_size))
+        metrics = QFontMetricsF(font)
+        
+        painter.setClipRect(QRectF(0, 0, layer.width, layer.height))
+        painter.setFont(font)
+        painter.setPen(QColor(*layer._hex_to_rgba(layer.font_color)))
+        baseline = metrics.ascent()
+        for line in layer.text.split("\n"):
+            painter.drawText(QPointF(0, baseline), line)
+            baseline += metrics.height() + 4  # PIL 多行文字默认行距 4px
+    
+    def _draw_placeholder(self, painter: QPainter, rect: QRect):
+        """绘制图片加载占位框"""
+        painter.fillRect(rect, QColor(235, 235, 235))
+        painter.setPen(QPen(QColor("#bbbbbb"), 1, Qt.PenStyle.DashLine))
+        painter.drawRect(rect)
+        painter.setPen(QColor("#999999"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "加载中...")
+    
+    def schedule_decode(self):
+        """将所有未解码的图片图层提交到后台线程池"""
+        image_decoder.decode_layers(self.canvas.layers, self.layer_decoded.emit)
+    
+    def _on_layer_decoded(self, layer_id: str):
+        """图片解码完成"""
+        self.update()
+    
+    def _on_layer_changed(self, change: LayerChange):
+        """图层属性变化时只重绘图层新旧范围（内容变化会得到新的指纹，旧缓存在绘制时淘汰）"""
+        layer = change.layer
+        if layer._parent is not None:
+            # 组内图层的坐标相对于所在组
+            self.update()
+            return
+        
+        region = self._view_rect(layer.get_render_bounds())
+        if change.old_bounds is not None:
+            region = region.united(self._view_rect(change.old_bounds))
+        if layer.id in self.canvas.selected_layer_ids:
+            if change.bounds_changed:
+                self._selection_version += 1
+            bounds = self.selection_bounds()
+            if bounds is not None:
+                region = region.united(self._selection_view_rect(bounds))
+            if self._selection_rect is not None:
+                region = region.united(self._selection_rect)
+        self.update(region)
+    
+    def _view_rect(self, bounds: tuple, pad: int = 2) -> QRect:
+        """画布范围 (x0, y0, x1, y1) 对应的组件矩形（向外留出 pad 像素抗锯齿余量）"""
+        x0, y0, x1, y1 = bounds
+        left = self.offset_x + int(x0 * self.scale) - pad
+        top = self.offset_y + int(y0 * self.scale) - pad
+        right = self.offset_x + int(x1 * self.scale) + pad + 1
+        bottom = self.offset_y + int(y1 * self.scale) + pad + 1
+        return QRect(left, top, right - left, bottom - top)
+    
+    def _selection_view_rect(self, bounds: tuple) -> QRect:
+        """选中框及控制点占用的组件矩形"""
+        return self._view_rect(bounds, pad=HANDLE_SIZE)
+    
+    def selection_bounds(self) -> tuple:
+        """选中图层的外接范围 (x0, y0, x1, y1)（缓存），没有选中时为 None"""
+        ids = tuple(self.canvas.selected_layer_ids)
+        key = self._selection_key
+        # 撤销 / 重做会整体替换图层列表，列表对象变化时同样重新计算
+        if key is None or key[0] != ids or key[1] is not self.canvas.layers or key[2] != self._selection_version:
+            bounds = [layer.get_bounds() for layer in self.canvas.get_selected_layers()]
+            self._selection_bounds = (
+                (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                 max(b[2] for b in bounds), max(b[3] for b in bounds)) if bounds else None
+            )
+            self._selection_key = (ids, self.canvas.layers, self._selection_version)
+        return self._selection_bounds
+    
+    def _guides_view_rect(self) -> QRect:
+        """对齐辅助线占用的组件矩形"""
+        region = QRect()
+        canvas_w = int(self.canvas.width * self.scale)
+        canvas_h = int(self.canvas.height * self.scale)
+        for line in self.guide_lines:
+            if line['type'] == 'vertical':
+                x = self.offset_x + int(line['pos'] * self.scale)
+                region = region.united(QRect(x - 1, self.offset_y, 3, canvas_h + 1))
+            else:
+                y = self.offset_y + int(line['pos'] * self.scale)
+                region = region.united(QRect(self.offset_x, y - 1, canvas_w + 1, 3))
+        return region
     
     def invalidate_layer_cache(self, layer_id: str = None):
         """清除图层缓存"""
-        if layer_id:
-            self._pixmap_cache.pop(layer_id, None)
-        else:
-            self._pixmap_cache.clear()
+        layer = self.canvas.get_layer(layer_id) if layer_id else None
+        if layer:
+            cache_manager.discard(PIXMAP, f"{layer.content_fingerprint()}_{self.scale}")
+            self._last_drawn.pop(layer.id, None)
+        elif not layer_id:
+            cache_manager.clear(PIXMAP)
+            self._last_drawn.clear()
+            self._renderer.invalidate()
     
     def _draw_selection(self, painter: QPainter, canvas_x: int, canvas_y: int):
-        """绘制选中框"""
-        layer = self.canvas.get_selected_layer()
-        if layer is None:
+        """绘制选中框（多选时每个图层画细框，控制点画在整体范围上）"""
+        bounds = self.selection_bounds()
+        if bounds is None:
+            self._selection_rect = None
             return
         
         theme = UIConfig.THEME
         
+        if len(self.canvas.selected_layer_ids) > 1:
+            painter.setPen(QPen(QColor(theme['accent']), 1, Qt.PenStyle.DotLine))
+            for layer in self.canvas.get_selected_layers():
+                painter.drawRect(canvas_x + int(layer.x * self.scale), canvas_y + int(layer.y * self.scale),
+                                 int(layer.width * self.scale), int(layer.height * self.scale))
+        
         # 计算位置
-        x = canvas_x + int(layer.x * self.scale)
-        y = canvas_y + int(layer.y * self.scale)
-        w = int(layer.width * self.scale)
-        h = int(layer.height * self.scale)
+        x0, y0, x1, y1 = bounds
+        x = canvas_x + int(x0 * self.scale)
+        y = canvas_y + int(y0 * self.scale)
+        w = int((x1 - x0) * self.scale)
+        h = int((y1 - y0) * self.scale)
         
         # 选中框
         painter.setPen(QPen(QColor(theme['accent']), 2, Qt.PenStyle.DashLine))
         painter.drawRect(x, y, w, h)
+        self._selection_rect = self._selection_view_rect(bounds)
         
         # 控制点
         handle_size = 8
@@ -281,30 +657,47 @@ class CanvasWidget(QWidget):
         cx = int((pos.x() - canvas_x) / self.scale)
         cy = int((pos.y() - canvas_y) / self.scale)
         
+        if event.button() == Qt.MouseButton.MiddleButton:
+            # 中键拖动平移视口
+            self.is_panning = True
+            self.drag_start = pos
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+            return
+        
         if event.button() == Qt.MouseButton.LeftButton:
+            # Shift / Ctrl 点击切换选中状态，拖出选择框时加入当前选择
+            toggle = bool(event.modifiers() & (Qt.KeyboardModifier.ShiftModifier
+                                               | Qt.KeyboardModifier.ControlModifier))
+            
             # 检查是否点击了控制点
-            handle = self._get_resize_handle(pos)
+            handle = None if toggle else self._get_resize_handle(pos)
             if handle is not None:
                 self.is_resizing = True
                 self.resize_handle = handle
                 self.drag_start = pos
-                layer = self.canvas.get_selected_layer()
-                if layer:
-                    self.drag_layer_start = (layer.x, layer.y, layer.width, layer.height)
+                self._begin_transform()
                 return
             
             # 检查是否点击了图层
             layer = self.canvas.get_layer_at_point(cx, cy)
             if layer:
-                self.canvas.select_layer(layer.id)
-                self.layer_selected.emit(layer.id)
-                self.is_dragging = True
-                self.drag_start = pos
-                self.drag_layer_start = (layer.x, layer.y)
+                if toggle:
+                    selected = self.canvas.toggle_layer_selection(layer.id)
+                else:
+                    # 点击已选中的图层时保持多选，整体拖动
+                    if not self.canvas.is_selected(layer.id):
+                        self.canvas.select_layer(layer.id)
+                    selected = True
+                if selected:
+                    self.is_dragging = True
+                    self.drag_start = pos
+                    self._begin_transform()
             else:
-                self.canvas.selected_layer_id = None
-                self.layer_selected.emit("")
+                if not toggle:
+                    self.canvas.selected_layer_id = None
+                self._start_rubber_band(pos, toggle)
             
+            self.layer_selected.emit(self.canvas.selected_layer_id or "")
             self.update()
         
         elif event.button() == Qt.MouseButton.RightButton:
@@ -317,78 +710,51 @@ class CanvasWidget(QWidget):
         """鼠标移动"""
         pos = event.position().toPoint()
         
-        if self.is_dragging:
-            layer = self.canvas.get_selected_layer()
-            if layer and not layer.locked:
+        if self.is_panning:
+            delta = pos - self.drag_start
+            self.drag_start = pos
+            self.scroll_by(-delta.x(), -delta.y())
+        
+        elif self.rubber_band is not None and self.rubber_band.isVisible():
+            self.rubber_band.setGeometry(QRect(self.rubber_band_origin, pos).normalized())
+        
+        elif self.is_dragging:
+            if self._drag_starts:
                 dx = int((pos.x() - self.drag_start.x()) / self.scale)
                 dy = int((pos.y() - self.drag_start.y()) / self.scale)
                 
-                layer.x = self.drag_layer_start[0] + dx
-                layer.y = self.drag_layer_start[1] + dy
-                
-                # 计算对齐辅助线
-                self._calculate_guides(layer)
+                # 图层移动通过变更事件只重绘新旧范围
+                for layer, (ox, oy, _ow, _oh) in self._drag_starts:
+                    layer.x = ox + dx
+                    layer.y = oy + dy
                 
-                self.update()
+                # 计算对齐辅助线（重绘新旧辅助线所在区域）
+                old_guides = self._guides_view_rect()
+                self._calculate_guides([layer for layer, _start in self._drag_starts])
+                self.update(old_guides.united(self._guides_view_rect()))
         
         elif self.is_resizing:
-            layer = self.canvas.get_selected_layer()
-            if layer and not layer.locked:
+            if self._drag_starts:
                 dx = int((pos.x() - self.drag_start.x()) / self.scale)
                 dy = int((pos.y() - self.drag_start.y()) / self.scale)
                 
-                ox, oy, ow, oh = self.drag_layer_start
-                aspect_ratio = ow / oh if oh > 0 else 1  # 原始宽高比
-                
-                # 四个角点保持比例缩放
-                if self.resize_handle in [0, 2, 5, 7]:  # 角点
-                    # 根据拖动距离较大的方向计算新尺寸
-                    if abs(dx) > abs(dy):
-                        # 水平方向主导
-                        if self.resize_handle in [0, 5]:  # 左侧角点
-                            new_w = max(10, ow - dx)
-                        else:  # 右侧角点
-                            new_w = max(10, ow + dx)
-                        new_h = int(new_w / aspect_ratio)
-                    else:
-                        # 垂直方向主导
-                        if self.resize_handle in [0, 2]:  # 上侧角点
-                            new_h = max(10, oh - dy)
-                        else:  # 下侧角点
-                            new_h = max(10, oh + dy)
-                        new_w = int(new_h * aspect_ratio)
-                    
-                    new_w = max(10, new_w)
-                    new_h = max(10, new_h)
-                    
-                    # 调整位置（左上角点需要移动）
-                    if self.resize_handle == 0:  # 左上
-                        layer.x = ox + (ow - new_w)
-                        layer.y = oy + (oh - new_h)
-                    elif self.resize_handle == 2:  # 右上
-                        layer.y = oy + (oh - new_h)
-                    elif self.resize_handle == 5:  # 左下
-                        layer.x = ox + (ow - new_w)
-                    # 右下角不需要移动位置
-                    
-                    layer.width = new_w
-                    layer.height = new_h
+                if len(self._drag_starts) == 1:
+                    layer, start = self._drag_starts[0]
+                    layer.x, layer.y, layer.width, layer.height = self._resized_rect(self.resize_handle, start, dx, dy)
                 else:
-                    # 边缘控制点：自由缩放
-                    if self.resize_handle == 3:  # 左中
-                        layer.x = ox + dx
-                        layer.width = max(10, ow - dx)
-                    elif self.resize_handle == 4:  # 右中
-                        layer.width = max(10, ow + dx)
-                    elif self.resize_handle == 1:  # 上中
-                        layer.y = oy + dy
-                        layer.height = max(10, oh - dy)
-                    elif self.resize_handle == 6:  # 下中
-                        layer.height = max(10, oh + dy)
+                    # 多选：按整体范围缩放，各图层保持相对位置
+                    bx0, by0, bx1, by1 = self._drag_bounds
+                    x, y, w, h = self._resized_rect(self.resize_handle, (bx0, by0, bx1 - bx0, by1 - by0), dx, dy)
+                    sx = w / max(1, bx1 - bx0)
+                    sy = h / max(1, by1 - by0)
+                    for layer, (ox, oy, ow, oh) in self._drag_starts:
+                        layer.x = x + round((ox - bx0) * sx)
+                        layer.y = y + round((oy - by0) * sy)
+                        layer.width = max(1, round(ow * sx))
+                        layer.height = max(1, round(oh * sy))
                 
-                # 清除该图层的缓存
-                self.invalidate_layer_cache(layer.id)
-                self.update()
+                # 尺寸变化会通过图层变更事件失效缓存并重绘新旧范围
+                self._mark_interacting()
         
         else:
             # 更新鼠标光标
@@ -410,33 +776,56 @@ class CanvasWidget(QWidget):
     
     def mouseReleaseEvent(self, event: QMouseEvent):
         """鼠标释放"""
-        if self.is_dragging or self.is_resizing:
+        if self.is_panning:
+            self.is_panning = False
+            self.setCursor(Qt.CursorShape.ArrowCursor)
+            return
+        
+        if self.rubber_band is not None and self.rubber_band.isVisible():
+            self._finish_rubber_band()
+        
+        # 整个选择的移动 / 缩放只记录一次历史（单击未移动时不记录）
+        moved = any((layer.x, layer.y, layer.width, layer.height) != start
+                    for layer, start in self._drag_starts)
+        if (self.is_dragging or self.is_resizing) and moved:
             self.history.save_state("移动/调整图层")
             self.canvas_changed.emit()
         
+        self._drag_starts = []
         self.is_dragging = False
         self.is_resizing = False
         self.resize_handle = None
         self.guide_lines = []
+        self._finish_interaction()
         self.update()
     
     def wheelEvent(self, event: QWheelEvent):
-        """鼠标滚轮缩放"""
-        delta = event.angleDelta().y()
-        if delta > 0:
-            self.scale = min(2.0, self.scale * 1.1)
-        else:
-            self.scale = max(0.2, self.scale / 1.1)
-        self.update()
+        """滚轮滚动视口，Ctrl + 滚轮以光标为中心缩放"""
+        delta = event.angleDelta()
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            if delta.y() == 0:
+                return
+            factor = 1.1 if delta.y() > 0 else 1 / 1.1
+            self.set_scale(self.scale * factor, event.position())
+            return
+        
+        # 触控板提供像素增量，鼠标滚轮按每格 120 换算
+        pixels = event.pixelDelta()
+        dx, dy = (pixels.x(), pixels.y()) if not pixels.isNull() else (delta.x() // 2, delta.y() // 2)
+        if event.modifiers() & Qt.KeyboardModifier.ShiftModifier:
+            dx, dy = dy, dx
+        self.scroll_by(-dx, -dy)
     
     def keyPressEvent(self, event: QKeyEvent):
         """键盘事件"""
-        layer = self.canvas.get_selected_layer()
+        layers = self.canvas.get_selected_layers()
         
         if event.key() == Qt.Key.Key_Delete:
-            if layer:
-                self.canvas.remove_layer(layer.id)
+            if layers:
+                for layer in layers:
+                    self.canvas.remove_layer(layer.id)
                 self.history.save_state("删除图层")
+                self.layer_selected.emit("")
                 self.canvas_changed.emit()
                 self.update()
         
@@ -445,35 +834,34 @@ class CanvasWidget(QWidget):
                 self.history.redo()
             else:
                 self.history.undo()
+            self.schedule_decode()
             self.canvas_changed.emit()
             self.update()
         
         elif event.key() in [Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_Left, Qt.Key.Key_Right]:
-            if layer and not layer.locked:
-                step = 10 if event.modifiers() & Qt.KeyboardModifier.ShiftModifier else 1
-                if event.key() == Qt.Key.Key_Up:
-                    layer.y -= step
-                elif event.key() == Qt.Key.Key_Down:
-                    layer.y += step
-                elif event.key() == Qt.Key.Key_Left:
-                    layer.x -= step
-                elif event.key() == Qt.Key.Key_Right:
-                    layer.x += step
-                self.update()
+            step = 10 if event.modifiers() & Qt.KeyboardModifier.ShiftModifier else 1
+            dx, dy = {
+                Qt.Key.Key_Up: (0, -step), Qt.Key.Key_Down: (0, step),
+                Qt.Key.Key_Left: (-step, 0), Qt.Key.Key_Right: (step, 0),
+            }[event.key()]
+            for layer in layers:
+                if not layer.locked:
+                    layer.move(dx, dy)
     
     def _get_resize_handle(self, pos: QPoint) -> int:
-        """获取鼠标位置的控制点索引"""
-        layer = self.canvas.get_selected_layer()
-        if layer is None:
+        """获取鼠标位置的控制点索引（控制点位于整个选择范围上）"""
+        bounds = self.selection_bounds()
+        if bounds is None:
             return None
         
         canvas_x = self.offset_x
         canvas_y = self.offset_y
         
-        x = canvas_x + int(layer.x * self.scale)
-        y = canvas_y + int(layer.y * self.scale)
-        w = int(layer.width * self.scale)
-        h = int(layer.height * self.scale)
+        x0, y0, x1, y1 = bounds
+        x = canvas_x + int(x0 * self.scale)
+        y = canvas_y + int(y0 * self.scale)
+        w = int((x1 - x0) * self.scale)
+        h = int((y1 - y0) * self.scale)
         
         handle_size = 12
         handles = [
@@ -488,15 +876,95 @@ class CanvasWidget(QWidget):
         
         return None
     
-    def _calculate_guides(self, layer: Layer):
-        """计算对齐辅助线"""
-        self.guide_lines = []
+    def _begin_transform(self):
+        """记录选中图层（跳过锁定的）在拖动 / 缩放开始时的位置和尺寸"""
+        self._drag_starts = [(layer, (layer.x, layer.y, layer.width, layer.height))
+                             for layer in self.canvas.get_selected_layers() if not layer.locked]
+        self._drag_bounds = self.selection_bounds()
+    
+    @staticmethod
+    def _resized_rect(handle: int, rect: tuple, dx: int, dy: int) -> tuple:
+        """拖动控制点后的 (x, y, 宽, 高)：角点保持比例，边缘控制点自由缩放"""
+        ox, oy, ow, oh = rect
+        x, y, new_w, new_h = ox, oy, ow, oh
+        aspect_ratio = ow / oh if oh > 0 else 1  # 原始宽高比
         
-        # 画布中心线
-        center_x = self.canvas.width // 2
-        if abs(layer.x + layer.width // 2 - center_x) < 10:
-            self.guide_lines.append({'type': 'vertical', 'pos': center_x})
-            layer.x = center_x - layer.width // 2
+        # 四个角点保持比例缩放
+        if handle in [0, 2, 5, 7]:  # 角点
+            # 根据拖动距离较大的方向计算新尺寸
+            if abs(dx) > abs(dy):
+                # 水平方向主导
+                if handle in [0, 5]:  # 左侧角点
+                    new_w = max(10, ow - dx)
+                else:  # 右侧角点
+                    new_w = max(10, ow + dx)
+                new_h = int(new_w / aspect_ratio)
+            else:
+                # 垂直方向主导
+                if handle in [0, 2]:  # 上侧角点
+                    new_h = max(10, oh - dy)
+                else:  # 下侧角点
+                    new_h = max(10, oh + dy)
+                new_w = int(new_h * aspect_ratio)
+            
+            new_w = max(10, new_w)
+            new_h = max(10, new_h)
+            
+            # 调整位置（左上角点需要移动，右下角不需要）
+            if handle in [0, 5]:  # 左上、左下
+                x = ox + (ow - new_w)
+            if handle in [0, 2]:  # 左上、右上
+                y = oy + (oh - new_h)
+        else:
+            # 边缘控制点：自由缩放
+            if handle == 3:  # 左中
+                x = ox + dx
+                new_w = max(10, ow - dx)
+            elif handle == 4:  # 右中
+                new_w = max(10, ow + dx)
+            elif handle == 1:  # 上中
+                y = oy + dy
+                new_h = max(10, oh - dy)
+            elif handle == 6:  # 下中
+                new_h = max(10, oh + dy)
+        return x, y, new_w, new_h
+    
+    def _start_rubber_band(self, pos: QPoint, add: bool):
+        """在空白处开始拖出选择框"""
+        if self.rubber_band is None:
+            self.rubber_band = QRubberBand(QRubberBand.Shape.Rectangle, self)
+        self.rubber_band_origin = pos
+        self._rubber_band_add = add
+        self.rubber_band.setGeometry(QRect(pos, QSize()))
+        self.rubber_band.show()
+    
+    def _finish_rubber_band(self):
+        """选中与选择框相交的可见、未锁定图层（空间索引区域查询）"""
+        rect = self.rubber_band.geometry()
+        self.rubber_band.hide()
+        if rect.width() < 3 and rect.height() < 3:
+            return  # 单击空白处
+        x0 = int((rect.left() - self.offset_x) / self.scale)
+        y0 = int((rect.top() - self.offset_y) / self.scale)
+        x1 = int((rect.right() + 1 - self.offset_x) / self.scale)
+        y1 = int((rect.bottom() + 1 - self.offset_y) / self.scale)
+        layers = self.canvas.get_layers_in_rect(x0, y0, x1, y1)
+        self.canvas.select_layers([layer.id for layer in layers if layer.visible and not layer.locked],
+                                  add=self._rubber_band_add)
+        self.layer_selected.emit(self.canvas.selected_layer_id or "")
+    
+    def _calculate_guides(self, layers: list):
+        """吸附到其他图层边缘 / 中心、画布中心和分屏边界，记录所有命中的对齐辅助线"""
+        # 多选时按整体范围吸附
+        boxes = [snap_bounds(layer) for layer in layers]
+        bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))
+        # 阈值按屏幕像素计，缩小视图时画布上的吸附范围相应变大
+        threshold = max(1, round(CanvasConfig.SNAP_THRESHOLD / self.scale))
+        dx, dy, self.guide_lines = self.canvas.snap(bounds, threshold, exclude=layers)
+        if dx or dy:
+            for layer in layers:
+                layer.move(dx, dy)
     
     def dragEnterEvent(self, event: QDragEnterEvent):
         """拖拽进入"""
@@ -520,9 +988,19 @@ class CanvasWidget(QWidget):
             path = event.mimeData().text()
             self.drop_image.emit(path, cx, cy)
     
-    def set_scale(self, scale: float):
-        """设置缩放比例"""
-        self.scale = max(0.2, min(2.0, scale))
+    def set_scale(self, scale: float, anchor: QPointF = None):
+        """设置缩放比例，anchor（组件坐标，默认为中心）下的画布位置保持不动"""
+        if anchor is None:
+            anchor = QPointF(self.width() / 2, self.height() / 2)
+        canvas_px = (anchor.x() - self.offset_x) / self.scale
+        canvas_py = (anchor.y() - self.offset_y) / self.scale
+        
+        self.scale = max(MIN_SCALE, min(MAX_SCALE, scale))
+        self._mark_interacting()
+        self._update_scroll_range()
+        self.h_scroll.setValue(round(VIEW_MARGIN_X + canvas_px * self.scale - anchor.x()))
+        self.v_scroll.setValue(round(VIEW_MARGIN_Y + canvas_py * self.scale - anchor.y()))
+        self._sync_offsets()
         self.update()
     
     def zoom_in(self):
@@ -534,10 +1012,9 @@ class CanvasWidget(QWidget):
         self.set_scale(self.scale / 1.2)
     
     def zoom_fit(self):
-        """适应窗口"""
-        w_scale = (self.width() - 100) / self.canvas.width
-        h_scale = (self.height() - 100) / self.canvas.height
-        self.set_scale(min(w_scale, h_scale))
+        """适应窗口宽度（长图页面纵向滚动浏览）"""
+        self.set_scale((self.width() - 2 * VIEW_MARGIN_X) / self.canvas.width,
+                       QPointF(self.offset_x, self.offset_y))
 
 
 class CanvasEditor(QWidget):
@@ -562,7 +1039,14 @@ class CanvasEditor(QWidget):
         self.canvas_widget.canvas_changed.connect(self.canvas_changed.emit)
         self.canvas_widget.drop_image.connect(self._on_drop_image)
         
-        layout.addWidget(self.canvas_widget)
+        # 画布与滚动条
+        view = QGridLayout()
+        view.setContentsMargins(0, 0, 0, 0)
+        view.setSpacing(0)
+        view.addWidget(self.canvas_widget, 0, 0)
+        view.addWidget(self.canvas_widget.v_scroll, 0, 1)
+        view.addWidget(self.canvas_widget.h_scroll, 1, 0)
+        layout.addLayout(view)
     
     def _on_drop_image(self, path: str, x: int, y: int):
         """处理拖放图片"""
@@ -583,6 +1067,7 @@ class CanvasEditor(QWidget):
         self.canvas_widget.canvas = canvas
         self.canvas_widget.history = CanvasHistoryManager(canvas)
         self.canvas_widget.invalidate_layer_cache()  # 清除缓存
+        self.canvas_widget.schedule_decode()  # 后台并行解码图片
         self.canvas_widget.update()
     
     def add_text_layer(self, text: str, x: int = 100, y: int = 100):
@@ -606,11 +1091,13 @@ class CanvasEditor(QWidget):
     def undo(self):
         """撤销"""
         self.canvas_widget.history.undo()
+        self.canvas_widget.schedule_decode()
         self.canvas_widget.update()
         self.canvas_changed.emit()
     
     def redo(self):
         """重做"""
         self.canvas_widget.history.redo()
+        self.canvas_widget.schedule_decode()
         self.canvas_widget.update()
         self.canvas_changed.emit()
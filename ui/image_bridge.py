@@ -0,0 +1,150 @@
+"""
+PIL ↔ Qt 图像转换 - 统一的像素格式桥接
+
+- PIL → Qt 生成 Format_ARGB32_Premultiplied（QPainter 的原生格式），绘制时不再逐次转换；
+  Pillow 直接把像素写入 QImage 自己的内存（没有中间的 bytes 对象），
+  再由 Qt 的 SIMD 转换原地完成通道重排和预乘，只分配一次
+- Qt → PIL 在格式一致时（RGBA8888 / Grayscale8）直接共享 QImage 的内存，
+  其他格式先由 Qt 转换为 RGBA8888 再共享转换结果；返回的图片持有 QImage 的引用
+- qimage_array / array_to_qimage 在 QImage 与 NumPy 数组之间共享内存，不拷贝，
+  数组持有图片 / 图片持有数组的引用，不会出现悬空的视图
+"""
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+from PyQt6 import sip
+from PyQt6.QtGui import QImage, QPixmap
+
+
+# 可与 PIL 直接共享内存的 QImage 格式 -> PIL 模式
+_SHARED_MODES = {
+    QImage.Format.Format_RGBA8888: "RGBA",
+    QImage.Format.Format_Grayscale8: "L",
+    QImage.Format.Format_Alpha8: "L",
+}
+
+
+# PIL 模式 -> (与其内存布局一致的 QImage 格式, 共享内存时使用的 PIL 模式)
+# PIL 的 RGB 在内存中每像素同样占 4 字节，与 RGBX 布局相同
+_PASTE_FORMATS = {
+    "RGBA": (QImage.Format.Format_RGBA8888, "RGBA"),
+    "RGB": (QImage.Format.Format_RGBX8888, "RGBX"),
+    "L": (QImage.Format.Format_Grayscale8, "L"),
+}
+
+
+def pil_to_qimage(image: Image.Image) -> QImage:
+    """PIL Image 转 QImage（RGBA / RGB 为预乘 ARGB32，L 为 Grayscale8）"""
+    if image.mode not in _PASTE_FORMATS:
+        image = image.convert("RGBA")
+    fmt, view_mode = _PASTE_FORMATS[image.mode]
+    qimage = QImage(image.width, image.height, fmt)
+    if qimage.isNull():
+        return qimage
+
+    # 以 QImage 的内存构造 PIL 图片，Pillow 逐行拷贝像素（不经过 tobytes）
+    ptr = qimage.bits()
+    ptr.setsize(qimage.sizeInBytes())
+    view = Image.frombuffer(view_mode, image.size, ptr, "raw", view_mode, qimage.bytesPerLine(), 1)
+    image.load()
+    view.im.paste(image.im, (0, 0) + image.size)
+    del view
+
+    if fmt != QImage.Format.Format_Grayscale8:
+        # 32 位格式之间原地转换，不再分配
+        qimage.convertTo(QImage.Format.Format_ARGB32_Premultiplied)
+    return qimage
+
+
+def pil_to_pixmap(image: Image.Image) -> QPixmap:
+    """PIL Image 转 QPixmap（只能在 GUI 线程调用）"""
+    return QPixmap.fromImage(pil_to_qimage(image))
+
+
+def qimage_to_pil(qimage: QImage) -> Image.Image:
+    """
+    QImage 转 PIL Image（彩色格式返回 RGBA，灰度格式返回 L）
+
+    返回的图片与 QImage 的一个隐式共享副本共用像素内存：调用方之后修改原 QImage 时
+    Qt 会先分离数据，图片内容不受影响；图片为只读，PIL 在修改前会自行拷贝。
+    """
+    mode = _SHARED_MODES.get(qimage.format())
+    if mode is None:
+        qimage = qimage.convertToFormat(QImage.Format.Format_RGBA8888)
+        mode = "RGBA"
+    else:
+        qimage = QImage(qimage)  # 隐式共享副本，不拷贝像素
+
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.sizeInBytes())
+    image = Image.frombuffer(mode, (qimage.width(), qimage.height()), ptr,
+                             "raw", mode, qimage.bytesPerLine(), 1)
+    image._qimage = qimage  # 保持像素内存存活
+    return image
+
+
+class QImageArray(np.ndarray):
+    """共享 QImage 像素内存的数组，通过 qimage 属性持有图片，保证内存在数组存活期间有效"""
+
+    qimage: Optional[QImage] = None
+
+
+def qimage_array(qimage: QImage) -> np.ndarray:
+    """
+    QImage 像素的 NumPy 视图（共享内存，可写）
+
+    8 位格式返回 (高, 宽)，32 位格式返回 (高, 宽, 4)；行跨度按 bytesPerLine 处理。
+    返回的数组（及其切片视图）持有 QImage 的引用，可以直接传入临时图片。
+    """
+    depth = qimage.depth() // 8
+    if depth not in (1, 4):
+        raise ValueError(f"不支持的 QImage 格式: {qimage.format()}")
+    # bits() 可能先分离出独立的数据（行跨度随之变化），之后再读取尺寸
+    ptr = qimage.bits()
+    ptr.setsize(qimage.sizeInBytes())
+    h, w, stride = qimage.height(), qimage.width(), qimage.bytesPerLine()
+    if depth == 1:
+        array = np.ndarray((h, w), dtype=np.uint8, buffer=ptr, strides=(stride, 1))
+    else:
+        array = np.ndarray((h, w, 4), dtype=np.uint8, buffer=ptr, strides=(stride, 4, 1))
+    array = array.view(QImageArray)
+    array.qimage = qimage
+    return array
+
+
+def aligned_array(height: int, width: int, channels: int = 1) -> np.ndarray:
+    """分配每行按 4 字节对齐的 uint8 数组（全 0），可直接交给 array_to_qimage 共享"""
+    row_bytes = width * channels
+    stride = (row_bytes + 3) & ~3
+    buffer = np.zeros((height, stride), dtype=np.uint8)
+    array = buffer[:, :row_bytes]
+    return array if channels == 1 else array.reshape(height, width, channels)
+
+
+def array_to_qimage(array: np.ndarray,
+                    fmt: Optional[QImage.Format] = None) -> QImage:
+    """
+    用 NumPy 数组构造 QImage（共享内存，可写，QImage 持有数组引用）
+
+    (高, 宽) uint8 默认 Grayscale8，(高, 宽, 4) uint8 默认预乘 ARGB32（B G R A 顺序）。
+    行内必须连续且行跨度按 4 字节对齐（QImage 的扫描行要求），否则先拷贝到对齐的数组，
+    此时可通过返回图片的 _array 属性取得实际共享的数组。
+    """
+    if array.dtype != np.uint8 or array.ndim not in (2, 3):
+        raise ValueError("需要 (高, 宽) 或 (高, 宽, 4) 的 uint8 数组")
+    h, w = array.shape[:2]
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    if array.strides[-1] != 1 or (channels > 1 and array.strides[1] != channels) or array.strides[0] % 4:
+        aligned = aligned_array(h, w, channels)
+        aligned[...] = array
+        array = aligned
+    if fmt is None:
+        fmt = (QImage.Format.Format_Grayscale8 if array.ndim == 2
+               else QImage.Format.Format_ARGB32_Premultiplied)
+    # 传入缓冲区对象时 PyQt 虽然共享内存，但按只读数据构造，QPainter 等写入时 Qt 会先分离出副本，
+    # 写入到不了数组；这里传可写的裸指针，PyQt 不持有指针的所有者，由图片的 _array 属性保持数组存活。
+    # 由它隐式共享出的副本（QImage(image) 等）不带 _array，使用期间需保留本对象或数组
+    image = QImage(sip.voidptr(array.ctypes.data), w, h, array.strides[0], fmt)
+    image._array = array
+    return image
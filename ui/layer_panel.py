@@ -46,6 +46,7 @@ class LayerItem(QFrame):
             "image": "🖼",
             "text": "T",
             "shape": "◼",
+            "group": "▣",
             "base": "□"
         }
         type_label = QLabel(type_icons.get(self.layer.layer_type, "□"))
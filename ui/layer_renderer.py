@@ -0,0 +1,98 @@
+"""
+图层后台渲染 - 在线程池中生成视口用的图层位图
+
+GUI 线程只提交任务并绘制已完成的结果，慢的文字 / 图片图层不会卡住界面：
+- 提交时复制图层快照（共享像素缓冲，开销很小），工作线程只读写快照
+- 结果通过信号回到 GUI 线程，代数（generation）过期的结果直接丢弃
+- 同一图层在排队期间又被修改时，旧任务开始前即被跳过
+"""
+from typing import Dict, Set
+
+from PyQt6.QtCore import QObject, QThreadPool, Qt, pyqtSignal
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
+from core.layer import Layer
+from ui.image_bridge import pil_to_qimage
+
+
+class LayerRenderer(QObject):
+    """视口图层渲染器"""
+
+    # cache_key, generation, QImage, dx, dy（由工作线程发出）
+    rendered = pyqtSignal(str, int, object, int, int)
+
+    def __init__(self, parent=None, max_threads: int = None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        if max_threads is None:
+            # 留一个核心给 GUI 线程
+            max_threads = max(1, QThreadPool.globalInstance().maxThreadCount() - 1)
+        self._pool.setMaxThreadCount(max_threads)
+
+        self.generation = 0
+        self._pending: Set[str] = set()  # 已提交、尚未完成的缓存键
+        self._wanted: Dict[str, str] = {}  # 图层 id -> 最新请求的缓存键
+
+    def request(self, layer: Layer, cache_key: str, scaled_w: int, scaled_h: int):
+        """提交图层渲染（同一缓存键只提交一次）"""
+        self._wanted[layer.id] = cache_key
+        if cache_key in self._pending:
+            return
+        self._pending.add(cache_key)
+
+        snapshot = layer.clone()
+        layer_id = layer.id
+        generation = self.generation
+        self._pool.start(lambda: self._run(snapshot, layer_id, cache_key, generation, scaled_w, scaled_h))
+
+    def _run(self, layer: Layer, layer_id: str, cache_key: str, generation: int,
+             scaled_w: int, scaled_h: int):
+        """工作线程：渲染快照并缩放到视口尺寸"""
+        image, dx, dy = None, 0, 0
+        # 排队期间图层又被修改或文档已切换，跳过
+        if generation == self.generation and self._wanted.get(layer_id) == cache_key:
+            try:
+                image, dx, dy = render_layer_image(layer, scaled_w, scaled_h)
+            except Exception as e:
+                print(f"渲染图层 {layer_id} 失败: {e}")
+        try:
+            self.rendered.emit(cache_key, generation, image, dx, dy)
+        except RuntimeError:
+            pass  # 退出时渲染器已随画布组件销毁
+
+    def finish(self, cache_key: str, generation: int) -> bool:
+        """GUI 线程收到结果时调用，返回结果是否仍然有效"""
+        self._pending.discard(cache_key)
+        return generation == self.generation
+
+    def invalidate(self):
+        """丢弃所有进行中的任务结果（切换文档、清空缓存时）"""
+        self.generation += 1
+        self._pending.clear()
+        self._wanted.clear()
+
+    def wait(self, msecs: int = -1) -> bool:
+        """等待所有任务完成（结果仍通过信号派发）"""
+        return self._pool.waitForDone(msecs)
+
+
+def render_layer_image(layer: Layer, scaled_w: int, scaled_h: int):
+    """渲染图层并缩放到视口尺寸，返回 (QImage, dx, dy)，可在任意线程调用"""
+    # 位图可能已裁掉透明边距
+    layer_img, dx, dy = layer.render_with_offset()
+    if layer_img is None:
+        return None, 0, 0
+
+    # PIL Image 转预乘 ARGB32（QPainter 的原生格式，绘制时不再转换）
+    qimg = pil_to_qimage(layer_img)
+
+    # 缩放（按图层逻辑尺寸与完整位图的比例）
+    sx = scaled_w / layer.width
+    sy = scaled_h / layer.height
+    target_w = max(1, round(layer_img.width * sx))
+    target_h = max(1, round(layer_img.height * sy))
+    if (target_w, target_h) != (qimg.width(), qimg.height()):
+        qimg = qimg.scaled(target_w, target_h, Qt.AspectRatioMode.IgnoreAspectRatio,
+                           Qt.TransformationMode.SmoothTransformation)
+    return qimg, round(dx * sx), round(dy * sy)
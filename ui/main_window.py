@@ -234,6 +234,12 @@ class MainWindow(QMainWindow):
         zoom_fit_action.triggered.connect(self.canvas_editor.canvas_widget.zoom_fit)
         view_menu.addAction(zoom_fit_action)
         
+        view_menu.addSeparator()
+        
+        memory_action = QAction("内存占用", self)
+        memory_action.triggered.connect(self._on_memory_report)
+        view_menu.addAction(memory_action)
+        
         # 图层菜单
         layer_menu = menubar.addMenu("图层")
         
@@ -259,6 +265,18 @@ class MainWindow(QMainWindow):
         layer_down_action.triggered.connect(self._on_layer_down)
         layer_menu.addAction(layer_down_action)
         
+        layer_menu.addSeparator()
+        
+        group_action = QAction("分屏图层编组", self)
+        group_action.setShortcut(QKeySequence("Ctrl+G"))
+        group_action.triggered.connect(self._on_group_layers)
+        layer_menu.addAction(group_action)
+        
+        ungroup_action = QAction("取消编组", self)
+        ungroup_action.setShortcut(QKeySequence("Ctrl+Shift+G"))
+        ungroup_action.triggered.connect(self._on_ungroup_layer)
+        layer_menu.addAction(ungroup_action)
+        
         # 分屏菜单
         screen_menu = menubar.addMenu("分屏")
         
@@ -409,6 +427,7 @@ class MainWindow(QMainWindow):
         self.screen_panel.screen_resized.connect(self._on_screen_resized)
         self.screen_panel.screen_renamed.connect(self._on_screen_renamed)
         self.screen_panel.insert_screen.connect(self._on_insert_screen)
+        self.screen_panel.screen_duplicated.connect(self._on_screen_duplicated)
         
         # 素材面板信号
         self.assets_panel.asset_add_to_canvas.connect(self._on_asset_add)
@@ -501,9 +520,9 @@ class MainWindow(QMainWindow):
         """属性变化"""
         canvas = self.canvas_editor.get_canvas()
         layer = canvas.get_layer(layer_id)
-        if layer and hasattr(layer, prop):
+        if layer and prop in layer.schema():
+            # 赋值会触发图层变更事件，画布据此失效缓存并重绘
             setattr(layer, prop, value)
-            self.canvas_editor.canvas_widget.update()
     
     def _on_screen_added(self, index: int, is_blank: bool):
         """添加分屏"""
@@ -548,6 +567,14 @@ class MainWindow(QMainWindow):
         self._update_status()
         self.canvas_editor.canvas_widget.update()
     
+    def _on_screen_duplicated(self, screen_id: str):
+        """复制分屏（连同分屏内的图层）"""
+        canvas = self.canvas_editor.get_canvas()
+        if canvas.duplicate_screen(screen_id):
+            self.canvas_editor.canvas_widget.history.save_state("复制分屏")
+            self._update_status()
+            self.canvas_editor.canvas_widget.update()
+    
     def _on_asset_add(self, path: str):
         """添加素材到画布"""
         canvas = self.canvas_editor.get_canvas()
@@ -596,11 +623,82 @@ class MainWindow(QMainWindow):
             self._update_status()
             self.canvas_editor.canvas_widget.update()
     
+    def _on_group_layers(self):
+        """将选中的多个图层编为一组（只选中一个时，编组其所在分屏内的图层）"""
+        canvas = self.canvas_editor.get_canvas()
+        selected = [l.id for l in canvas.get_selected_layers() if not l.locked]
+        if len(selected) >= 2:
+            group = canvas.group_layers(selected)
+            canvas.select_layer(group.id)
+            self.canvas_editor.canvas_widget.history.save_state("编组")
+            self._update_status()
+            self._on_layer_selected(group.id)
+            self.canvas_editor.canvas_widget.update()
+            return
+        
+        screen_id = self.screen_panel.selected_screen_id
+        layer = canvas.get_selected_layer()
+        if layer:
+            screen = canvas.get_screen_at_y(layer.y)
+            screen_id = screen.id if screen else screen_id
+        if not screen_id:
+            self.statusbar.showMessage("请先选择分屏或图层", 3000)
+            return
+        
+        layer_ids = [l.id for l in canvas.get_layers_in_screen(screen_id) if not l.locked]
+        if len(layer_ids) < 2:
+            self.statusbar.showMessage("分屏内可编组的图层少于 2 个", 3000)
+            return
+        
+        screen = canvas.get_screen(screen_id)
+        group = canvas.group_layers(layer_ids, name=f"{screen.name} 组")
+        canvas.select_layer(group.id)
+        self.canvas_editor.canvas_widget.history.save_state("编组")
+        self._update_status()
+        self._on_layer_selected(group.id)
+        self.canvas_editor.canvas_widget.update()
+    
+    def _on_ungroup_layer(self):
+        """解散选中的图层组"""
+        canvas = self.canvas_editor.get_canvas()
+        if canvas.selected_layer_id and canvas.ungroup_layer(canvas.selected_layer_id):
+            self.canvas_editor.canvas_widget.history.save_state("取消编组")
+            self._update_status()
+            self._on_layer_selected(canvas.selected_layer_id)
+            self.canvas_editor.canvas_widget.update()
+    
+    def _on_memory_report(self):
+        """显示各缓存子系统的内存占用"""
+        from core.cache import cache_manager
+        from core.layer import ImageLayer, iter_layers
+        
+        names = {
+            'render': "图层渲染", 'base': "图片缩放", 'effect_mask': "效果蒙版",
+            'export': "导出分屏", 'pixmap': "视口位图", 'hit_mask': "命中位图",
+        }
+        mb = lambda n: n / (1024 * 1024)
+        lines = []
+        for subsystem, info in sorted(cache_manager.report().items()):
+            lines.append(f"{names.get(subsystem, subsystem)}: {info['entries']} 项, {mb(info['bytes']):.1f} MB")
+        
+        stats = cache_manager.stats()
+        lines.append(f"\n缓存合计: {mb(stats['total_bytes']):.1f} / {mb(stats['budget_bytes']):.0f} MB")
+        lines.append(f"命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, 淘汰 {stats['evictions']} 项")
+        
+        canvas = self.canvas_editor.get_canvas()
+        images = [layer for layer in iter_layers(canvas.layers) if isinstance(layer, ImageLayer)]
+        source_bytes = sum(layer.pixel_nbytes() for layer in images)
+        lines.append(f"\n图片原始像素: {len(images)} 张, {mb(source_bytes):.1f} MB")
+        
+        QMessageBox.information(self, "内存占用", "\n".join(lines))
+    
     def _on_delete_layer(self):
         """删除图层"""
         canvas = self.canvas_editor.get_canvas()
-        if canvas.selected_layer_id:
-            canvas.remove_layer(canvas.selected_layer_id)
+        layers = canvas.get_selected_layers()
+        if layers:
+            for layer in layers:
+                canvas.remove_layer(layer.id)
             self.canvas_editor.canvas_widget.history.save_state("删除图层")
             self._update_status()
             self.canvas_editor.canvas_widget.update()
@@ -626,7 +724,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "提示", f"抠图功能不可用\n{err_msg}\n\n请安装: pip install rembg[cpu]")
                 return
             
-            if layer._image is None:
+            if layer.ensure_image() is None:
                 QMessageBox.warning(self, "提示", "图层图片未加载")
                 return
             
@@ -642,14 +740,13 @@ class MainWindow(QMainWindow):
                 )
             
             # 转换为 QImage 并打开交互式抠图对话框
-            original_qimage = pil_to_qimage(layer._image)
+            original_qimage = pil_to_qimage(layer.get_image())
             dialog = InteractiveRemoveBgDialog(original_qimage, parent=self)
             
             if dialog.exec() == InteractiveRemoveBgDialog.DialogCode.Accepted:
                 result = dialog.get_result()
                 if result:
                     layer.set_image(result, auto_resize=False)
-                    self.canvas_editor.canvas_widget.invalidate_layer_cache(layer.id)
                     self.canvas_editor.canvas_widget.history.save_state("智能抠图")
                     self.canvas_editor.canvas_widget.update()
         except Exception as e:
@@ -676,7 +773,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "提示", "请选择图片图层")
                 return
             
-            if layer._image is None:
+            if layer.ensure_image() is None:
                 QMessageBox.warning(self, "提示", "图层图片未加载")
                 return
             
@@ -689,7 +786,7 @@ class MainWindow(QMainWindow):
                 "正在增强图片，请稍候...",
                 "",
                 enhance_image,
-                layer._image,
+                layer.get_image(),
                 "auto"
             )
             
@@ -699,8 +796,6 @@ class MainWindow(QMainWindow):
             
             if result:
                 layer.set_image(result, auto_resize=False)  # 不要重新缩放
-                # 清除该图层的缓存，确保显示更新
-                self.canvas_editor.canvas_widget.invalidate_layer_cache(layer.id)
                 self.canvas_editor.canvas_widget.history.save_state("图片增强")
                 self.canvas_editor.canvas_widget.update()
                 QMessageBox.information(self, "成功", "增强完成")
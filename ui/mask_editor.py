@@ -14,21 +14,39 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QPoint, QRect, QSize, pyqtSignal, QThread
 from PyQt6.QtGui import (
     QPainter, QColor, QPen, QBrush, QPixmap, QImage,
-    QMouseEvent, QPainterPath, QCursor
+    QMouseEvent, QPainterPath, QCursor, QKeySequence
 )
 from PIL import Image
 import numpy as np
 import io
+import time
 
 import sys
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
 from config import UIConfig
+from ui.image_bridge import pil_to_qimage, qimage_to_pil  # 供 main_window 等处沿用原导入路径
+from ui.image_bridge import aligned_array, array_to_qimage, qimage_array
+from ui.mask_history import MaskHistory
+
+
+# 蒙版取值（单通道 uint8）
+MASK_CLEAR = 0      # 交互式：未标记；精修：删除
+MASK_REMOVE = 128   # 交互式：标记删除
+MASK_KEEP = 255     # 交互式：标记保留；精修：保留
+
+# 标记叠加色（预乘 ARGB32）
+_OVERLAY_KEEP = 0x80008000    # 半透明绿色
+_OVERLAY_REMOVE = 0x80800000  # 半透明红色
+
+# 棋盘格背景的格子边长（显示像素）
+CHECKER_SIZE = 10
 
 
 class MaskCanvas(QWidget):
     """蒙版绘制画布"""
     
     mask_changed = pyqtSignal()
+    history_changed = pyqtSignal()  # 可撤销 / 可重做状态变化
     
     def __init__(self, image: QImage, mode: str = "interactive", parent=None):
         """
@@ -50,11 +68,26 @@ class MaskCanvas(QWidget):
         self.display_w = int(w * self.display_scale)
         self.display_h = int(h * self.display_scale)
         
-        # 创建蒙版图层
-        # 交互式模式：绿色=保留(前景), 红色=删除(背景), 透明=未标记
-        # 精修模式：白色=保留, 黑色=删除
-        self.mask_image = QImage(w, h, QImage.Format.Format_ARGB32)
-        self.mask_image.fill(Qt.GlobalColor.transparent)
+        # 显示用缓存：缩放后的原图、棋盘格图案画刷、显示分辨率的标记叠加层
+        self._scaled_original = QPixmap.fromImage(image.scaled(
+            self.display_w, self.display_h,
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        ))
+        self._checker_brush = self._create_checker_brush()
+        self._overlay_lut = self._create_overlay_lut()
+        overlay = aligned_array(self.display_h, self.display_w, 4)
+        self._overlay = array_to_qimage(overlay, QImage.Format.Format_ARGB32_Premultiplied)
+        self._overlay_px = overlay.view(np.uint32)[..., 0]
+        # 显示像素对应的蒙版像素（最近邻采样）
+        self._src_x = np.minimum(((np.arange(self.display_w) + 0.5) / self.display_scale).astype(np.intp), w - 1)
+        self._src_y = np.minimum(((np.arange(self.display_h) + 0.5) / self.display_scale).astype(np.intp), h - 1)
+        
+        # 创建蒙版（单通道数组，QPainter 通过共享内存的 Grayscale8 图片在上面绘制）
+        # 交互式模式：MASK_KEEP=保留(前景), MASK_REMOVE=删除(背景), 0=未标记，硬边不抗锯齿
+        # 精修模式：255=保留, 0=删除，画笔边缘为中间值
+        self._alloc_mask(w, h)
+        self._refresh_overlay()
         
         # 工具状态
         if mode == "interactive":
@@ -66,6 +99,11 @@ class MaskCanvas(QWidget):
         self.is_drawing = False
         self.last_point = QPoint()
         
+        # 贴合边缘：超像素标签（后台计算完成后设置），开启时笔画按超像素整块填充
+        self.labels = None
+        self.snap_edges = False
+        self._snap_pad = 0
+        
         self.setFixedSize(self.display_w, self.display_h)
         self.setMouseTracking(True)
         self.setCursor(self._create_brush_cursor())
@@ -92,6 +130,15 @@ class MaskCanvas(QWidget):
         
         return QCursor(cursor_pixmap, size // 2, size // 2)
     
+    def set_display_image(self, image: QImage):
+        """更换底图（与原图同尺寸，如抠图结果预览），蒙版不变"""
+        self._scaled_original = QPixmap.fromImage(image.scaled(
+            self.display_w, self.display_h,
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        ))
+        self.update()
+    
     def set_tool(self, tool: str):
         """设置工具"""
         self.tool = tool
@@ -102,85 +149,108 @@ class MaskCanvas(QWidget):
         self.brush_size = size
         self.setCursor(self._create_brush_cursor())
     
-    def set_initial_mask_from_alpha(self, image: QImage):
-        """从图片的 alpha 通道初始化蒙版（用于精修模式）"""
-        if image.format() != QImage.Format.Format_ARGB32:
-            image = image.convertToFormat(QImage.Format.Format_ARGB32)
-        
+    def set_superpixels(self, labels: np.ndarray):
+        """设置超像素标签（与蒙版同尺寸）"""
+        if labels is None or labels.shape != self.mask.shape:
+            return
+        self.labels = labels
+        # 笔画范围外扩约两个超像素的边长，保证被选中的超像素能整块填充
+        count = int(labels.max()) + 1
+        self._snap_pad = int(2 * (labels.size / count) ** 0.5)
+    
+    def set_snap_edges(self, enabled: bool):
+        """开启 / 关闭贴合边缘"""
+        self.snap_edges = enabled
+    
+    def _alloc_mask(self, w: int, h: int):
+        """分配蒙版数组及共享内存的图片视图（撤销记录随之清空）"""
+        self.mask = aligned_array(h, w)
+        self.mask_image = array_to_qimage(self.mask)
+        self.history = MaskHistory(self.mask)
+    
+    def _create_overlay_lut(self) -> np.ndarray:
+        """蒙版值 -> 叠加层颜色"""
+        lut = np.zeros(256, dtype=np.uint32)
+        if self.mode == "interactive":
+            lut[MASK_REMOVE] = _OVERLAY_REMOVE
+            lut[MASK_KEEP] = _OVERLAY_KEEP
+        else:
+            # 低于一半（将被删除）显示红色
+            lut[:128] = _OVERLAY_REMOVE
+        return lut
+    
+    @staticmethod
+    def _create_checker_brush() -> QBrush:
+        """棋盘格图案画刷（表示透明）"""
+        tile = QPixmap(CHECKER_SIZE * 2, CHECKER_SIZE * 2)
+        tile.fill(QColor(255, 255, 255))
+        painter = QPainter(tile)
+        painter.fillRect(0, 0, CHECKER_SIZE, CHECKER_SIZE, QColor(200, 200, 200))
+        painter.fillRect(CHECKER_SIZE, CHECKER_SIZE, CHECKER_SIZE, CHECKER_SIZE, QColor(200, 200, 200))
+        painter.end()
+        return QBrush(tile)
+    
+    def _refresh_overlay(self, rect: QRect = None):
+        """按蒙版更新叠加层中 rect（蒙版坐标，默认全部）对应的区域，并只重绘该区域"""
+        if rect is None:
+            x0, y0, x1, y1 = 0, 0, self.display_w, self.display_h
+        else:
+            s = self.display_scale
+            x0 = max(0, int(rect.left() * s) - 1)
+            y0 = max(0, int(rect.top() * s) - 1)
+            x1 = min(self.display_w, int((rect.right() + 1) * s) + 2)
+            y1 = min(self.display_h, int((rect.bottom() + 1) * s) + 2)
+            if x0 >= x1 or y0 >= y1:
+                return
+        values = self.mask[np.ix_(self._src_y[y0:y1], self._src_x[x0:x1])]
+        self._overlay_px[y0:y1, x0:x1] = self._overlay_lut[values]
+        self.update(QRect(x0, y0, x1 - x0, y1 - y0))
+    
+    def set_initial_mask_from_alpha(self, image: QImage, record: bool = False):
+        """从图片的 alpha 通道初始化蒙版（用于精修模式）
+        record=True 时作为一次可撤销的编辑（重置），否则清空撤销记录
+        """
         w, h = image.width(), image.height()
-        self.mask_image = QImage(w, h, QImage.Format.Format_ARGB32)
-        
-        for y in range(h):
-            for x in range(w):
-                pixel = image.pixel(x, y)
-                alpha = (pixel >> 24) & 0xFF
-                # alpha > 0 的区域设为白色（保留），否则设为黑色（删除）
-                if alpha > 10:
-                    self.mask_image.setPixel(x, y, 0xFFFFFFFF)  # 白色
-                else:
-                    self.mask_image.setPixel(x, y, 0xFF000000)  # 黑色
+        if (w, h) != (self.mask_image.width(), self.mask_image.height()):
+            self._alloc_mask(w, h)
+            record = False
         
-        self.update()
+        if record:
+            self.history.begin()
+            self.history.save()
+        else:
+            self.history.reset()
+        
+        # alpha > 10 的区域保留，否则删除
+        # 转换结果须在数组使用期间保持存活
+        alpha_image = image.convertToFormat(QImage.Format.Format_Alpha8)
+        alpha = qimage_array(alpha_image)
+        self.mask[...] = np.where(alpha > 10, MASK_KEEP, MASK_CLEAR)
+        
+        if record:
+            self.history.commit()
+        self._refresh_overlay()
+        self.history_changed.emit()
     
     def paintEvent(self, event):
-        """绑定绘制事件"""
+        """绑定绘制事件（只绘制重绘区域，均为显示尺寸的缓存，不做缩放）"""
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        rect = event.rect()
         
-        # 绘制棋盘格背景（表示透明）
-        self._draw_checkerboard(painter)
+        # 棋盘格背景（表示透明）
+        painter.fillRect(rect, self._checker_brush)
         
-        # 绘制原图
-        scaled_image = self.original_image.scaled(
-            self.display_w, self.display_h,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        painter.drawImage(0, 0, scaled_image)
+        # 原图
+        painter.drawPixmap(rect, self._scaled_original, rect)
         
-        # 绘制蒙版预览
-        scaled_mask = self.mask_image.scaled(
-            self.display_w, self.display_h,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        
-        if self.mode == "interactive":
-            # 交互式模式：直接显示绿色/红色标记
-            painter.setOpacity(0.5)
-            painter.drawImage(0, 0, scaled_mask)
-            painter.setOpacity(1.0)
-        else:
-            # 精修模式：红色半透明表示将被删除的区域
-            overlay = QImage(self.display_w, self.display_h, QImage.Format.Format_ARGB32)
-            overlay.fill(Qt.GlobalColor.transparent)
-            
-            for y in range(scaled_mask.height()):
-                for x in range(scaled_mask.width()):
-                    pixel = scaled_mask.pixel(x, y)
-                    r = (pixel >> 16) & 0xFF
-                    g = (pixel >> 8) & 0xFF
-                    b = pixel & 0xFF
-                    # 黑色区域（将被删除）显示红色
-                    if r < 128 and g < 128 and b < 128:
-                        overlay.setPixel(x, y, 0x80FF0000)  # 半透明红色
-            
-            painter.drawImage(0, 0, overlay)
-    
-    def _draw_checkerboard(self, painter: QPainter):
-        """绘制棋盘格背景"""
-        cell_size = 10
-        colors = [QColor(200, 200, 200), QColor(255, 255, 255)]
-        
-        for y in range(0, self.display_h, cell_size):
-            for x in range(0, self.display_w, cell_size):
-                color_idx = ((x // cell_size) + (y // cell_size)) % 2
-                painter.fillRect(x, y, cell_size, cell_size, colors[color_idx])
+        # 蒙版预览（交互式：绿色保留 / 红色删除；精修：红色为将被删除的区域）
+        painter.drawImage(rect, self._overlay, rect)
     
     def mousePressEvent(self, event: QMouseEvent):
         """鼠标按下"""
         if event.button() == Qt.MouseButton.LeftButton:
             self.is_drawing = True
+            self.history.begin()
             self.last_point = event.position().toPoint()
             self._draw_at(self.last_point)
     
@@ -193,32 +263,38 @@ class MaskCanvas(QWidget):
     
     def mouseReleaseEvent(self, event: QMouseEvent):
         """鼠标释放"""
-        if event.button() == Qt.MouseButton.LeftButton:
+        if event.button() == Qt.MouseButton.LeftButton and self.is_drawing:
             self.is_drawing = False
+            if self.history.commit():
+                self.history_changed.emit()
             self.mask_changed.emit()
     
-    def _get_draw_color(self) -> QColor:
-        """获取绘制颜色"""
+    def _get_draw_value(self) -> int:
+        """当前工具写入蒙版的值"""
         if self.mode == "interactive":
-            if self.tool == "keep":
-                return QColor(0, 255, 0, 255)  # 绿色=保留
-            else:
-                return QColor(255, 0, 0, 255)  # 红色=删除
-        else:
-            if self.tool == "brush":
-                return QColor(255, 255, 255, 255)  # 白色=保留
-            else:
-                return QColor(0, 0, 0, 255)  # 黑色=删除
+            return MASK_KEEP if self.tool == "keep" else MASK_REMOVE
+        return MASK_KEEP if self.tool == "brush" else MASK_CLEAR
+    
+    def _get_draw_color(self) -> QColor:
+        """获取绘制颜色（灰度即写入蒙版的值）"""
+        value = self._get_draw_value()
+        return QColor(value, value, value)
     
     def _draw_at(self, pos: QPoint):
         """在指定位置绘制"""
         # 转换到原始图像坐标
         x = int(pos.x() / self.display_scale)
         y = int(pos.y() / self.display_scale)
+        if self.snap_edges and self.labels is not None:
+            self._draw_snapped(x, y, x, y)
+            return
         radius = self.brush_size // 2
+        dirty = QRect(x - radius - 1, y - radius - 1, 2 * radius + 3, 2 * radius + 3)
+        self._save_tiles(dirty)
         
         painter = QPainter(self.mask_image)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # 交互式标记为离散值，不做抗锯齿
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, self.mode != "interactive")
         
         color = self._get_draw_color()
         painter.setPen(Qt.PenStyle.NoPen)
@@ -226,7 +302,7 @@ class MaskCanvas(QWidget):
         painter.drawEllipse(QPoint(x, y), radius, radius)
         painter.end()
         
-        self.update()
+        self._refresh_overlay(dirty)
     
     def _draw_line(self, start: QPoint, end: QPoint):
         """绘制线条"""
@@ -235,9 +311,17 @@ class MaskCanvas(QWidget):
         y1 = int(start.y() / self.display_scale)
         x2 = int(end.x() / self.display_scale)
         y2 = int(end.y() / self.display_scale)
+        if self.snap_edges and self.labels is not None:
+            self._draw_snapped(x1, y1, x2, y2)
+            return
+        pad = self.brush_size // 2 + 1
+        dirty = QRect(QPoint(min(x1, x2), min(y1, y2)),
+                      QPoint(max(x1, x2), max(y1, y2))).adjusted(-pad, -pad, pad, pad)
+        self._save_tiles(dirty)
         
         painter = QPainter(self.mask_image)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # 交互式标记为离散值，不做抗锯齿
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, self.mode != "interactive")
         
         color = self._get_draw_color()
         pen = QPen(color, self.brush_size, Qt.PenStyle.SolidLine, 
@@ -246,105 +330,198 @@ class MaskCanvas(QWidget):
         painter.drawLine(x1, y1, x2, y2)
         painter.end()
         
-        self.update()
+        self._refresh_overlay(dirty)
+    
+    def _draw_snapped(self, x1: int, y1: int, x2: int, y2: int):
+        """贴合边缘绘制：笔刷覆盖过半的超像素及笔刷中心所在的超像素整块填充"""
+        radius = self.brush_size / 2
+        pad = int(radius) + 1 + self._snap_pad
+        h, w = self.mask.shape
+        wx0, wy0 = max(0, min(x1, x2) - pad), max(0, min(y1, y2) - pad)
+        wx1, wy1 = min(w, max(x1, x2) + pad + 1), min(h, max(y1, y2) + pad + 1)
+        if wx0 >= wx1 or wy0 >= wy1:
+            return
+        dirty = QRect(wx0, wy0, wx1 - wx0, wy1 - wy0)
+        self._save_tiles(dirty)
+        
+        # 窗口内各像素到笔画线段的距离
+        yy = np.arange(wy0, wy1, dtype=np.float32)[:, None]
+        xx = np.arange(wx0, wx1, dtype=np.float32)[None, :]
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        if length2:
+            t = np.clip(((xx - x1) * dx + (yy - y1) * dy) / length2, 0, 1)
+        else:
+            t = 0
+        covered = (xx - x1 - t * dx) ** 2 + (yy - y1 - t * dy) ** 2 <= radius * radius
+        
+        labels = self.labels[wy0:wy1, wx0:wx1]
+        size = int(labels.max()) + 1
+        selected = np.bincount(labels[covered], minlength=size) * 2 >= np.bincount(labels.ravel(), minlength=size)
+        for x, y in ((x1, y1), (x2, y2)):
+            if 0 <= x < w and 0 <= y < h:
+                selected[self.labels[y, x]] = True
+        self.mask[wy0:wy1, wx0:wx1][selected[labels]] = self._get_draw_value()
+        
+        self._refresh_overlay(dirty)
+    
+    def _save_tiles(self, rect: QRect):
+        """绘制前保存 rect（蒙版坐标）覆盖的分块，供撤销"""
+        self.history.save((rect.left(), rect.top(), rect.right() + 1, rect.bottom() + 1))
+    
+    def undo(self):
+        """撤销上一笔"""
+        self._apply_history(self.history.undo())
+    
+    def redo(self):
+        """重做"""
+        self._apply_history(self.history.redo())
+    
+    def _apply_history(self, bounds):
+        """撤销 / 重做后只刷新写回的分块"""
+        if bounds is None:
+            return
+        x0, y0, x1, y1 = bounds
+        self._refresh_overlay(QRect(x0, y0, x1 - x0, y1 - y0))
+        self.history_changed.emit()
+        self.mask_changed.emit()
     
     def get_mask_image(self) -> QImage:
-        """获取蒙版图像"""
-        return self.mask_image
+        """获取蒙版图像（Grayscale8 副本）"""
+        return self.mask_image.copy()
     
     def get_foreground_mask(self) -> Image.Image:
         """获取前景蒙版（用于交互式抠图）
-        返回 PIL Image，绿色区域为白色，其他为黑色
+        返回 PIL Image，标记保留的区域为白色，其他为黑色
         """
-        w, h = self.mask_image.width(), self.mask_image.height()
-        mask = Image.new('L', (w, h), 0)
-        
-        for y in range(h):
-            for x in range(w):
-                pixel = self.mask_image.pixel(x, y)
-                alpha = (pixel >> 24) & 0xFF
-                g = (pixel >> 8) & 0xFF
-                r = (pixel >> 16) & 0xFF
-                # 绿色区域（保留）设为白色
-                if alpha > 0 and g > r:
-                    mask.putpixel((x, y), 255)
-        
-        return mask
+        return Image.fromarray(np.where(self.mask == MASK_KEEP, 255, 0).astype(np.uint8), 'L')
     
     def get_background_mask(self) -> Image.Image:
         """获取背景蒙版（用于交互式抠图）
-        返回 PIL Image，红色区域为白色，其他为黑色
+        返回 PIL Image，标记删除的区域为白色，其他为黑色
         """
-        w, h = self.mask_image.width(), self.mask_image.height()
-        mask = Image.new('L', (w, h), 0)
-        
-        for y in range(h):
-            for x in range(w):
-                pixel = self.mask_image.pixel(x, y)
-                alpha = (pixel >> 24) & 0xFF
-                g = (pixel >> 8) & 0xFF
-                r = (pixel >> 16) & 0xFF
-                # 红色区域（删除）设为白色
-                if alpha > 0 and r > g:
-                    mask.putpixel((x, y), 255)
-        
-        return mask
+        return Image.fromarray(np.where(self.mask == MASK_REMOVE, 255, 0).astype(np.uint8), 'L')
     
     def has_marks(self) -> bool:
         """检查是否有标记"""
-        w, h = self.mask_image.width(), self.mask_image.height()
-        for y in range(0, h, 10):  # 采样检查
-            for x in range(0, w, 10):
-                pixel = self.mask_image.pixel(x, y)
-                alpha = (pixel >> 24) & 0xFF
-                if alpha > 0:
-                    return True
-        return False
+        return bool(self.mask.any())
     
     def apply_mask_to_image(self) -> QImage:
         """将蒙版应用到图像，返回处理后的图像（用于精修模式）"""
         result = self.original_image.convertToFormat(QImage.Format.Format_ARGB32)
-        w, h = result.width(), result.height()
-        
-        for y in range(h):
-            for x in range(w):
-                mask_pixel = self.mask_image.pixel(x, y)
-                r = (mask_pixel >> 16) & 0xFF
-                g = (mask_pixel >> 8) & 0xFF
-                b = mask_pixel & 0xFF
-                # 黑色区域设为透明
-                if r < 128 and g < 128 and b < 128:
-                    result.setPixel(x, y, 0x00000000)
-        
+        # 蒙版低于一半的区域设为透明（qimage_array 会先分离出独立的像素数据）
+        qimage_array(result)[self.mask < 128] = 0
         return result
     
     def reset_mask(self):
-        """重置蒙版"""
-        self.mask_image.fill(Qt.GlobalColor.transparent)
-        self.update()
+        """重置蒙版（可撤销）"""
+        self.history.begin()
+        self.history.save()
+        self.mask.fill(MASK_CLEAR)
+        if self.history.commit():
+            self.history_changed.emit()
+        self._refresh_overlay()
         self.mask_changed.emit()
 
 
+def _create_history_buttons(toolbar_layout: QHBoxLayout):
+    """工具栏中的撤销 / 重做按钮（Ctrl+Z / Ctrl+Shift+Z 等平台快捷键）"""
+    undo_btn = QPushButton("↶ 撤销")
+    undo_btn.setShortcut(QKeySequence(QKeySequence.StandardKey.Undo))
+    undo_btn.setEnabled(False)
+    toolbar_layout.addWidget(undo_btn)
+    
+    redo_btn = QPushButton("↷ 重做")
+    redo_btn.setShortcut(QKeySequence(QKeySequence.StandardKey.Redo))
+    redo_btn.setEnabled(False)
+    toolbar_layout.addWidget(redo_btn)
+    return undo_btn, redo_btn
+
+
+def _connect_history_buttons(canvas: MaskCanvas, undo_btn: QPushButton, redo_btn: QPushButton):
+    """按钮连接到画布，并随撤销记录更新可用状态"""
+    undo_btn.clicked.connect(canvas.undo)
+    redo_btn.clicked.connect(canvas.redo)
+    
+    def update_buttons():
+        undo_btn.setEnabled(canvas.history.can_undo())
+        redo_btn.setEnabled(canvas.history.can_redo())
+    
+    canvas.history_changed.connect(update_buttons)
+
+
 class RemoveBgWorker(QThread):
     """抠图工作线程"""
     finished = pyqtSignal(object, str)  # result, error
     
-    def __init__(self, image, fg_mask=None, bg_mask=None, parent=None):
+    def __init__(self, image, fg_mask=None, bg_mask=None, base=None, parent=None):
+        """
+        Args:
+            image: 原图
+            fg_mask / bg_mask: 用户的保留 / 删除标记（L 模式，可为 None）
+            base: 之前的模型结果（与原图同尺寸），有则跳过模型推理只做局部修正
+        """
         super().__init__(parent)
         self.image = image
         self.fg_mask = fg_mask
         self.bg_mask = bg_mask
+        self.base = base
+        self.preview = None
     
     def run(self):
         try:
             from tools.remove_bg import remove_background_from_image
-            result = remove_background_from_image(self.image)
-            if result:
-                self.finished.emit(result, "")
-            else:
+            if self.base is None:
+                # 不裁剪，保持与标记相同的坐标
+                self.base = remove_background_from_image(self.image, crop=False)
+            if not self.base:
                 self.finished.emit(None, "抠图处理失败")
+                return
+            
+            result = self.base
+            if self.fg_mask is not None or self.bg_mask is not None:
+                result = self._refine(result)
+            self.preview = result  # 未裁剪，与原图对齐
+            
+            # 裁剪透明边界，让选框贴合实际内容
+            bbox = result.getbbox()
+            if bbox:
+                result = result.crop(bbox)
+            self.finished.emit(result, "")
         except Exception as e:
             self.finished.emit(None, str(e))
+    
+    def _refine(self, base: Image.Image) -> Image.Image:
+        """按标记在 CPU 上局部修正模型结果（失败时沿用模型结果）"""
+        from tools.matting import refine_alpha_with_marks
+        start = time.perf_counter()
+        alpha = refine_alpha_with_marks(self.image, base.getchannel("A"), self.fg_mask, self.bg_mask)
+        if alpha is None:
+            return base
+        result = self.image.convert("RGBA")
+        result.putalpha(alpha)
+        print(f"[抠图] 按标记局部修正完成，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+        return result
+
+
+class SuperpixelWorker(QThread):
+    """超像素预计算线程（精修对话框打开时启动）"""
+    computed = pyqtSignal(object)  # 标签数组，失败或取消时为 None
+    
+    def __init__(self, image: Image.Image, parent=None):
+        super().__init__(parent)
+        self.image = image
+        self._cancelled = False
+    
+    def cancel(self):
+        """请求中止（在下一次迭代前生效）"""
+        self._cancelled = True
+    
+    def run(self):
+        from tools.superpixel import compute_superpixels
+        labels = compute_superpixels(self.image, cancel=lambda: self._cancelled)
+        if not self._cancelled:
+            self.computed.emit(labels)
 
 
 class InteractiveRemoveBgDialog(QDialog):
@@ -355,6 +532,7 @@ class InteractiveRemoveBgDialog(QDialog):
         self.original_qimage = image
         self.result_image = None
         self._worker = None
+        self._base_result = None  # 模型结果（原图尺寸），再次抠图时只做局部修正
         
         self._setup_ui()
         self._apply_style()
@@ -412,6 +590,8 @@ class InteractiveRemoveBgDialog(QDialog):
         
         toolbar_layout.addStretch()
         
+        self.undo_btn, self.redo_btn = _create_history_buttons(toolbar_layout)
+        
         self.reset_btn = QPushButton("清除标记")
         self.reset_btn.clicked.connect(self._on_reset)
         toolbar_layout.addWidget(self.reset_btn)
@@ -421,6 +601,7 @@ class InteractiveRemoveBgDialog(QDialog):
         # 画布
         self.canvas = MaskCanvas(self.original_qimage, mode="interactive")
         layout.addWidget(self.canvas, alignment=Qt.AlignmentFlag.AlignCenter)
+        _connect_history_buttons(self.canvas, self.undo_btn, self.redo_btn)
         
         # 按钮
         btn_layout = QHBoxLayout()
@@ -506,7 +687,7 @@ class InteractiveRemoveBgDialog(QDialog):
         self.start_btn.setText("正在处理...")
         
         # 启动工作线程
-        self._worker = RemoveBgWorker(original_pil, fg_mask, bg_mask)
+        self._worker = RemoveBgWorker(original_pil, fg_mask, bg_mask, base=self._base_result)
         self._worker.finished.connect(self._on_remove_bg_finished)
         self._worker.start()
     
@@ -514,6 +695,7 @@ class InteractiveRemoveBgDialog(QDialog):
         """抠图完成"""
         self.start_btn.setEnabled(True)
         self.start_btn.setText("🚀 开始抠图")
+        self._base_result = self._worker.base
         
         if error:
             QMessageBox.critical(self, "错误", f"抠图失败:\n{error}")
@@ -524,12 +706,21 @@ class InteractiveRemoveBgDialog(QDialog):
             return
         
         # 询问是否需要精修
-        reply = QMessageBox.question(
-            self, "\u62a0\u56fe\u5b8c\u6210",
-            "\u62a0\u56fe\u5b8c\u6210!\n\n\u662f\u5426\u9700\u8981\u7cbe\u4fee?\n- \u70b9\u51fb[\u662f]\u6253\u5f00\u7cbe\u4fee\u7f16\u8f91\u5668\n- \u70b9\u51fb[\u5426]\u76f4\u63a5\u4f7f\u7528\u7ed3\u679c",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-            QMessageBox.StandardButton.No
+        box = QMessageBox(
+            QMessageBox.Icon.Question, "\u62a0\u56fe\u5b8c\u6210",
+            "\u62a0\u56fe\u5b8c\u6210!\n\n\u662f\u5426\u9700\u8981\u7cbe\u4fee?\n- \u70b9\u51fb[\u662f]\u6253\u5f00\u7cbe\u4fee\u7f16\u8f91\u5668\n- \u70b9\u51fb[\u5426]\u76f4\u63a5\u4f7f\u7528\u7ed3\u679c"
+            "\n- 点击[继续标记]在结果上补充标记，再次抠图只做局部修正",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Retry,
+            self
         )
+        box.button(QMessageBox.StandardButton.Retry).setText("继续标记")
+        box.setDefaultButton(QMessageBox.StandardButton.No)
+        reply = box.exec()
+        
+        if reply == QMessageBox.StandardButton.Retry:
+            # 画布显示当前结果，用户补充标记后再次抠图
+            self.canvas.set_display_image(pil_to_qimage(self._worker.preview))
+            return
         
         if reply == QMessageBox.StandardButton.Yes:
             # 打开精修编辑器
@@ -566,9 +757,12 @@ class MaskEditorDialog(QDialog):
         self.mode = mode
         self.result_image = None
         self.inpaint_prompt = ""
+        self._superpixel_worker = None
         
         self._setup_ui(image)
         self._apply_style()
+        if self.mode == "refine":
+            self._start_superpixels(image)
     
     def _setup_ui(self, image: QImage):
         """设置 UI"""
@@ -607,6 +801,15 @@ class MaskEditorDialog(QDialog):
         self.eraser_btn.clicked.connect(lambda: self._set_tool("eraser"))
         toolbar_layout.addWidget(self.eraser_btn)
         
+        if self.mode == "refine":
+            # 超像素计算完成后可用
+            self.snap_btn = QPushButton("🧲 贴合边缘")
+            self.snap_btn.setCheckable(True)
+            self.snap_btn.setEnabled(False)
+            self.snap_btn.setToolTip("正在分析图像边缘...")
+            self.snap_btn.toggled.connect(lambda checked: self.canvas.set_snap_edges(checked))
+            toolbar_layout.addWidget(self.snap_btn)
+        
         toolbar_layout.addWidget(QLabel("  画笔大小:"))
         
         self.size_slider = QSlider(Qt.Orientation.Horizontal)
@@ -622,6 +825,8 @@ class MaskEditorDialog(QDialog):
         
         toolbar_layout.addStretch()
         
+        self.undo_btn, self.redo_btn = _create_history_buttons(toolbar_layout)
+        
         self.reset_btn = QPushButton("重置")
         self.reset_btn.clicked.connect(self._on_reset)
         toolbar_layout.addWidget(self.reset_btn)
@@ -630,6 +835,7 @@ class MaskEditorDialog(QDialog):
         
         # 画布
         self.canvas = MaskCanvas(image, mode="refine")
+        _connect_history_buttons(self.canvas, self.undo_btn, self.redo_btn)
         # 从 alpha 通道初始化蒙版
         self.canvas.set_initial_mask_from_alpha(image)
         layout.addWidget(self.canvas, alignment=Qt.AlignmentFlag.AlignCenter)
@@ -712,10 +918,32 @@ class MaskEditorDialog(QDialog):
         self.size_label.setText(str(value))
         self.canvas.set_brush_size(value)
     
+    def _start_superpixels(self, image: QImage):
+        """后台预计算超像素，供贴合边缘画笔使用"""
+        self._superpixel_worker = SuperpixelWorker(qimage_to_pil(image))
+        self._superpixel_worker.computed.connect(self._on_superpixels_ready)
+        self._superpixel_worker.start()
+    
+    def _on_superpixels_ready(self, labels):
+        """超像素计算完成"""
+        if labels is None:
+            self.snap_btn.setToolTip("边缘分析失败，贴合边缘不可用")
+            return
+        self.canvas.set_superpixels(labels)
+        self.snap_btn.setEnabled(True)
+        self.snap_btn.setToolTip("画笔 / 橡皮擦按图像边缘整块填充，适合头发、毛边和产品轮廓")
+    
+    def done(self, result: int):
+        """关闭时中止未完成的超像素计算"""
+        if self._superpixel_worker is not None and self._superpixel_worker.isRunning():
+            self._superpixel_worker.cancel()
+            self._superpixel_worker.wait()
+        super().done(result)
+    
     def _on_reset(self):
         """重置蒙版"""
-        # 重新从原图 alpha 初始化
-        self.canvas.set_initial_mask_from_alpha(self.canvas.original_image)
+        # 重新从原图 alpha 初始化（可撤销）
+        self.canvas.set_initial_mask_from_alpha(self.canvas.original_image, record=True)
     
     def _on_apply(self):
         """应用修改"""
@@ -740,26 +968,3 @@ class MaskEditorDialog(QDialog):
     def get_prompt(self):
         """获取提示词（仅 inpaint 模式）"""
         return self.inpaint_prompt
-
-
-def qimage_to_pil(qimage: QImage) -> Image.Image:
-    """QImage 转 PIL Image"""
-    qimage = qimage.convertToFormat(QImage.Format.Format_RGBA8888)
-    width = qimage.width()
-    height = qimage.height()
-    
-    ptr = qimage.bits()
-    ptr.setsize(height * width * 4)
-    arr = np.frombuffer(ptr, np.uint8).reshape((height, width, 4))
-    
-    return Image.fromarray(arr, 'RGBA')
-
-
-def pil_to_qimage(pil_image: Image.Image) -> QImage:
-    """PIL Image 转 QImage"""
-    if pil_image.mode != 'RGBA':
-        pil_image = pil_image.convert('RGBA')
-    
-    data = pil_image.tobytes('raw', 'RGBA')
-    qimage = QImage(data, pil_image.width, pil_image.height, QImage.Format.Format_RGBA8888)
-    return qimage.copy()  # 返回副本，避免数据被释放
@@ -0,0 +1,147 @@
+"""
+蒙版撤销 / 重做 - 按分块保存每次笔画涉及的区域
+
+- 蒙版划分为 TILE_SIZE×TILE_SIZE 的分块，笔画开始后第一次修改某个分块前保存其原内容，
+  笔画结束时再保存修改后的内容，两者均 zlib 压缩
+- 撤销 / 重做只把记录中的分块写回蒙版数组，占用内存与编辑面积成正比，而不是笔画数 × 图片尺寸
+- 总字节数超出预算时丢弃最早的撤销记录
+"""
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
+from config import CacheConfig
+
+
+TILE_SIZE = 64
+
+Bounds = Tuple[int, int, int, int]  # (x0, y0, x1, y1)，蒙版像素
+
+
+class _Edit:
+    """一次编辑（一笔或一次重置）涉及的分块"""
+
+    __slots__ = ('before', 'after', 'nbytes')
+
+    def __init__(self):
+        self.before: Dict[Tuple[int, int], bytes] = {}  # (列, 行) -> 修改前的压缩内容
+        self.after: Dict[Tuple[int, int], bytes] = {}
+        self.nbytes = 0
+
+    def bounds(self) -> Bounds:
+        cols = [tx for tx, _ty in self.before]
+        rows = [ty for _tx, ty in self.before]
+        return (min(cols) * TILE_SIZE, min(rows) * TILE_SIZE,
+                (max(cols) + 1) * TILE_SIZE, (max(rows) + 1) * TILE_SIZE)
+
+
+class MaskHistory:
+    """蒙版分块撤销栈"""
+
+    def __init__(self, mask: np.ndarray, budget_bytes: int = None):
+        if budget_bytes is None:
+            budget_bytes = CacheConfig.MASK_UNDO_BUDGET_MB * 1024 * 1024
+        self.budget_bytes = budget_bytes
+        self.mask = mask
+        self._undo: List[_Edit] = []
+        self._redo: List[_Edit] = []
+        self._current: Optional[_Edit] = None
+        self._total = 0
+
+    def reset(self, mask: np.ndarray = None):
+        """清空历史（蒙版重新分配时传入新数组）"""
+        if mask is not None:
+            self.mask = mask
+        self._undo.clear()
+        self._redo.clear()
+        self._current = None
+        self._total = 0
+
+    # ========== 记录 ==========
+
+    def begin(self):
+        """开始一次编辑"""
+        self._current = _Edit()
+
+    def save(self, bounds: Bounds = None):
+        """修改蒙版前调用：保存范围内（默认整个蒙版）本次编辑尚未保存的分块"""
+        edit = self._current
+        if edit is None:
+            return
+        h, w = self.mask.shape
+        x0, y0, x1, y1 = bounds if bounds is not None else (0, 0, w, h)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        for ty in range(y0 // TILE_SIZE, (y1 - 1) // TILE_SIZE + 1):
+            for tx in range(x0 // TILE_SIZE, (x1 - 1) // TILE_SIZE + 1):
+                if (tx, ty) not in edit.before:
+                    edit.before[(tx, ty)] = self._pack(tx, ty)
+
+    def commit(self) -> bool:
+        """结束编辑，压缩修改后的分块并入栈；没有修改时返回 False"""
+        edit, self._current = self._current, None
+        if edit is None or not edit.before:
+            return False
+        for key, before in list(edit.before.items()):
+            after = self._pack(*key)
+            if after == before:
+                del edit.before[key]  # 分块内容未变
+            else:
+                edit.after[key] = after
+        if not edit.before:
+            return False
+        edit.nbytes = sum(map(len, edit.before.values())) + sum(map(len, edit.after.values()))
+
+        self._total -= sum(e.nbytes for e in self._redo)
+        self._redo.clear()
+        self._undo.append(edit)
+        self._total += edit.nbytes
+        while self._total > self.budget_bytes and len(self._undo) > 1:
+            self._total -= self._undo.pop(0).nbytes
+        return True
+
+    def _tile(self, tx: int, ty: int) -> np.ndarray:
+        return self.mask[ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE]
+
+    def _pack(self, tx: int, ty: int) -> bytes:
+        return zlib.compress(np.ascontiguousarray(self._tile(tx, ty)).tobytes(), 1)
+
+    def _restore(self, tiles: Dict[Tuple[int, int], bytes]):
+        for (tx, ty), data in tiles.items():
+            tile = self._tile(tx, ty)
+            tile[...] = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(tile.shape)
+
+    # ========== 撤销 / 重做 ==========
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> Optional[Bounds]:
+        """撤销上一次编辑，返回需要刷新的范围"""
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        self._restore(edit.before)
+        self._redo.append(edit)
+        return edit.bounds()
+
+    def redo(self) -> Optional[Bounds]:
+        """重做，返回需要刷新的范围"""
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._restore(edit.after)
+        self._undo.append(edit)
+        return edit.bounds()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
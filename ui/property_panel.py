@@ -4,7 +4,7 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QSpinBox, QDoubleSpinBox, QFrame, QColorDialog, QPushButton,
-    QComboBox, QGroupBox, QSlider
+    QComboBox, QGroupBox, QSlider, QCheckBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QColor
@@ -13,6 +13,9 @@ import sys
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0])
 from config import UIConfig
 from core.layer import Layer, TextLayer, ShapeLayer, ImageLayer
+from core.effects import DropShadow, Stroke, OuterGlow, find_effect
+from core.adjustments import Adjustments, IDENTITY
+from dataclasses import replace
 
 
 class PropertyPanel(QWidget):
@@ -161,8 +164,117 @@ class PropertyPanel(QWidget):
         self.shape_group.hide()
         layout.addWidget(self.shape_group)
         
+        # 图层效果组（图片、文字图层显示）
+        self.effects_group = QGroupBox("图层效果")
+        effects_layout = QVBoxLayout(self.effects_group)
+        
+        # 投影
+        shadow_layout = QHBoxLayout()
+        self.shadow_check = QCheckBox("投影")
+        self.shadow_check.toggled.connect(self._on_effects_change)
+        shadow_layout.addWidget(self.shadow_check)
+        self.shadow_color_btn = self._create_effect_color_button(DropShadow.color)
+        shadow_layout.addWidget(self.shadow_color_btn)
+        self.shadow_blur_spin = self._create_effect_spin(0, 100, DropShadow.blur, "模糊 ")
+        shadow_layout.addWidget(self.shadow_blur_spin)
+        effects_layout.addLayout(shadow_layout)
+        
+        shadow_offset_layout = QHBoxLayout()
+        shadow_offset_layout.addWidget(QLabel("偏移 X:"))
+        self.shadow_x_spin = self._create_effect_spin(-200, 200, DropShadow.offset_x)
+        shadow_offset_layout.addWidget(self.shadow_x_spin)
+        shadow_offset_layout.addWidget(QLabel("Y:"))
+        self.shadow_y_spin = self._create_effect_spin(-200, 200, DropShadow.offset_y)
+        shadow_offset_layout.addWidget(self.shadow_y_spin)
+        effects_layout.addLayout(shadow_offset_layout)
+        
+        # 描边
+        stroke_effect_layout = QHBoxLayout()
+        self.stroke_check = QCheckBox("描边")
+        self.stroke_check.toggled.connect(self._on_effects_change)
+        stroke_effect_layout.addWidget(self.stroke_check)
+        self.stroke_color_effect_btn = self._create_effect_color_button(Stroke.color)
+        stroke_effect_layout.addWidget(self.stroke_color_effect_btn)
+        self.stroke_size_spin = self._create_effect_spin(1, 50, Stroke.width, "宽 ")
+        stroke_effect_layout.addWidget(self.stroke_size_spin)
+        effects_layout.addLayout(stroke_effect_layout)
+        
+        # 外发光
+        glow_layout = QHBoxLayout()
+        self.glow_check = QCheckBox("外发光")
+        self.glow_check.toggled.connect(self._on_effects_change)
+        glow_layout.addWidget(self.glow_check)
+        self.glow_color_btn = self._create_effect_color_button(OuterGlow.color)
+        glow_layout.addWidget(self.glow_color_btn)
+        self.glow_blur_spin = self._create_effect_spin(0, 100, OuterGlow.blur, "模糊 ")
+        glow_layout.addWidget(self.glow_blur_spin)
+        effects_layout.addLayout(glow_layout)
+        
+        self.effects_group.hide()
+        layout.addWidget(self.effects_group)
+        
+        # 调整组（仅图片图层显示，非破坏性）
+        self.adjust_group = QGroupBox("调整")
+        adjust_layout = QVBoxLayout(self.adjust_group)
+        
+        # 滑块值为参数的百分数
+        self.adjust_sliders = {}
+        for name, label, minimum, maximum in (
+            ('brightness', "亮度:", 0, 200),
+            ('contrast', "对比度:", 0, 200),
+            ('saturation', "饱和度:", 0, 200),
+            ('gamma', "中间调:", 10, 300),
+            ('sharpen', "锐化:", 0, 200),
+        ):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(label))
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(minimum, maximum)
+            slider.setValue(int(getattr(IDENTITY, name) * 100))
+            slider.valueChanged.connect(self._on_adjustments_change)
+            row.addWidget(slider)
+            self.adjust_sliders[name] = slider
+            adjust_layout.addLayout(row)
+        
+        levels_layout = QHBoxLayout()
+        levels_layout.addWidget(QLabel("色阶:"))
+        self.levels_black_spin = QSpinBox()
+        self.levels_black_spin.setRange(0, 254)
+        self.levels_black_spin.valueChanged.connect(self._on_adjustments_change)
+        levels_layout.addWidget(self.levels_black_spin)
+        self.levels_white_spin = QSpinBox()
+        self.levels_white_spin.setRange(1, 255)
+        self.levels_white_spin.setValue(255)
+        self.levels_white_spin.valueChanged.connect(self._on_adjustments_change)
+        levels_layout.addWidget(self.levels_white_spin)
+        adjust_layout.addLayout(levels_layout)
+        
+        reset_btn = QPushButton("重置调整")
+        reset_btn.clicked.connect(self._on_adjustments_reset)
+        adjust_layout.addWidget(reset_btn)
+        
+        self.adjust_group.hide()
+        layout.addWidget(self.adjust_group)
+        
         layout.addStretch()
     
+    def _create_effect_spin(self, minimum: int, maximum: int, value, prefix: str = "") -> QSpinBox:
+        """创建效果参数输入框"""
+        spin = QSpinBox()
+        spin.setRange(minimum, maximum)
+        spin.setValue(int(value))
+        spin.setPrefix(prefix)
+        spin.valueChanged.connect(self._on_effects_change)
+        return spin
+    
+    def _create_effect_color_button(self, color: str) -> QPushButton:
+        """创建效果颜色按钮"""
+        btn = QPushButton()
+        btn.setFixedSize(40, 22)
+        self._set_color_button(btn, color)
+        btn.clicked.connect(lambda: self._on_effect_color_pick(btn))
+        return btn
+    
     def _apply_style(self):
         """应用样式"""
         theme = UIConfig.THEME
@@ -231,6 +343,16 @@ class PropertyPanel(QWidget):
         # 根据图层类型显示/隐藏属性组
         self.text_group.hide()
         self.shape_group.hide()
+        self.effects_group.hide()
+        self.adjust_group.hide()
+        
+        if isinstance(layer, ImageLayer):
+            self.adjust_group.show()
+            self._set_adjustments(layer.adjustments or IDENTITY)
+        
+        if isinstance(layer, (ImageLayer, TextLayer)):
+            self.effects_group.show()
+            self._set_effects(layer.effects)
         
         if isinstance(layer, TextLayer):
             self.text_group.show()
@@ -245,6 +367,108 @@ class PropertyPanel(QWidget):
         
         self._updating = False
     
+    def _set_adjustments(self, adjustments: Adjustments):
+        """用图层的调整参数更新控件"""
+        for name, slider in self.adjust_sliders.items():
+            slider.setValue(int(round(getattr(adjustments, name) * 100)))
+        self.levels_black_spin.setValue(adjustments.levels_black)
+        self.levels_white_spin.setValue(adjustments.levels_white)
+    
+    def _on_adjustments_change(self, *args):
+        """调整参数变化"""
+        if self._updating or self.current_layer is None:
+            return
+        params = {name: slider.value() / 100 for name, slider in self.adjust_sliders.items()}
+        adjustments = Adjustments(
+            levels_black=self.levels_black_spin.value(),
+            levels_white=self.levels_white_spin.value(),
+            **params,
+        )
+        self.property_changed.emit(
+            self.current_layer.id, 'adjustments',
+            None if adjustments.is_identity() else adjustments,
+        )
+    
+    def _on_adjustments_reset(self):
+        """重置调整"""
+        if self.current_layer is None:
+            return
+        self._updating = True
+        self._set_adjustments(IDENTITY)
+        self._updating = False
+        self.property_changed.emit(self.current_layer.id, 'adjustments', None)
+    
+    def _set_effects(self, effects: tuple):
+        """用图层的效果更新控件"""
+        shadow = find_effect(effects, DropShadow.kind)
+        self.shadow_check.setChecked(bool(shadow and shadow.enabled))
+        shadow = shadow or DropShadow()
+        self._set_color_button(self.shadow_color_btn, shadow.color)
+        self.shadow_blur_spin.setValue(int(shadow.blur))
+        self.shadow_x_spin.setValue(shadow.offset_x)
+        self.shadow_y_spin.setValue(shadow.offset_y)
+        
+        stroke = find_effect(effects, Stroke.kind)
+        self.stroke_check.setChecked(bool(stroke and stroke.enabled))
+        stroke = stroke or Stroke()
+        self._set_color_button(self.stroke_color_effect_btn, stroke.color)
+        self.stroke_size_spin.setValue(stroke.width)
+        
+        glow = find_effect(effects, OuterGlow.kind)
+        self.glow_check.setChecked(bool(glow and glow.enabled))
+        glow = glow or OuterGlow()
+        self._set_color_button(self.glow_color_btn, glow.color)
+        self.glow_blur_spin.setValue(int(glow.blur))
+    
+    def _collect_effects(self) -> tuple:
+        """根据控件生成效果元组（保留控件未涉及的参数）"""
+        current = getattr(self.current_layer, 'effects', ())
+        effects = []
+        
+        if self.shadow_check.isChecked():
+            shadow = find_effect(current, DropShadow.kind) or DropShadow()
+            effects.append(replace(
+                shadow, enabled=True,
+                color=self.shadow_color_btn.property("color"),
+                blur=float(self.shadow_blur_spin.value()),
+                offset_x=self.shadow_x_spin.value(),
+                offset_y=self.shadow_y_spin.value(),
+            ))
+        
+        if self.stroke_check.isChecked():
+            stroke = find_effect(current, Stroke.kind) or Stroke()
+            effects.append(replace(
+                stroke, enabled=True,
+                color=self.stroke_color_effect_btn.property("color"),
+                width=self.stroke_size_spin.value(),
+            ))
+        
+        if self.glow_check.isChecked():
+            glow = find_effect(current, OuterGlow.kind) or OuterGlow()
+            effects.append(replace(
+                glow, enabled=True,
+                color=self.glow_color_btn.property("color"),
+                blur=float(self.glow_blur_spin.value()),
+            ))
+        
+        return tuple(effects)
+    
+    def _on_effects_change(self, *args):
+        """效果参数变化"""
+        if self._updating or self.current_layer is None:
+            return
+        self.property_changed.emit(self.current_layer.id, 'effects', self._collect_effects())
+    
+    def _on_effect_color_pick(self, btn: QPushButton):
+        """选择效果颜色"""
+        if self.current_layer is None:
+            return
+        
+        color = QColorDialog.getColor(QColor(btn.property("color")), self, "选择效果颜色")
+        if color.isValid():
+            self._set_color_button(btn, color.name())
+            self._on_effects_change()
+    
     def _set_color_button(self, btn: QPushButton, color: str):
         """设置颜色按钮"""
         btn.setStyleSheet(f"background-color: {color}; border: 1px solid #555;")